@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Payment, Notification, Complaint
+from .models import (Payment, Notification, NotificationDelivery, Complaint, ComplaintNotificationJob,
+                     DailyOccupancySnapshot, DailyRevenueSnapshot)
+from .notifications import apply_schedule
 
 
 
@@ -12,15 +14,26 @@ class PaymentAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
     raw_id_fields = ('student', 'room_allocation')
 
+class NotificationDeliveryInline(admin.TabularInline):
+    model = NotificationDelivery
+    extra = 0
+    fields = ('recipient', 'delivered_at', 'read_at', 'dismissed')
+    raw_id_fields = ('recipient',)
+
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('title', 'notification_type', 'priority', 'sender', 'created_at', 'scheduled_for')
+    list_display = ('title', 'notification_type', 'priority', 'sender', 'created_at', 'scheduled_for', 'expires_at')
     list_filter = ('notification_type', 'priority', 'created_at')
     search_fields = ('title', 'message', 'sender__username')
     ordering = ('-created_at', 'priority')
     readonly_fields = ('created_at', 'updated_at')
     raw_id_fields = ('sender',)
-    filter_horizontal = ('recipients', 'read_by')
+    inlines = (NotificationDeliveryInline,)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Hold deliveries of notifications scheduled for later, release the rest
+        apply_schedule(form.instance)
 
 @admin.register(Complaint)
 class ComplaintAdmin(admin.ModelAdmin):
@@ -30,3 +43,36 @@ class ComplaintAdmin(admin.ModelAdmin):
     ordering = ('-created_at', 'status')
     readonly_fields = ('created_at', 'updated_at')
     raw_id_fields = ('room', 'reported_by', 'assigned_to')
+
+@admin.register(ComplaintNotificationJob)
+class ComplaintNotificationJobAdmin(admin.ModelAdmin):
+    list_display = ('complaint', 'action', 'sender', 'created_at', 'failed_at')
+    list_filter = ('action', 'failed_at')
+    readonly_fields = ('created_at', 'failed_at', 'error')
+    raw_id_fields = ('complaint', 'sender')
+
+@admin.register(DailyOccupancySnapshot)
+class DailyOccupancySnapshotAdmin(admin.ModelAdmin):
+    list_display = ('date', 'floor', 'room_type', 'rooms', 'capacity', 'occupied', 'computed_at', 'stale')
+    list_filter = ('floor', 'room_type', 'stale')
+    date_hierarchy = 'date'
+    ordering = ('-date', 'floor', 'room_type')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(DailyRevenueSnapshot)
+class DailyRevenueSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('date', 'payment_type', 'status', 'room_type', 'payments', 'amount', 'computed_at', 'stale')
+    list_filter = ('payment_type', 'status', 'room_type', 'stale')
+    date_hierarchy = 'date'
+    ordering = ('-date', 'payment_type', 'status')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
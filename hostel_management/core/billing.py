@@ -0,0 +1,129 @@
+import calendar
+import datetime
+import time
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from rooms.availability import overlapping
+from .caching import invalidate_on_commit
+from .models import Payment
+
+INVOICE_BATCH_SIZE = 1000
+RENT_DUE_DAY = getattr(settings, 'RENT_DUE_DAY', 1)
+CENT = Decimal('0.01')
+
+
+@dataclass
+class BillingResult:
+    period: datetime.date
+    allocations: int = 0
+    created: int = 0
+    existing: int = 0  # allocations already invoiced for the period
+    prorated: int = 0
+    amount: Decimal = Decimal('0.00')
+    timings: dict = field(default_factory=dict)  # phase -> seconds
+    dry_run: bool = False
+
+    @property
+    def elapsed(self):
+        return sum(self.timings.values())
+
+
+def billing_period(value):
+    """First day of the month ``value`` falls in, or of a ``YYYY-MM`` string."""
+    if isinstance(value, str):
+        value = datetime.datetime.strptime(value, '%Y-%m').date()
+    return value.replace(day=1)
+
+
+def prorated_rent(monthly_rent, check_in, check_out, start, end):
+    """
+    Rent for the nights of ``[start, end)`` an allocation occupies, and how many there are.
+
+    Nights run from check_in_date up to, but not including, check_out_date,
+    as in rooms.availability; a whole month costs exactly ``monthly_rent``.
+    """
+    first = max(check_in, start)
+    last = end if check_out is None else min(check_out, end)
+    nights = max((last - first).days, 0)
+    days = (end - start).days
+    if nights == days:
+        return monthly_rent, nights
+    return (monthly_rent * nights / days).quantize(CENT, rounding=ROUND_HALF_UP), nights
+
+
+def generate_rent_invoices(period, dry_run=False, batch_size=INVOICE_BATCH_SIZE):
+    """
+    Create the month's pending rent payments for every allocation occupying a night of ``period``.
+
+    Rent is prorated by the nights of the month between check-in and
+    check-out. Allocations are read as value tuples in one query, the ones
+    already invoiced for the period in a second, and the new invoices are
+    written with ``bulk_create`` in one transaction. Running it again for
+    the same period creates nothing: the unique_rent_invoice constraint
+    allows one invoice per allocation and month, and conflicting rows from a
+    concurrent run are ignored.
+    """
+    start = billing_period(period)
+    days = calendar.monthrange(start.year, start.month)[1]
+    end = start + datetime.timedelta(days=days)
+    due_date = start.replace(day=min(RENT_DUE_DAY, days))
+    result = BillingResult(start, dry_run=dry_run)
+
+    started = time.monotonic()
+    allocations = list(
+        overlapping(start, end)
+        .order_by('id')
+        .values_list('id', 'student_id', 'check_in_date', 'check_out_date', 'room__monthly_rent')
+    )
+    invoiced = set(
+        Payment.objects.filter(billing_period=start, room_allocation__isnull=False)
+        .values_list('room_allocation_id', flat=True)
+    )
+    result.timings['load'] = time.monotonic() - started
+
+    started = time.monotonic()
+    month = start.strftime('%B %Y')
+    invoices = []
+    for allocation_id, student_id, check_in, check_out, monthly_rent in allocations:
+        if allocation_id in invoiced:
+            result.existing += 1
+            continue
+        amount, nights = prorated_rent(monthly_rent, check_in, check_out, start, end)
+        if not amount:
+            continue
+        remarks = f'Rent for {month}'
+        if nights < days:
+            result.prorated += 1
+            remarks += f' ({nights} of {days} nights)'
+        result.amount += amount
+        invoices.append(Payment(
+            student_id=student_id, room_allocation_id=allocation_id, payment_type='rent', amount=amount,
+            status='pending', due_date=due_date, billing_period=start, remarks=remarks,
+        ))
+    result.allocations = len(allocations)
+    result.timings['prorate'] = time.monotonic() - started
+
+    started = time.monotonic()
+    if dry_run:
+        result.created = len(invoices)
+    elif invoices:
+        # ignore_conflicts drops rows a concurrent run wrote first without
+        # saying which, so the invoices written and their amount are totalled
+        # around the insert.
+        period_invoices = Payment.objects.filter(billing_period=start, room_allocation__isnull=False)
+        totals = {'rows': Count('pk'), 'amount': Sum('amount', default=Decimal('0.00'))}
+        with transaction.atomic():
+            before = period_invoices.aggregate(**totals)
+            Payment.objects.bulk_create(invoices, batch_size=batch_size, ignore_conflicts=True)
+            after = period_invoices.aggregate(**totals)
+            invalidate_on_commit('payment')
+        result.created = after['rows'] - before['rows']
+        result.amount = after['amount'] - before['amount']
+        result.existing += len(invoices) - result.created
+    result.timings['write'] = time.monotonic() - started
+    return result
@@ -0,0 +1,140 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CACHE_TIMEOUT = getattr(settings, 'CACHE_TIMEOUT', 300)
+
+# Model label -> invalidation namespace bumped when a row is saved or deleted
+MODEL_NAMESPACES = {
+    'rooms.Room': 'room',
+    'rooms.RoomAllocation': 'allocation',
+    'rooms.RoomMaintenance': 'maintenance',
+    'core.Payment': 'payment',
+    'core.Complaint': 'complaint',
+    'core.Notification': 'notification',
+    'users.User': 'user',
+}
+
+_MISSING = object()
+_AREAS_KEY = 'hm:stats:areas'
+_areas = set()
+
+
+def _generation_key(namespace):
+    return f'hm:gen:{namespace}'
+
+
+def _generations(namespaces):
+    """
+    Current generation of each namespace, in one cache round trip.
+
+    Every cached entry's key embeds the generations of the namespaces it
+    depends on, so bumping a generation orphans those entries without having
+    to find and delete them. Generations are timestamps rather than counters
+    so an evicted generation never comes back with an old value.
+    """
+    keys = {_generation_key(namespace): namespace for namespace in namespaces}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def generation(namespace):
+    return _generations([namespace])[0]
+
+
+def invalidate(*namespaces):
+    """Drop every cached entry depending on any of ``namespaces``; returns the new generation."""
+    generation = time.time_ns()
+    cache.set_many({_generation_key(namespace): generation for namespace in namespaces}, None)
+    return generation
+
+
+def invalidate_on_commit(*namespaces):
+    """
+    Invalidate once the current transaction commits.
+
+    Bumping earlier would let a concurrent request cache the old rows again
+    before the new ones are visible. Runs immediately outside a transaction.
+    """
+    transaction.on_commit(lambda: invalidate(*namespaces))
+
+
+def user_role(user):
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.is_admin():
+        return 'admin'
+    return 'staff' if user.is_staff else user.user_type
+
+
+def make_key(area, namespaces, *vary):
+    """Cache key for ``area`` varying on ``vary`` and the generations of ``namespaces``."""
+    parts = [area, *_generations(namespaces), *vary]
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'hm:{area}:{digest}'
+
+
+def _record(area, hit):
+    if area not in _areas:
+        # Shared so every process's areas show up in cache_stats()
+        _areas.add(area)
+        cache.set(_AREAS_KEY, cache.get(_AREAS_KEY, set()) | {area}, None)
+    key = f"hm:stats:{area}:{'hits' if hit else 'misses'}"
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def cached(area, namespaces, vary, builder, timeout=None):
+    """Return ``builder()``, cached under ``area`` until ``namespaces`` change."""
+    key = make_key(area, namespaces, *vary)
+    value = cache.get(key, _MISSING)
+    _record(area, value is not _MISSING)
+    if value is _MISSING:
+        value = builder()
+        cache.set(key, value, CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+class Fragment:
+    """A template fragment cache slot, rendered by ``{% cachedfragment %}``."""
+
+    def __init__(self, area, namespaces, *vary, timeout=None):
+        self.area = area
+        self.key = make_key(area, namespaces, *vary)
+        self.timeout = CACHE_TIMEOUT if timeout is None else timeout
+
+    def render(self, render):
+        html = cache.get(self.key)
+        _record(self.area, html is not None)
+        if html is None:
+            html = render()
+            cache.set(self.key, html, self.timeout)
+        return html
+
+
+def cache_stats():
+    """Hit and miss counts per cached area, with the hit rate."""
+    areas = sorted(cache.get(_AREAS_KEY, set()) | _areas)
+    keys = {
+        f'hm:stats:{area}:{kind}': (area, kind)
+        for area in areas
+        for kind in ('hits', 'misses')
+    }
+    counts = cache.get_many(keys)
+    stats = {area: {'hits': 0, 'misses': 0} for area in areas}
+    for key, (area, kind) in keys.items():
+        stats[area][kind] = counts.get(key, 0)
+    for entry in stats.values():
+        total = entry['hits'] + entry['misses']
+        entry['hit_rate'] = round(entry['hits'] / total, 3) if total else None
+    return stats
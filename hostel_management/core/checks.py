@@ -0,0 +1,26 @@
+from django.core.checks import Error, Tags, register
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+
+from .search import missing_search_index
+
+# The migration that installs the index; before it runs there is nothing to check
+SEARCH_INDEX_MIGRATION = ('core', '0010_search_index')
+
+
+@register(Tags.database)
+def check_search_index(app_configs, databases=None, **kwargs):
+    """The full-text tables and triggers exist; migrations that rebuild a source table drop them."""
+    errors = []
+    for alias in databases or ():
+        connection = connections[alias]
+        if SEARCH_INDEX_MIGRATION not in MigrationRecorder(connection).applied_migrations():
+            continue
+        missing = missing_search_index(connection)
+        if missing:
+            errors.append(Error(
+                f"The full-text search index is incomplete: {', '.join(missing)} missing.",
+                hint='Run "python manage.py rebuild_search_index".',
+                id='core.E001',
+            ))
+    return errors
@@ -0,0 +1,107 @@
+import csv
+import datetime
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_CHUNK_SIZE = 2000
+
+# kind -> (column, value path) pairs, in file order
+EXPORT_COLUMNS = {
+    'payments': (
+        ('id', 'id'),
+        ('student', 'student__username'),
+        ('room', 'room_allocation__room__room_number'),
+        ('payment_type', 'payment_type'),
+        ('amount', 'amount'),
+        ('status', 'status'),
+        ('due_date', 'due_date'),
+        ('payment_date', 'payment_date'),
+        ('transaction_id', 'transaction_id'),
+        ('payment_method', 'payment_method'),
+        ('remarks', 'remarks'),
+        ('created_at', 'created_at'),
+    ),
+    'allocations': (
+        ('id', 'id'),
+        ('student', 'student__username'),
+        ('room', 'room__room_number'),
+        ('check_in_date', 'check_in_date'),
+        ('check_out_date', 'check_out_date'),
+        ('is_active', 'is_active'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ),
+    'complaints': (
+        ('id', 'id'),
+        ('title', 'title'),
+        ('category', 'category'),
+        ('status', 'status'),
+        ('room', 'room__room_number'),
+        ('reported_by', 'reported_by__username'),
+        ('assigned_to', 'assigned_to__username'),
+        ('description', 'description'),
+        ('resolution', 'resolution'),
+        ('created_at', 'created_at'),
+        ('resolved_at', 'resolved_at'),
+    ),
+}
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def export_queryset(queryset, kind, ordering):
+    """``queryset`` as tuples of ``kind``'s export columns, in ``ordering``."""
+    paths = [path for _, path in EXPORT_COLUMNS[kind]]
+    return queryset.order_by(*ordering).values_list(*paths)
+
+
+def export_rows(queryset, kind, ordering, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Rows of export_queryset(), fetched ``chunk_size`` at a time.
+
+    Rows come straight from the cursor as tuples, so no model instances are
+    built and memory stays flat however many rows there are.
+    """
+    return export_queryset(queryset, kind, ordering).iterator(chunk_size=chunk_size)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def render_export(rows, kind, fmt, rows_per_chunk=EXPORT_CHUNK_SIZE):
+    """Yield ``rows`` as CSV or JSON Lines text, ``rows_per_chunk`` rows per piece."""
+    columns = [column for column, _ in EXPORT_COLUMNS[kind]]
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for count, row in enumerate(rows, start=1):
+            writer.writerow([_csv_value(value) for value in row])
+            if count % rows_per_chunk == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+        return
+
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder))
+        if len(lines) >= rows_per_chunk:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_filename(kind, fmt, today):
+    return f'{kind}-{today.isoformat()}.{fmt}'
@@ -0,0 +1,419 @@
+import csv
+import datetime
+import json
+import os
+import secrets
+import time
+import zipfile
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from rooms.models import Room, RoomAllocation
+from users.models import User
+from .caching import invalidate_on_commit
+from .models import Payment
+
+IMPORT_BATCH_SIZE = 1000
+LOOKUP_CHUNK_SIZE = 500
+LOOKUP_CACHE_SIZE = 50000
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class ImportResult:
+    kind: str
+    line: int = 1  # last line read, the header being line 1
+    created: int = 0
+    skipped: int = 0  # rows whose key already exists
+    failed: int = 0
+    errors: list = field(default_factory=list)  # the first MAX_REPORTED_ERRORS (line, message) pairs
+    elapsed: float = 0.0
+    dry_run: bool = False
+
+    @property
+    def rows(self):
+        return self.created + self.skipped + self.failed
+
+
+class _Lookup:
+    """
+    Ids of rows by ``key``, resolved for a whole batch at once.
+
+    Keys seen once stay cached for later batches, misses included, until the
+    cache holds ``size`` keys and starts over.
+    """
+
+    def __init__(self, queryset, key, size=LOOKUP_CACHE_SIZE):
+        self.queryset = queryset
+        self.key = key
+        self.size = size
+        self._ids = {}
+
+    def load(self, keys):
+        missing = sorted({key for key in keys if key and key not in self._ids})
+        if len(self._ids) + len(missing) > self.size:
+            self._ids.clear()
+        for offset in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+            chunk = missing[offset:offset + LOOKUP_CHUNK_SIZE]
+            self._ids.update(dict.fromkeys(chunk))
+            self._ids.update(
+                self.queryset.filter(**{f'{self.key}__in': chunk}).order_by().values_list(self.key, 'id')
+            )
+
+    def get(self, key):
+        return self._ids.get(key)
+
+
+def _clean(model_field, raw):
+    """``raw`` converted and validated by ``model_field``, choices included; blank cells take the default."""
+    value = (raw or '').strip()
+    if not value:
+        if model_field.has_default():
+            return model_field.get_default()
+        if not model_field.blank:
+            raise ValidationError(model_field.error_messages['blank'], code='blank')
+        return None if model_field.null else ''
+    return model_field.clean(value, None)
+
+
+class RowImporter:
+    """
+    Turns CSV rows into unsaved instances of ``model``.
+
+    ``fields`` are the columns cleaned by the model field of the same name.
+    Rows whose ``key_field`` already exists are skipped, so importing the
+    same file twice creates nothing the second time. ``namespaces`` are the
+    caches the rows' bulk insert must invalidate, as it sends no signals.
+    """
+    model = None
+    fields = ()
+    key_field = None
+    namespaces = ()
+
+    def columns(self):
+        return self.fields
+
+    def required_columns(self):
+        return [
+            name for name in self.fields
+            if not self.model._meta.get_field(name).blank and not self.model._meta.get_field(name).has_default()
+        ]
+
+    def prepare(self, rows):
+        """Resolve the foreign keys of a batch of rows before it is cleaned."""
+
+    def clean(self, row):
+        values, errors = {}, {}
+        for name in self.fields:
+            try:
+                values[name] = _clean(self.model._meta.get_field(name), row.get(name))
+            except ValidationError as exc:
+                errors[name] = exc.messages
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+    def build(self, values):
+        return self.model(**values)
+
+    def key(self, obj):
+        return getattr(obj, self.key_field) if self.key_field else None
+
+    def existing(self, keys):
+        keys = [key for key in keys if key]
+        if not keys:
+            return set()
+        return set(self.model.objects.filter(**{f'{self.key_field}__in': keys}).values_list(self.key_field, flat=True))
+
+
+class RoomImporter(RowImporter):
+    model = Room
+    fields = ('room_number', 'floor', 'room_type', 'capacity', 'monthly_rent', 'status', 'description')
+    key_field = 'room_number'
+    namespaces = ('room', 'typeahead-room')
+
+
+class StudentImporter(RowImporter):
+    """Students get an unusable password; they set one through the admin or a password reset."""
+    model = User
+    fields = ('username', 'first_name', 'last_name', 'email', 'phone_number', 'address',
+              'date_of_birth', 'emergency_contact')
+    key_field = 'username'
+    namespaces = ('typeahead-user',)
+
+    def build(self, values):
+        # What set_unusable_password() stores, without its slow per-character random choice
+        password = UNUSABLE_PASSWORD_PREFIX + secrets.token_urlsafe(30)
+        return User(user_type='student', password=password, **values)
+
+
+class PaymentImporter(RowImporter):
+    """
+    Payments name their student by username and are tied to the student's
+    current allocation. Only rows with a transaction_id can be recognised as
+    already imported.
+    """
+    model = Payment
+    fields = ('payment_type', 'amount', 'status', 'due_date', 'payment_date', 'transaction_id',
+              'payment_method', 'remarks')
+    key_field = 'transaction_id'
+    namespaces = ('payment',)
+
+    def __init__(self):
+        self.students = _Lookup(User.objects.filter(user_type='student'), 'username')
+        self.allocations = _Lookup(RoomAllocation.objects.current(), 'student_id')
+
+    def columns(self):
+        return ('student', *self.fields)
+
+    def required_columns(self):
+        return ['student', *super().required_columns()]
+
+    def prepare(self, rows):
+        usernames = [(row.get('student') or '').strip() for row in rows]
+        self.students.load(usernames)
+        self.allocations.load(self.students.get(username) for username in usernames)
+
+    def clean(self, row):
+        username = (row.get('student') or '').strip()
+        student_id = self.students.get(username)
+        try:
+            values = super().clean(row)
+        except ValidationError as exc:
+            if student_id is None:
+                exc.error_dict['student'] = [ValidationError(f'Unknown student {username!r}.')]
+            raise
+        if student_id is None:
+            raise ValidationError({'student': f'Unknown student {username!r}.'})
+        if values['payment_date'] and timezone.is_naive(values['payment_date']):
+            values['payment_date'] = timezone.make_aware(values['payment_date'])
+        values['student_id'] = student_id
+        values['room_allocation_id'] = self.allocations.get(student_id)
+        return values
+
+
+IMPORTERS = {
+    'rooms': RoomImporter,
+    'students': StudentImporter,
+    'payments': PaymentImporter,
+}
+
+
+def _cell(value):
+    """A spreadsheet cell as the text a CSV export of it would hold."""
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat() if value.time() == datetime.time.min else value.isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _xlsx_rows(binary):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ValidationError('Reading .xlsx files needs the openpyxl package; save the sheet as CSV instead.')
+    try:
+        workbook = load_workbook(binary, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError) as exc:
+        raise ValidationError(f'The file is not a readable .xlsx workbook ({exc}).')
+    for line, values in enumerate(workbook.worksheets[0].iter_rows(values_only=True), start=1):
+        yield line, [_cell(value) for value in values]
+
+
+def _text_lines(binary):
+    """Decode ``binary`` a line at a time, so an encoding error can name its line."""
+    for line, raw in enumerate(binary, start=1):
+        try:
+            yield raw.decode('utf-8-sig' if line == 1 else 'utf-8')
+        except UnicodeDecodeError:
+            raise ValidationError(f'Line {line} is not valid UTF-8; save the file as "CSV UTF-8" and try again.')
+
+
+def _csv_rows(binary):
+    reader = csv.reader(_text_lines(binary))
+    try:
+        for values in reader:
+            yield reader.line_num, values
+    except csv.Error as exc:
+        raise ValidationError(f'Line {reader.line_num} cannot be read as CSV ({exc}).')
+
+
+def read_rows(binary, name):
+    """
+    ``(header, rows)`` of a CSV or .xlsx file, rows being ``(line, {column: text})``.
+
+    Rows are read lazily, so a file of any size is held one batch at a time.
+    Only the first sheet of a workbook is read. A file that cannot be
+    decoded or parsed raises ValidationError naming the line, when it is
+    reached.
+    """
+    lines = _xlsx_rows(binary) if name.lower().endswith('.xlsx') else _csv_rows(binary)
+    _, header = next(lines, (1, []))
+    header = [column.strip().lower() for column in header]
+    rows = (
+        (line, dict(zip(header, values)))
+        for line, values in lines
+        if any(value.strip() for value in values)
+    )
+    return header, rows
+
+
+def read_checkpoint(path, kind, source):
+    """Counts of a previous run of the same import, or None to start at the top."""
+    try:
+        with open(path, encoding='utf-8') as checkpoint:
+            state = json.load(checkpoint)
+    except FileNotFoundError:
+        return None
+    if state.get('kind') != kind or state.get('source') != os.path.basename(source):
+        raise ValidationError(f"Checkpoint {path} belongs to a {state.get('kind')} import of {state.get('source')}.")
+    return state
+
+
+def write_checkpoint(path, result, source):
+    """Record the committed progress of ``result``, replacing the file atomically."""
+    state = {
+        'kind': result.kind, 'source': os.path.basename(source), 'line': result.line,
+        'created': result.created, 'skipped': result.skipped, 'failed': result.failed,
+    }
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as checkpoint:
+        json.dump(state, checkpoint)
+    os.replace(f'{path}.tmp', path)
+
+
+class _Batch:
+    def __init__(self, importer, result, error_writer, header):
+        self.importer = importer
+        self.result = result
+        self.error_writer = error_writer
+        self.header = header
+
+    def fail(self, line, row, message):
+        self.result.failed += 1
+        if len(self.result.errors) < MAX_REPORTED_ERRORS:
+            self.result.errors.append((line, message))
+        if self.error_writer is not None:
+            self.error_writer.writerow([line, message, *(row.get(column, '') for column in self.header)])
+
+    def run(self, rows, dry_run, batch_size):
+        importer = self.importer
+        importer.prepare([row for _, row in rows])
+        pending, keys = [], {}
+        for line, row in rows:
+            try:
+                obj = importer.build(importer.clean(row))
+            except ValidationError as exc:
+                self.fail(line, row, _describe(exc))
+                continue
+            key = importer.key(obj)
+            if key and key in keys:
+                self.fail(line, row, f'Duplicate of line {keys[key]}.')
+                continue
+            if key:
+                keys[key] = line
+            pending.append((line, row, obj))
+
+        existing = importer.existing(keys)
+        self.result.skipped += sum(1 for *_, obj in pending if importer.key(obj) in existing)
+        pending = [entry for entry in pending if importer.key(entry[2]) not in existing]
+        if dry_run:
+            self.result.created += len(pending)
+            return
+        try:
+            with transaction.atomic():
+                importer.model.objects.bulk_create([obj for *_, obj in pending], batch_size=batch_size)
+                invalidate_on_commit(*importer.namespaces)
+            self.result.created += len(pending)
+        except IntegrityError:
+            # Another writer got in between; save row by row to find the conflicting ones
+            self.save_each(pending)
+
+    def save_each(self, pending):
+        with transaction.atomic():
+            for line, row, obj in pending:
+                try:
+                    with transaction.atomic():
+                        obj.save(force_insert=True)
+                    self.result.created += 1
+                except IntegrityError as exc:
+                    self.fail(line, row, str(exc))
+            invalidate_on_commit(*self.importer.namespaces)
+
+
+def _describe(error):
+    if hasattr(error, 'error_dict'):
+        return '; '.join(f"{name}: {' '.join(messages)}" for name, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+def import_rows(kind, binary, name, dry_run=False, batch_size=IMPORT_BATCH_SIZE, checkpoint=None,
+                error_file=None, progress=None):
+    """
+    Stream the rows of ``binary`` into ``kind`` records, ``batch_size`` rows per transaction.
+
+    Each batch resolves its foreign keys with one query per relation, is
+    validated against the model fields and their choices, and is written
+    with one ``bulk_create``. Failed rows go to ``error_file`` as CSV with
+    their line number and reason. After every committed batch the
+    ``checkpoint`` file records how far the import got, and a run given an
+    existing checkpoint resumes after that line. ``progress`` is called with
+    the result after each batch.
+    """
+    started = time.monotonic()
+    importer = IMPORTERS[kind]()
+    result = ImportResult(kind, dry_run=dry_run)
+    header, rows = read_rows(binary, name)
+    missing = [column for column in importer.required_columns() if column not in header]
+    if missing:
+        raise ValidationError(f"Missing column{'s' if len(missing) > 1 else ''}: {', '.join(missing)}.")
+
+    resume_after = 1
+    if checkpoint and not dry_run:
+        state = read_checkpoint(checkpoint, kind, name)
+        if state:
+            resume_after = state['line']
+            result.line = state['line']
+            result.created, result.skipped, result.failed = state['created'], state['skipped'], state['failed']
+
+    error_writer = None
+    if error_file is not None:
+        error_writer = csv.writer(error_file)
+        error_writer.writerow(['line', 'error', *header])
+    batch = _Batch(importer, result, error_writer, header)
+
+    def flush(rows):
+        batch.run(rows, dry_run, batch_size)
+        result.line = rows[-1][0]
+        result.elapsed = time.monotonic() - started
+        if checkpoint and not dry_run:
+            write_checkpoint(checkpoint, result, name)
+        if progress:
+            progress(result)
+
+    chunk = []
+    try:
+        for line, row in rows:
+            if line <= resume_after:
+                continue
+            chunk.append((line, row))
+            if len(chunk) >= batch_size:
+                flush(chunk)
+                chunk = []
+    except ValidationError as exc:
+        if result.line > resume_after and not dry_run:
+            raise ValidationError(f'{exc.messages[0]} Rows up to line {result.line} were imported.')
+        raise
+    if chunk:
+        flush(chunk)
+    result.elapsed = time.monotonic() - started
+    return result
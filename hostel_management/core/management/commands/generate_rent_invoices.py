@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.billing import INVOICE_BATCH_SIZE, billing_period, generate_rent_invoices
+
+
+class Command(BaseCommand):
+    help = "Create a month's prorated rent payments for every active allocation; safe to run repeatedly."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', help='Month to bill as YYYY-MM; defaults to the current month.')
+        parser.add_argument('--dry-run', action='store_true', help='Report the invoices without creating them.')
+        parser.add_argument('--batch-size', type=int, default=INVOICE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            period = billing_period(options['period'] or timezone.localdate())
+        except ValueError:
+            raise CommandError(f"Invalid period '{options['period']}'; use YYYY-MM.")
+
+        result = generate_rent_invoices(period, dry_run=options['dry_run'], batch_size=options['batch_size'])
+        verb = 'Would create' if result.dry_run else 'Created'
+        timings = ', '.join(f'{phase} {seconds:.2f}s' for phase, seconds in result.timings.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result.created} rent invoices for {result.period:%B %Y} totalling {result.amount} "
+            f"({result.prorated} prorated); {result.existing} of {result.allocations} allocations "
+            f"were already invoiced. Took {result.elapsed:.2f}s ({timings})."
+        ))
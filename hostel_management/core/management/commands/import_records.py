@@ -0,0 +1,53 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.imports import IMPORT_BATCH_SIZE, IMPORTERS, import_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream rooms, students or payments from a CSV or .xlsx file into the database in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('file', help='CSV (UTF-8) or .xlsx file with a header row of column names.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing any.')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows per transaction.')
+        parser.add_argument('--checkpoint', help='JSON file recording progress; an existing one resumes the import.')
+        parser.add_argument('--errors', help='Write failed rows, with their line and reason, to this CSV file.')
+
+    def progress(self, result):
+        rate = result.rows / result.elapsed if result.elapsed else 0
+        self.stdout.write(
+            f'Line {result.line}: {result.created} created, {result.skipped} skipped, '
+            f'{result.failed} failed ({rate:.0f} rows/s)'
+        )
+
+    def handle(self, *args, **options):
+        error_file = None
+        try:
+            if options['errors']:
+                error_file = open(options['errors'], 'w', newline='', encoding='utf-8')
+            with open(options['file'], 'rb') as binary:
+                result = import_rows(
+                    options['kind'], binary, options['file'], dry_run=options['dry_run'],
+                    batch_size=options['batch_size'], checkpoint=options['checkpoint'],
+                    error_file=error_file, progress=self.progress,
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except ValidationError as exc:
+            raise CommandError(' '.join(exc.messages))
+        finally:
+            if error_file is not None:
+                error_file.close()
+
+        for line, message in result.errors:
+            self.stdout.write(self.style.WARNING(f'Line {line}: {message}'))
+        if result.failed > len(result.errors):
+            more = result.failed - len(result.errors)
+            self.stdout.write(self.style.WARNING(f'... and {more} more; see --errors for the full report.'))
+        verb = 'Would create' if result.dry_run else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.created} {result.kind}, skipped {result.skipped} existing, '
+            f'{result.failed} failed, in {result.elapsed:.2f}s.'
+        ))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Recreate the full-text search index and its triggers, then reindex every complaint, maintenance record and notification.'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        install_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f'Search index rebuilt on {connection.vendor} in {time.monotonic() - started:.2f}s.'
+        ))
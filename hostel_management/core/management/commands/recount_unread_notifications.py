@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.notifications import recount_unread_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute every user\'s unread notification counter from the notification tables.'
+
+    def handle(self, *args, **options):
+        updated = recount_unread_counts()
+        self.stdout.write(self.style.SUCCESS(f'Recounted unread notifications for {updated} users.'))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import DELIVERY_BATCH_SIZE, release_scheduled_notifications, sweep_expired_notifications
+
+
+class Command(BaseCommand):
+    help = 'Release scheduled notifications when due and sweep expired ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--expired', choices=('archive', 'delete'), default='archive',
+                            help='What to do with deliveries of expired notifications.')
+        parser.add_argument('--batch-size', type=int, default=DELIVERY_BATCH_SIZE, help='Rows written per transaction.')
+        parser.add_argument('--interval', type=float, default=60.0, help='Seconds to sleep between passes.')
+        parser.add_argument('--once', action='store_true', help='Run a single pass instead of polling.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            released = release_scheduled_notifications(batch_size=options['batch_size'])
+            swept = sweep_expired_notifications(mode=options['expired'], batch_size=options['batch_size'])
+            if released or swept:
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"Released {released} and {'archived' if options['expired'] == 'archive' else 'deleted'} "
+                    f'{swept} deliveries in {elapsed:.3f}s.'
+                )
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import process_complaint_notification_queue
+
+
+class Command(BaseCommand):
+    help = 'Drain the complaint notification queue, batching and coalescing events per complaint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Jobs claimed per transaction.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty instead of polling.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            jobs, created = process_complaint_notification_queue(options['batch_size'])
+            if jobs:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'Dispatched {jobs} jobs as {created} notifications in {elapsed:.3f}s.')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.reporting import snapshot_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Roll up daily occupancy and revenue snapshots, processing only what changed since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute every day instead of only changed ones.')
+
+    def handle(self, *args, **options):
+        result = snapshot_daily_stats(rebuild=options['rebuild'])
+        revenue_days = 'all' if result.revenue_days is None else result.revenue_days
+        self.stdout.write(self.style.SUCCESS(
+            f'Occupancy: {result.occupancy_days} days, {result.occupancy_rows} rows. '
+            f'Revenue: {revenue_days} days, {result.revenue_rows} rows. '
+            f'Took {result.elapsed:.2f}s.'
+        ))
@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_unread_counts(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Notification = apps.get_model('core', 'Notification')
+    read = Notification.read_by.through.objects.filter(
+        notification_id=OuterRef('notification_id'),
+        user_id=OuterRef('user_id'),
+    )
+    unread = (
+        Notification.recipients.through.objects
+        .exclude(Exists(read))
+        .filter(user_id=OuterRef('pk'))
+        .values('user_id')
+        .annotate(unread=Count('pk'))
+        .values('unread')
+    )
+    User.objects.update(unread_notification_count=Coalesce(Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_initial'),
+        ('users', '0004_user_unread_notification_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_unread_counts, migrations.RunPython.noop),
+    ]
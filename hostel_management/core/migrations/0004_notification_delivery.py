@@ -0,0 +1,103 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def copy_recipients_to_deliveries(apps, schema_editor):
+    """One delivery per recipients row; rows also in read_by are marked read."""
+    Notification = apps.get_model('core', 'Notification')
+    NotificationDelivery = apps.get_model('core', 'NotificationDelivery')
+    read = set(Notification.read_by.through.objects.values_list('notification_id', 'user_id'))
+    links = (
+        Notification.recipients.through.objects
+        .values_list('notification_id', 'user_id', 'notification__created_at', 'notification__updated_at')
+        .order_by('pk')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    batch = []
+    for notification_id, user_id, created_at, updated_at in links:
+        batch.append(NotificationDelivery(
+            notification_id=notification_id,
+            recipient_id=user_id,
+            delivered_at=created_at,
+            # mark_as_read() saved the notification, so updated_at is the best read time we have.
+            read_at=updated_at if (notification_id, user_id) in read else None,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            NotificationDelivery.objects.bulk_create(batch)
+            batch = []
+    NotificationDelivery.objects.bulk_create(batch)
+
+
+def copy_deliveries_to_recipients(apps, schema_editor):
+    Notification = apps.get_model('core', 'Notification')
+    NotificationDelivery = apps.get_model('core', 'NotificationDelivery')
+    Recipient = Notification.recipients.through
+    ReadBy = Notification.read_by.through
+    recipients, read_by = [], []
+    for delivery in NotificationDelivery.objects.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        recipients.append(Recipient(notification_id=delivery.notification_id, user_id=delivery.recipient_id))
+        if delivery.read_at is not None:
+            read_by.append(ReadBy(notification_id=delivery.notification_id, user_id=delivery.recipient_id))
+    Recipient.objects.bulk_create(recipients, batch_size=BATCH_SIZE)
+    ReadBy.objects.bulk_create(read_by, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_populate_unread_notification_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivered_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('dismissed', models.BooleanField(default=False)),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='core.notification')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_deliveries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notification Delivery',
+                'verbose_name_plural': 'Notification Deliveries',
+                'ordering': ['-delivered_at', '-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notificationdelivery',
+            index=models.Index(fields=['recipient', 'read_at'], name='delivery_recipient_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationdelivery',
+            index=models.Index(fields=['recipient', '-delivered_at'], name='delivery_recipient_inbox_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationdelivery',
+            constraint=models.UniqueConstraint(fields=('notification', 'recipient'), name='unique_notification_delivery'),
+        ),
+        migrations.RunPython(copy_recipients_to_deliveries, copy_deliveries_to_recipients),
+        migrations.RemoveField(
+            model_name='notification',
+            name='read_by',
+        ),
+        # Django cannot switch an existing M2M to a through model, so the old
+        # join table is dropped and the field re-added on top of the new table.
+        migrations.RemoveField(
+            model_name='notification',
+            name='recipients',
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='recipients',
+            field=models.ManyToManyField(related_name='received_notifications', through='core.NotificationDelivery', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_notification_delivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOccupancySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('floor', models.PositiveIntegerField()),
+                ('room_type', models.CharField(choices=[('single', 'Single'), ('double', 'Double'), ('triple', 'Triple'), ('quad', 'Quad')], max_length=10)),
+                ('rooms', models.PositiveIntegerField(default=0)),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('occupied', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Daily Occupancy Snapshot',
+                'verbose_name_plural': 'Daily Occupancy Snapshots',
+                'ordering': ['-date', 'floor', 'room_type'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'floor', 'room_type'), name='unique_occupancy_snapshot')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRevenueSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('payment_type', models.CharField(choices=[('rent', 'Room Rent'), ('deposit', 'Security Deposit'), ('maintenance', 'Maintenance Fee'), ('utility', 'Utility Bill'), ('other', 'Other Charges')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed'), ('refunded', 'Refunded')], max_length=20)),
+                ('room_type', models.CharField(blank=True, choices=[('single', 'Single'), ('double', 'Double'), ('triple', 'Triple'), ('quad', 'Quad')], max_length=10)),
+                ('payments', models.PositiveIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Daily Revenue Snapshot',
+                'verbose_name_plural': 'Daily Revenue Snapshots',
+                'ordering': ['-date', 'payment_type', 'status'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'payment_type', 'status', 'room_type'), name='unique_revenue_snapshot')],
+            },
+        ),
+    ]
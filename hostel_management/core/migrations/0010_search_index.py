@@ -0,0 +1,72 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:35
+
+import core.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from core.search import drop_search_index, install_search_index
+
+
+def install(apps, schema_editor):
+    install_search_index(schema_editor.connection)
+
+
+def drop(apps, schema_editor):
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_daily_snapshots'),
+        ('rooms', '0004_allocation_interval_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintSearchEntry',
+            fields=[
+                ('rank', models.FloatField()),
+                ('complaint', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='core.complaint')),
+                ('document', core.models.FullTextField(db_column='core_complaint_fts')),
+            ],
+            options={
+                'db_table': 'core_complaint_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MaintenanceSearchEntry',
+            fields=[
+                ('rank', models.FloatField()),
+                ('maintenance', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='rooms.roommaintenance')),
+                ('document', core.models.FullTextField(db_column='rooms_roommaintenance_fts')),
+            ],
+            options={
+                'db_table': 'rooms_roommaintenance_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationSearchEntry',
+            fields=[
+                ('rank', models.FloatField()),
+                ('notification', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='core.notification')),
+                ('document', core.models.FullTextField(db_column='core_notification_fts')),
+            ],
+            options={
+                'db_table': 'core_notification_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['transaction_id'], name='payment_transaction_idx'),
+        ),
+        migrations.RunPython(install, drop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_rent_billing_period'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaintnotificationjob',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='complaintnotificationjob',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
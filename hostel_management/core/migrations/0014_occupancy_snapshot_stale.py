@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_revenue_snapshot_stale'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyoccupancysnapshot',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
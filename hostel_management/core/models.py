@@ -1,6 +1,12 @@
 from django.db import models
+from django.utils import timezone
 from users.models import User
-from rooms.models import Room, RoomAllocation
+from rooms.models import Room, RoomAllocation, RoomMaintenance
+
+class PaymentQuerySet(models.QuerySet):
+    def for_list(self):
+        """Fetch profile for payment tables, which show the student."""
+        return self.select_related('student')
 
 class Payment(models.Model):
     PAYMENT_TYPE_CHOICES = (
@@ -28,13 +34,36 @@ class Payment(models.Model):
     transaction_id = models.CharField(max_length=100, blank=True)
     payment_method = models.CharField(max_length=50, blank=True)
     remarks = models.TextField(blank=True)
+    # First day of the month a generated rent invoice covers; None for other payments
+    billing_period = models.DateField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PaymentQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
         ordering = ['-due_date', 'status']
+        indexes = [
+            # payment_list: keyset ordering, alone and after the status or type filter
+            models.Index(fields=['-due_date', 'id'], name='payment_due_idx'),
+            models.Index(fields=['status', '-due_date', 'id'], name='payment_status_due_idx'),
+            models.Index(fields=['payment_type', '-due_date', 'id'], name='payment_type_due_idx'),
+            # payment_list: search by transaction reference
+            models.Index(fields=['transaction_id'], name='payment_transaction_idx'),
+            # dashboard and student_detail: most recent payments
+            models.Index(fields=['-created_at'], name='payment_created_idx'),
+            models.Index(fields=['student', '-created_at'], name='payment_student_created_idx'),
+            # snapshot_daily_stats and the revenue chart: payments saved since the last run, by paid day
+            models.Index(fields=['updated_at'], name='payment_updated_idx'),
+            models.Index(fields=['payment_date'], name='payment_paid_idx'),
+        ]
+        constraints = [
+            # One generated rent invoice per allocation and month
+            models.UniqueConstraint(fields=['billing_period', 'room_allocation'], name='unique_rent_invoice',
+                                    condition=models.Q(billing_period__isnull=False)),
+        ]
 
     def __str__(self):
         return f'Payment - {self.student.get_full_name()} ({self.get_payment_type_display()})'
@@ -60,8 +89,7 @@ class Notification(models.Model):
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPE_CHOICES)
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_notifications')
-    recipients = models.ManyToManyField(User, related_name='received_notifications')
-    read_by = models.ManyToManyField(User, related_name='read_notifications', blank=True)
+    recipients = models.ManyToManyField(User, through='NotificationDelivery', related_name='received_notifications')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     scheduled_for = models.DateTimeField(null=True, blank=True)
@@ -71,13 +99,93 @@ class Notification(models.Model):
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
         ordering = ['-created_at', 'priority']
+        indexes = [
+            models.Index(fields=['scheduled_for'], name='notification_scheduled_idx',
+                         condition=models.Q(scheduled_for__isnull=False)),
+            models.Index(fields=['expires_at'], name='notification_expires_idx',
+                         condition=models.Q(expires_at__isnull=False)),
+        ]
 
     def __str__(self):
         return f'{self.title} ({self.get_notification_type_display()})'
 
+    def is_pending(self, when=None):
+        return self.scheduled_for is not None and self.scheduled_for > (when or timezone.now())
+
     def mark_as_read(self, user):
-        self.read_by.add(user)
-        self.save()
+        from .notifications import mark_read
+        return mark_read(self.deliveries.filter(recipient=user))
+
+class NotificationDeliveryQuerySet(models.QuerySet):
+    def delivered(self):
+        return self.filter(delivered_at__isnull=False)
+
+    def pending(self):
+        """Deliveries held back until their notification's scheduled_for."""
+        return self.filter(delivered_at__isnull=True)
+
+    def unread(self):
+        return self.delivered().filter(read_at__isnull=True)
+
+    def inbox(self):
+        return self.delivered().filter(dismissed=False, archived_at__isnull=True)
+
+    def archived(self):
+        return self.delivered().filter(dismissed=False, archived_at__isnull=False)
+
+    def live(self, when=None):
+        """Exclude deliveries whose notification has expired but not been swept yet."""
+        return self.filter(
+            models.Q(notification__expires_at__isnull=True) |
+            models.Q(notification__expires_at__gt=when or timezone.now())
+        )
+
+    def for_list(self):
+        """Fetch profile for notification lists, which show the notification and sender."""
+        return self.select_related('notification', 'notification__sender')
+
+class NotificationDelivery(models.Model):
+    """One row per notification and recipient, carrying that recipient's read state."""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='deliveries')
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_deliveries')
+    delivered_at = models.DateTimeField(default=timezone.now, null=True, blank=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+    dismissed = models.BooleanField(default=False)
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    objects = NotificationDeliveryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Notification Delivery'
+        verbose_name_plural = 'Notification Deliveries'
+        ordering = ['-delivered_at', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'recipient'], name='unique_notification_delivery'),
+        ]
+        indexes = [
+            models.Index(fields=['recipient', 'read_at'], name='delivery_recipient_read_idx'),
+            models.Index(fields=['recipient', '-delivered_at', '-id'], name='delivery_recipient_inbox_idx'),
+            models.Index(fields=['notification'], name='delivery_pending_idx',
+                         condition=models.Q(delivered_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f'{self.notification.title} -> {self.recipient.username}'
+
+    def is_read(self):
+        return self.read_at is not None
+
+    def is_delivered(self):
+        return self.delivered_at is not None
+
+class ComplaintQuerySet(models.QuerySet):
+    def open(self):
+        """Complaints still being worked on; matches the complaint_open_idx partial index."""
+        return self.filter(status__in=['open', 'in_progress'])
+
+    def for_list(self):
+        """Fetch profile for complaint pages, which show the reporter, assignee and room."""
+        return self.select_related('reported_by', 'assigned_to', 'room')
 
 class Complaint(models.Model):
     STATUS_CHOICES = (
@@ -108,10 +216,153 @@ class Complaint(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ComplaintQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Complaint'
         verbose_name_plural = 'Complaints'
         ordering = ['-created_at', 'status']
+        indexes = [
+            # complaint_list: keyset ordering, alone and after the status or category filter
+            models.Index(fields=['-created_at', '-id'], name='complaint_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='complaint_status_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='complaint_category_idx'),
+            # Open complaints are a small, hot slice of the table
+            models.Index(fields=['-created_at', '-id'], name='complaint_open_idx',
+                         condition=models.Q(status__in=['open', 'in_progress'])),
+            # student_detail: complaints reported by a student
+            models.Index(fields=['reported_by', '-created_at'], name='complaint_reporter_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title} - {self.get_category_display()}'
+
+class ComplaintNotificationJob(models.Model):
+    """Queued complaint event, fanned out to notifications by the notification worker."""
+    ACTION_CHOICES = (
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('assigned', 'Assigned'),
+        ('resolved', 'Resolved'),
+    )
+
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='notification_jobs')
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when dispatching failed; parked jobs are left for an admin instead of being retried
+    failed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Complaint Notification Job'
+        verbose_name_plural = 'Complaint Notification Jobs'
+        ordering = ['id']
+
+    def __str__(self):
+        return f'{self.get_action_display()} - Complaint {self.complaint_id}'
+
+class DailyOccupancySnapshot(models.Model):
+    """Occupancy of one floor and room type on one day, rolled up by snapshot_daily_stats."""
+    date = models.DateField()
+    floor = models.PositiveIntegerField()
+    room_type = models.CharField(max_length=10, choices=Room.ROOM_TYPE_CHOICES)
+    rooms = models.PositiveIntegerField(default=0)
+    capacity = models.PositiveIntegerField(default=0)
+    occupied = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+    # Set when an allocation leaves the day, so the next run recomputes from it
+    stale = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = 'Daily Occupancy Snapshot'
+        verbose_name_plural = 'Daily Occupancy Snapshots'
+        ordering = ['-date', 'floor', 'room_type']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'floor', 'room_type'], name='unique_occupancy_snapshot'),
+        ]
+
+    def __str__(self):
+        return f'{self.date} - Floor {self.floor} {self.get_room_type_display()}: {self.occupied}/{self.capacity}'
+
+    @property
+    def occupancy_rate(self):
+        return self.occupied / self.capacity if self.capacity else 0
+
+class DailyRevenueSnapshot(models.Model):
+    """
+    Payments of one type, status and room type on one day, rolled up by snapshot_daily_stats.
+
+    A payment belongs to the day it was paid, or to its due date while unpaid.
+    """
+    date = models.DateField()
+    payment_type = models.CharField(max_length=20, choices=Payment.PAYMENT_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=Payment.PAYMENT_STATUS_CHOICES)
+    room_type = models.CharField(max_length=10, choices=Room.ROOM_TYPE_CHOICES, blank=True)
+    payments = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    computed_at = models.DateTimeField()
+    # Set when a payment leaves the day, so the next run recomputes it
+    stale = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = 'Daily Revenue Snapshot'
+        verbose_name_plural = 'Daily Revenue Snapshots'
+        ordering = ['-date', 'payment_type', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'payment_type', 'status', 'room_type'],
+                                    name='unique_revenue_snapshot'),
+        ]
+
+    def __str__(self):
+        return f'{self.date} - {self.get_payment_type_display()} ({self.status}): {self.amount}'
+
+class FullTextField(models.TextField):
+    """The hidden column named after an FTS5 table; filter it with ``__match``."""
+
+@FullTextField.register_lookup
+class FullTextMatch(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+class SearchEntry(models.Model):
+    """
+    A row of a SQLite FTS5 search index, joined to its source by rowid.
+
+    The tables and the triggers filling them are created by core.search, not
+    by migrations. ``rank`` is only defined while the query also matches
+    ``document``; lower is better.
+    """
+    rank = models.FloatField()
+
+    class Meta:
+        abstract = True
+        managed = False
+
+class ComplaintSearchEntry(SearchEntry):
+    complaint = models.OneToOneField(Complaint, on_delete=models.DO_NOTHING, primary_key=True,
+                                     db_column='rowid', related_name='search_entry')
+    document = FullTextField(db_column='core_complaint_fts')
+
+    class Meta(SearchEntry.Meta):
+        db_table = 'core_complaint_fts'
+
+class MaintenanceSearchEntry(SearchEntry):
+    maintenance = models.OneToOneField(RoomMaintenance, on_delete=models.DO_NOTHING, primary_key=True,
+                                       db_column='rowid', related_name='search_entry')
+    document = FullTextField(db_column='rooms_roommaintenance_fts')
+
+    class Meta(SearchEntry.Meta):
+        db_table = 'rooms_roommaintenance_fts'
+
+class NotificationSearchEntry(SearchEntry):
+    notification = models.OneToOneField(Notification, on_delete=models.DO_NOTHING, primary_key=True,
+                                        db_column='rowid', related_name='search_entry')
+    document = FullTextField(db_column='core_notification_fts')
+
+    class Meta(SearchEntry.Meta):
+        db_table = 'core_notification_fts'
@@ -0,0 +1,435 @@
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import islice
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from rooms.models import RoomAllocation
+from users.models import User
+from .models import Complaint, ComplaintNotificationJob, Notification, NotificationDelivery
+
+DELIVERY_BATCH_SIZE = 1000
+
+
+def shift_unread_counts(deltas):
+    """Apply ``{user_id: delta}`` to the unread counters, one UPDATE per distinct delta."""
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        User.objects.filter(pk__in=user_ids).update(
+            unread_notification_count=Greatest(F('unread_notification_count') + delta, Value(0))
+        )
+
+
+def count_by_recipient(deliveries):
+    """Return ``{recipient_id: rows}`` for ``deliveries`` in one grouped query."""
+    rows = (
+        deliveries
+        .values('recipient_id')
+        .annotate(rows=Count('pk'))
+        .order_by()
+    )
+    return Counter({row['recipient_id']: row['rows'] for row in rows})
+
+
+def count_unread(deliveries):
+    """Return ``{recipient_id: unread}`` for ``deliveries`` in one grouped query."""
+    return count_by_recipient(deliveries.unread())
+
+
+def _update_and_read(deliveries, when=None, **changes):
+    """
+    Apply ``changes`` to ``deliveries``, marking them read as well.
+
+    Rows keep an existing read_at. Unread rows are flipped one recipient at a
+    time by an UPDATE guarded on read_at IS NULL, and that recipient's counter
+    is lowered by the UPDATE's rowcount in the same transaction, so a
+    concurrent read, dismiss or archive of the same rows finds nothing left
+    to flip and cannot lower the counter twice. The remaining rows, already
+    read or still pending, then get ``changes`` in one more UPDATE; ``changes``
+    should take rows out of ``deliveries`` so this one does not repeat them.
+    """
+    when = when or timezone.now()
+    updated = 0
+    with transaction.atomic():
+        recipient_ids = deliveries.unread().order_by().values_list('recipient_id', flat=True).distinct()
+        for recipient_id in list(recipient_ids):
+            flipped = deliveries.unread().filter(recipient_id=recipient_id).update(read_at=when, **changes)
+            shift_unread_counts({recipient_id: -flipped})
+            updated += flipped
+        if changes:
+            updated += deliveries.update(read_at=Coalesce(F('read_at'), Value(when)), **changes)
+    return updated
+
+
+def mark_read(deliveries, when=None):
+    """Mark the unread ``deliveries`` read with one UPDATE and lower their recipients' counters."""
+    return _update_and_read(deliveries.unread(), when)
+
+
+def dismiss(deliveries, when=None):
+    """Hide ``deliveries`` from every list; dismissed notifications count as read."""
+    return _update_and_read(deliveries.filter(dismissed=False), when, dismissed=True)
+
+
+def archive(deliveries, when=None):
+    """Move ``deliveries`` out of the inbox into the archive, marking them read."""
+    when = when or timezone.now()
+    return _update_and_read(deliveries.inbox(), when, archived_at=when)
+
+
+BULK_ACTIONS = {
+    'read': (mark_read, 'marked as read'),
+    'dismiss': (dismiss, 'dismissed'),
+    'archive': (archive, 'archived'),
+}
+
+
+def recount_unread_counts(users=None):
+    """Recompute unread counters from the delivery table with one UPDATE."""
+    unread = (
+        NotificationDelivery.objects.unread()
+        .filter(recipient_id=OuterRef('pk'))
+        .values('recipient_id')
+        .annotate(unread=Count('pk'))
+        .values('unread')
+    )
+    if users is None:
+        users = User.objects.all()
+    return users.update(unread_notification_count=Coalesce(Subquery(unread), 0))
+
+
+def stream_ids(queryset, batch_size=DELIVERY_BATCH_SIZE):
+    """Yield primary keys of ``queryset`` in pk order, reading ``batch_size`` rows per query."""
+    last_pk = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield from ids
+        last_pk = ids[-1]
+
+
+def create_deliveries(pairs, batch_size=DELIVERY_BATCH_SIZE, pending=False):
+    """
+    Bulk-insert unread deliveries for ``(notification_id, recipient_id)`` pairs.
+
+    Each chunk of ``batch_size`` rows is written, and its recipients' unread
+    counters raised, in its own short transaction, so large fan-outs never
+    hold a write lock for long. ``pending`` deliveries are held back for the
+    scheduler and leave the counters alone. Returns the number of rows written.
+    """
+    written = 0
+    pairs = iter(pairs)
+    while True:
+        chunk = list(islice(pairs, batch_size))
+        if not chunk:
+            return written
+        with transaction.atomic():
+            NotificationDelivery.objects.bulk_create([
+                NotificationDelivery(
+                    notification_id=notification_id,
+                    recipient_id=recipient_id,
+                    delivered_at=None if pending else timezone.now(),
+                )
+                for notification_id, recipient_id in chunk
+            ])
+            if not pending:
+                shift_unread_counts(Counter(recipient_id for _, recipient_id in chunk))
+        written += len(chunk)
+
+
+def complaint_notification_text(complaint, action):
+    """Return the ``(title, message)`` announcing ``action`` on ``complaint``."""
+    if action == 'created':
+        return (f'New Complaint: {complaint.title}',
+                f'A new complaint has been reported regarding {complaint.get_category_display()}')
+    if action == 'assigned':
+        return (f'Complaint Assigned: {complaint.title}',
+                f'The complaint has been assigned to {complaint.assigned_to.get_full_name()}')
+    if action == 'resolved':
+        return (f'Complaint Resolved: {complaint.title}',
+                'The complaint has been marked as resolved')
+    return (f'Complaint Updated: {complaint.title}',
+            f'The complaint status has been updated to {complaint.get_status_display()}')
+
+
+def enqueue_complaint_notifications(complaint, actions, sender):
+    """Queue complaint events for the notification worker with a single INSERT."""
+    ComplaintNotificationJob.objects.bulk_create([
+        ComplaintNotificationJob(complaint=complaint, action=action, sender=sender)
+        for action in actions
+    ])
+
+
+def _complaint_notification(complaint, actions, sender_id):
+    """The one notification coalescing ``actions`` on ``complaint``, or None if none is left to announce."""
+    if complaint.assigned_to_id is None:
+        # The assignee was cleared after the job was queued; there is no one to name
+        actions = [action for action in actions if action != 'assigned']
+    if not actions:
+        return None
+    texts = [complaint_notification_text(complaint, action) for action in actions]
+    if len(texts) == 1 or actions[0] == 'created':
+        title = texts[0][0]
+    else:
+        title = f'Complaint Updated: {complaint.title}'
+    return Notification(
+        title=title,
+        message='\n'.join(message for _, message in texts),
+        notification_type='complaint',
+        priority='medium',
+        sender_id=sender_id,
+    )
+
+
+def _write_complaint_notifications(entries):
+    Notification.objects.bulk_create([notification for _, notification, _ in entries])
+    create_deliveries(
+        (notification.pk, recipient_id)
+        for _, notification, recipient_ids in entries
+        for recipient_id in recipient_ids
+    )
+
+
+def dispatch_complaint_notifications(jobs):
+    """
+    Turn queued complaint events into notifications, set-wise.
+
+    Events for the same complaint are coalesced into one notification.
+    Recipients (the reporter, the assignee and the room's current occupants)
+    are resolved for the whole batch with one query each and de-duplicated
+    per notification. A complaint whose notification cannot be built or
+    written is left out without affecting the others. Returns
+    ``(notifications created, {complaint_id: error})``.
+    """
+    actions_by_complaint = defaultdict(list)
+    sender_by_complaint = {}
+    for job in jobs:
+        if job.action not in actions_by_complaint[job.complaint_id]:
+            actions_by_complaint[job.complaint_id].append(job.action)
+        sender_by_complaint[job.complaint_id] = job.sender_id
+
+    complaints = Complaint.objects.select_related('assigned_to').in_bulk(list(actions_by_complaint))
+    occupants = defaultdict(set)
+    room_ids = {complaint.room_id for complaint in complaints.values() if complaint.room_id}
+    for room_id, student_id in (
+        RoomAllocation.objects.current().filter(room_id__in=room_ids).values_list('room_id', 'student_id')
+    ):
+        occupants[room_id].add(student_id)
+
+    entries, failures = [], {}
+    for complaint_id, actions in actions_by_complaint.items():
+        complaint = complaints.get(complaint_id)
+        if complaint is None:
+            continue
+        try:
+            notification = _complaint_notification(complaint, actions, sender_by_complaint[complaint_id])
+        except Exception as exc:
+            failures[complaint_id] = f'{type(exc).__name__}: {exc}'
+            continue
+        if notification is not None:
+            recipients = ({complaint.reported_by_id, complaint.assigned_to_id} | occupants[complaint.room_id]) - {None}
+            entries.append((complaint_id, notification, recipients))
+
+    try:
+        with transaction.atomic():
+            _write_complaint_notifications(entries)
+        return len(entries), failures
+    except DatabaseError:
+        pass
+
+    # Something in the batch was rejected; write one complaint per savepoint to isolate it
+    created = 0
+    for entry in entries:
+        entry[1].pk = None
+        try:
+            with transaction.atomic():
+                _write_complaint_notifications([entry])
+            created += 1
+        except DatabaseError as exc:
+            failures[entry[0]] = f'{type(exc).__name__}: {exc}'
+    return created, failures
+
+
+def process_complaint_notification_queue(batch_size=500):
+    """
+    Claim up to ``batch_size`` queued jobs, dispatch them and delete them.
+
+    Runs in one transaction. Where the backend supports it, claimed rows are
+    locked with SKIP LOCKED so several workers can drain the queue together.
+    Jobs of a complaint that failed to dispatch are parked with their error
+    rather than deleted, and are not claimed again, so one bad job cannot
+    hold up the queue. Returns ``(jobs, notifications)`` processed.
+    """
+    with transaction.atomic():
+        jobs = ComplaintNotificationJob.objects.filter(failed_at__isnull=True).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            jobs = jobs.select_for_update(skip_locked=True)
+        jobs = list(jobs[:batch_size])
+        if not jobs:
+            return 0, 0
+        created, failures = dispatch_complaint_notifications(jobs)
+        now = timezone.now()
+        for complaint_id, error in failures.items():
+            ComplaintNotificationJob.objects.filter(
+                pk__in=[job.pk for job in jobs if job.complaint_id == complaint_id],
+            ).update(failed_at=now, error=error)
+        ComplaintNotificationJob.objects.filter(
+            pk__in=[job.pk for job in jobs if job.complaint_id not in failures],
+        ).delete()
+    return len(jobs), created
+
+
+@dataclass(frozen=True)
+class BroadcastResult:
+    notification: Notification
+    recipients: int
+    elapsed: float
+
+    @property
+    def rate(self):
+        """Deliveries written per second."""
+        return self.recipients / self.elapsed if self.elapsed else float(self.recipients)
+
+
+def announcement_recipients(user_type=None, floor=None, room_number=None):
+    """Active users to announce to, optionally narrowed to a user type and a floor or room."""
+    users = User.objects.filter(is_active=True)
+    if user_type:
+        users = users.filter(user_type=user_type)
+    if floor is not None or room_number:
+        allocations = RoomAllocation.objects.current()
+        if floor is not None:
+            allocations = allocations.filter(room__floor=floor)
+        if room_number:
+            allocations = allocations.filter(room__room_number=room_number)
+        users = users.filter(pk__in=allocations.values('student_id'))
+    return users
+
+
+def broadcast_announcement(title, message, sender, recipients=None, priority='medium',
+                           scheduled_for=None, expires_at=None, batch_size=DELIVERY_BATCH_SIZE):
+    """
+    Send an announcement to every user in ``recipients`` (default: all active users).
+
+    Recipient ids are streamed in pk order and written as delivery rows in
+    chunks of ``batch_size``; nothing proportional to the audience is held
+    in memory or in a single statement. Announcements scheduled for later
+    are written as pending deliveries for the scheduler to release.
+    """
+    started = time.monotonic()
+    if recipients is None:
+        recipients = announcement_recipients()
+    notification = Notification.objects.create(
+        title=title,
+        message=message,
+        notification_type='announcement',
+        priority=priority,
+        sender=sender,
+        scheduled_for=scheduled_for,
+        expires_at=expires_at,
+    )
+    delivered = create_deliveries(
+        ((notification.pk, recipient_id) for recipient_id in stream_ids(recipients, batch_size)),
+        batch_size,
+        pending=notification.is_pending(),
+    )
+    return BroadcastResult(notification, delivered, time.monotonic() - started)
+
+
+def release_deliveries(deliveries, when=None):
+    """Deliver pending ``deliveries`` now and raise their recipients' unread counters."""
+    when = when or timezone.now()
+    with transaction.atomic():
+        deliveries = deliveries.pending()
+        unread = count_by_recipient(deliveries.filter(read_at__isnull=True))
+        released = deliveries.update(delivered_at=when)
+        shift_unread_counts(unread)
+    return released
+
+
+def hold_deliveries(deliveries):
+    """Turn delivered ``deliveries`` back into pending ones, lowering the unread counters."""
+    with transaction.atomic():
+        deliveries = deliveries.delivered()
+        unread = count_unread(deliveries)
+        held = deliveries.update(delivered_at=None)
+        shift_unread_counts({recipient_id: -rows for recipient_id, rows in unread.items()})
+    return held
+
+
+def apply_schedule(notification, when=None):
+    """Hold or release ``notification``'s deliveries to match its scheduled_for."""
+    if notification.is_pending(when):
+        return hold_deliveries(notification.deliveries.all())
+    return release_deliveries(notification.deliveries.all(), when)
+
+
+def release_scheduled_notifications(when=None, batch_size=DELIVERY_BATCH_SIZE):
+    """
+    Release pending deliveries whose notification is due, ``batch_size`` rows per transaction.
+
+    Due notifications are found through the partial scheduled_for index and
+    their pending rows through the partial pending index. Notifications that
+    expired before they were released stay pending for the sweeper.
+    Returns the number of deliveries released.
+    """
+    when = when or timezone.now()
+    due = Notification.objects.filter(scheduled_for__lte=when).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=when)
+    )
+    pending = NotificationDelivery.objects.pending().filter(notification__in=due)
+    released = 0
+    while True:
+        ids = list(pending.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return released
+        released += release_deliveries(NotificationDelivery.objects.filter(pk__in=ids), when)
+
+
+def sweep_expired_notifications(when=None, mode='archive', batch_size=DELIVERY_BATCH_SIZE):
+    """
+    Archive or delete deliveries of expired notifications, ``batch_size`` rows at a time.
+
+    ``archive`` moves the rows out of the inbox and marks them read.
+    ``delete`` marks them read first, so the per-row delete signal has no
+    counter left to fix, then deletes them along with the emptied
+    notifications. Returns the number of deliveries swept.
+    """
+    when = when or timezone.now()
+    expired = Notification.objects.filter(expires_at__lte=when)
+    if mode == 'archive':
+        targets = NotificationDelivery.objects.filter(
+            notification__in=expired, dismissed=False, archived_at__isnull=True,
+        )
+    elif mode == 'delete':
+        targets = NotificationDelivery.objects.filter(notification__in=expired)
+    else:
+        raise ValueError(f'Unknown expiry mode: {mode!r}')
+
+    swept = 0
+    while True:
+        ids = list(targets.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        batch = NotificationDelivery.objects.filter(pk__in=ids)
+        with transaction.atomic():
+            if mode == 'archive':
+                # Pending rows get a delivery time so the archive list can order them.
+                _update_and_read(batch.filter(archived_at__isnull=True), when, archived_at=when,
+                                 delivered_at=Coalesce(F('delivered_at'), Value(when)))
+            else:
+                mark_read(batch, when)
+                batch.delete()
+        swept += len(ids)
+
+    if mode == 'delete':
+        expired.filter(deliveries__isnull=True).delete()
+    return swept
@@ -0,0 +1,165 @@
+import base64
+import binascii
+import datetime
+import json
+import operator
+from decimal import Decimal
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _cursor_value(value):
+    # Full-precision ISO strings; DjangoJSONEncoder would drop microseconds.
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+def estimate_count(queryset, cap=1000):
+    """
+    Return ``(count, capped)`` without a full COUNT(*) scan.
+
+    PostgreSQL answers from the planner's row estimate. Other backends count
+    at most ``cap`` rows, so ``capped`` tells the caller there may be more.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows']), False
+    count = queryset[:cap + 1].count()
+    return min(count, cap), count > cap
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None,
+                 total_estimate=None, total_capped=False):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total_estimate = total_estimate
+        self.total_capped = total_capped
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset paginator for large, append-mostly lists.
+
+    Pages are addressed by an opaque cursor holding the ordering values of the
+    boundary row, so every page is a bounded index range scan no matter how
+    deep it is, and no COUNT(*) is issued. ``ordering`` must end in a unique,
+    non-null column (normally ``id``) so that the order is total. Numeric
+    annotations, such as a search rank, may be ordered on as well.
+    """
+
+    def __init__(self, queryset, ordering, per_page, estimate_total=False):
+        self.per_page = int(per_page)
+        self.ordering = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self.queryset = queryset.order_by(*ordering)
+        self.estimate_total = estimate_total
+
+    def encode_cursor(self, obj, direction):
+        values = [getattr(obj, name) for name, _ in self.ordering]
+        payload = json.dumps({'d': direction, 'v': values}, default=_cursor_value, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _to_python(self, name, value):
+        try:
+            return self.queryset.model._meta.get_field(name).to_python(value)
+        except FieldDoesNotExist:
+            # An annotation such as a search rank; only numbers survive the JSON round trip
+            if not isinstance(value, (int, float)):
+                raise ValueError(value)
+            return value
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            direction, raw_values = payload['d'], payload['v']
+            if direction not in ('next', 'prev') or len(raw_values) != len(self.ordering):
+                raise ValueError(cursor)
+            values = [self._to_python(name, value) for (name, _), value in zip(self.ordering, raw_values)]
+        except (binascii.Error, ValidationError, ValueError, TypeError, KeyError) as exc:
+            raise InvalidCursor(f'Invalid cursor: {cursor!r}') from exc
+        return direction, values
+
+    def _seek(self, values, reverse):
+        """Return the predicate selecting rows strictly after ``values``."""
+        clauses = []
+        for position, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            equal = {prior: value for (prior, _), value in zip(self.ordering[:position], values)}
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': values[position]}))
+        return reduce(operator.or_, clauses)
+
+    def get_page(self, cursor=None):
+        """Return the page after (or before) ``cursor``; bad cursors give the first page."""
+        direction, values = 'next', None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                pass
+
+        reverse = direction == 'prev'
+        queryset = self.queryset.reverse() if reverse else self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            if not has_more:
+                # Walked back to the start, show a full first page.
+                return self.get_page()
+            rows.reverse()
+            has_next, has_previous = True, True
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        page = CursorPage(
+            rows,
+            self,
+            next_cursor=self.encode_cursor(rows[-1], 'next') if rows and has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], 'prev') if rows and has_previous else None,
+        )
+        if self.estimate_total:
+            page.total_estimate, page.total_capped = estimate_count(self.queryset)
+        return page
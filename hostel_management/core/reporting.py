@@ -0,0 +1,360 @@
+import datetime
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Count, DateField, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Trunc, TruncDate
+from django.utils import timezone
+
+from rooms.availability import occupancy_by_day
+from rooms.models import Room, RoomAllocation, RoomMaintenance
+from .caching import cached
+from .models import Complaint, DailyOccupancySnapshot, DailyRevenueSnapshot, Payment
+
+SNAPSHOT_BATCH_SIZE = 1000
+DAYS_PER_QUERY = 200
+
+# range key -> (days covered, bucket size)
+CHART_RANGES = {
+    '30d': (30, 'day'),
+    '90d': (90, 'week'),
+    '12m': (365, 'month'),
+}
+DEFAULT_CHART_RANGE = '90d'
+CHART_CACHE_TIMEOUT = 300
+
+
+@dataclass(frozen=True)
+class SnapshotResult:
+    occupancy_days: int
+    occupancy_rows: int
+    revenue_days: int  # None when every day was rebuilt
+    revenue_rows: int
+    elapsed: float
+
+
+def _days(start, end):
+    return [start + datetime.timedelta(days=offset) for offset in range((end - start).days)]
+
+
+def snapshot_occupancy(start, end, computed_at):
+    """
+    Rebuild occupancy snapshots for ``[start, end)``.
+
+    Daily head counts come from one interval query over the allocations and
+    are summed per floor and room type in memory. Room counts and capacity
+    are today's, as rooms keep no history. Returns the number of rows written.
+    """
+    days = (end - start).days
+    if days <= 0:
+        return 0
+    occupancy = occupancy_by_day(start, end)
+    groups = defaultdict(lambda: {'rooms': 0, 'capacity': 0, 'occupied': [0] * days})
+    for room_id, floor, room_type, capacity in Room.objects.order_by().values_list(
+        'id', 'floor', 'room_type', 'capacity',
+    ):
+        group = groups[floor, room_type]
+        group['rooms'] += 1
+        group['capacity'] += capacity
+        for offset, count in enumerate(occupancy.get(room_id, ())):
+            group['occupied'][offset] += count
+
+    snapshots = [
+        DailyOccupancySnapshot(
+            date=date, floor=floor, room_type=room_type, rooms=group['rooms'],
+            capacity=group['capacity'], occupied=group['occupied'][offset], computed_at=computed_at,
+        )
+        for (floor, room_type), group in sorted(groups.items())
+        for offset, date in enumerate(_days(start, end))
+    ]
+    with transaction.atomic():
+        DailyOccupancySnapshot.objects.filter(date__gte=start, date__lt=end).delete()
+        DailyOccupancySnapshot.objects.bulk_create(snapshots, batch_size=SNAPSHOT_BATCH_SIZE)
+    return len(snapshots)
+
+
+def revenue_day(due_date, payment_date):
+    """The day a payment is reported on: the day it was paid, or its due date while unpaid."""
+    return timezone.localdate(payment_date) if payment_date else due_date
+
+
+def _revenue_day():
+    """revenue_day() as an expression over a payment's columns."""
+    return Coalesce(TruncDate('payment_date'), F('due_date'), output_field=DateField())
+
+
+def mark_revenue_days_stale(days):
+    """Flag the snapshots of ``days`` for the next incremental snapshot_daily_stats run."""
+    return DailyRevenueSnapshot.objects.filter(date__in=days, stale=False).update(stale=True)
+
+
+def mark_occupancy_stale(day):
+    """
+    Flag the occupancy snapshots from ``day`` on for the next incremental run.
+
+    Runs rebuild everything after the first stale day, so only the first
+    snapshotted day on or after ``day`` is flagged.
+    """
+    first = DailyOccupancySnapshot.objects.filter(date__gte=day).aggregate(first=Min('date'))['first']
+    if first is None:
+        return 0
+    return DailyOccupancySnapshot.objects.filter(date=first, stale=False).update(stale=True)
+
+
+def _revenue_rows(payments, computed_at):
+    rows = (
+        payments
+        .values('day', 'payment_type', 'status', 'snapshot_room_type')
+        .annotate(payments=Count('pk'), amount=Sum('amount'))
+        .order_by()
+    )
+    return [
+        DailyRevenueSnapshot(
+            date=row['day'], payment_type=row['payment_type'], status=row['status'],
+            room_type=row['snapshot_room_type'], payments=row['payments'], amount=row['amount'],
+            computed_at=computed_at,
+        )
+        for row in rows
+    ]
+
+
+def snapshot_revenue(days, computed_at):
+    """
+    Rebuild revenue snapshots for ``days`` (every day when None).
+
+    Each chunk of days is one GROUP BY over payments, replaced in its own
+    transaction. Returns the number of rows written.
+    """
+    payments = Payment.objects.annotate(
+        day=_revenue_day(),
+        snapshot_room_type=Coalesce(F('room_allocation__room__room_type'), Value('')),
+    )
+    if days is None:
+        rows = _revenue_rows(payments, computed_at)
+        with transaction.atomic():
+            DailyRevenueSnapshot.objects.all().delete()
+            DailyRevenueSnapshot.objects.bulk_create(rows, batch_size=SNAPSHOT_BATCH_SIZE)
+        return len(rows)
+
+    written = 0
+    days = sorted(days)
+    for offset in range(0, len(days), DAYS_PER_QUERY):
+        chunk = days[offset:offset + DAYS_PER_QUERY]
+        rows = _revenue_rows(payments.filter(day__in=chunk), computed_at)
+        with transaction.atomic():
+            DailyRevenueSnapshot.objects.filter(date__in=chunk).delete()
+            DailyRevenueSnapshot.objects.bulk_create(rows, batch_size=SNAPSHOT_BATCH_SIZE)
+        written += len(rows)
+    return written
+
+
+def changed_occupancy_start(since, last_date, today):
+    """First day whose occupancy snapshot may be stale, or None on a first run."""
+    if since is None or last_date is None:
+        return None
+    start = min(last_date + datetime.timedelta(days=1), today)
+    changed = RoomAllocation.objects.filter(updated_at__gt=since).aggregate(first=Min('check_in_date'))['first']
+    stale = DailyOccupancySnapshot.objects.filter(stale=True).aggregate(first=Min('date'))['first']
+    for day in (changed, stale):
+        if day is not None:
+            start = min(start, day)
+    if Room.objects.filter(updated_at__gt=since).exists():
+        start = min(start, today)
+    return start
+
+
+def changed_revenue_days(since):
+    """
+    Days whose revenue snapshots may be stale since ``since``.
+
+    Those are the due date and payment date of payments saved after
+    ``since``, plus the days flagged stale when a payment moved off them
+    (its due_date or payment_date was edited) or was deleted.
+    """
+    changed = Payment.objects.filter(updated_at__gt=since)
+    days = set(changed.values_list('due_date', flat=True).distinct())
+    days.update(
+        changed.filter(payment_date__isnull=False)
+        .annotate(day=TruncDate('payment_date'))
+        .values_list('day', flat=True)
+        .distinct()
+    )
+    days.update(DailyRevenueSnapshot.objects.filter(stale=True).values_list('date', flat=True).distinct())
+    return days
+
+
+def snapshot_daily_stats(rebuild=False, today=None):
+    """
+    Bring both snapshot tables up to date, processing only what changed.
+
+    Each table's newest computed_at is its watermark. Occupancy is rebuilt
+    from the earliest check-in among allocations saved since then, or the
+    first day allocation signals flagged stale (else the day after the last
+    snapshot), up to today; revenue is rebuilt for the days of payments
+    saved since then and the days payment signals flagged stale. ``rebuild``
+    recomputes everything, which is also what happens on the first run.
+    Check-ins and payment dates moved through QuerySet.update(), which sends
+    no signals, are only picked up by a rebuild.
+    """
+    started = time.monotonic()
+    computed_at = timezone.now()
+    today = today or timezone.localdate()
+    end = today + datetime.timedelta(days=1)
+
+    occupancy = DailyOccupancySnapshot.objects.aggregate(since=Max('computed_at'), last_date=Max('date'))
+    start = None if rebuild else changed_occupancy_start(occupancy['since'], occupancy['last_date'], today)
+    if start is None:
+        first = RoomAllocation.objects.aggregate(first=Min('check_in_date'))['first']
+        start = min(first, today) if first else today
+        DailyOccupancySnapshot.objects.filter(date__lt=start).delete()
+    occupancy_rows = snapshot_occupancy(start, end, computed_at)
+
+    since = None if rebuild else DailyRevenueSnapshot.objects.aggregate(since=Max('computed_at'))['since']
+    revenue_days = None if since is None else changed_revenue_days(since)
+    revenue_rows = snapshot_revenue(revenue_days, computed_at)
+
+    return SnapshotResult(
+        occupancy_days=(end - start).days,
+        occupancy_rows=occupancy_rows,
+        revenue_days=len(revenue_days) if revenue_days is not None else None,
+        revenue_rows=revenue_rows,
+        elapsed=time.monotonic() - started,
+    )
+
+
+def _bucket_start(date, bucket):
+    if bucket == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    if bucket == 'month':
+        return date.replace(day=1)
+    return date
+
+
+def _buckets(start, today, bucket):
+    buckets, current = [], start
+    while current <= today:
+        buckets.append(current)
+        if bucket == 'month':
+            current = (current.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        else:
+            current += datetime.timedelta(days=7 if bucket == 'week' else 1)
+    return buckets
+
+
+def _series(queryset, field, bucket, buckets, **aggregates):
+    """
+    Aggregate ``queryset`` per ``bucket`` of ``field`` with one GROUP BY.
+
+    Returns ``{name: [value per bucket]}`` with empty buckets as zero.
+    """
+    rows = (
+        queryset
+        .annotate(bucket=Trunc(field, bucket, output_field=DateField()))
+        .values('bucket')
+        .annotate(**aggregates)
+        .order_by()
+    )
+    by_bucket = {row['bucket']: row for row in rows}
+    return {
+        name: [float(by_bucket.get(start, {}).get(name) or 0) for start in buckets]
+        for name in aggregates
+    }
+
+
+def _since(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+
+
+def _day_runs(days):
+    """Collapse sorted ``days`` into ``(first, end)`` runs of consecutive days, ``end`` exclusive."""
+    runs = []
+    for day in days:
+        if runs and runs[-1][1] == day:
+            runs[-1][1] = day + datetime.timedelta(days=1)
+        else:
+            runs.append([day, day + datetime.timedelta(days=1)])
+    return runs
+
+
+def _payments_on(days):
+    """
+    Payments whose revenue day is one of ``days``, filtered on the raw columns.
+
+    Unpaid payments are matched on due_date ranges and paid ones on
+    payment_date ranges, so each side can use an index.
+    """
+    matches = Q()
+    for first, end in _day_runs(days):
+        matches |= Q(payment_date__isnull=True, due_date__gte=first, due_date__lt=end)
+        matches |= Q(payment_date__gte=_since(first), payment_date__lt=_since(end))
+    return Payment.objects.filter(matches)
+
+
+def _revenue_series(start, today, bucket, buckets):
+    """
+    Payment amounts per ``bucket`` by revenue day, from the snapshots where they are current.
+
+    Past days are summed from DailyRevenueSnapshot; today, and the past days
+    changed since the last snapshot run, are aggregated from payments.
+    Without snapshots every day is.
+    """
+    aggregates = {'due': Sum('amount'), 'collected': Sum('amount', filter=Q(status='completed'))}
+    since = DailyRevenueSnapshot.objects.aggregate(since=Max('computed_at'))['since']
+    if since is None:
+        live_days, snapshots = _days(start, today), None
+    else:
+        live_days = sorted(day for day in changed_revenue_days(since) if start <= day < today)
+        snapshots = _series(
+            DailyRevenueSnapshot.objects.filter(date__gte=start, date__lt=today).exclude(date__in=live_days),
+            'date', bucket, buckets, **aggregates,
+        )
+    live = _series(
+        _payments_on(live_days + [today]).annotate(day=_revenue_day()),
+        'day', bucket, buckets, **aggregates,
+    )
+    if snapshots is None:
+        return live
+    return {name: [a + b for a, b in zip(snapshots[name], live[name])] for name in aggregates}
+
+
+def build_chart_data(range_key, today):
+    """Time-bucketed payment, complaint and maintenance aggregates for ``range_key``."""
+    days, bucket = CHART_RANGES[range_key]
+    start = _bucket_start(today - datetime.timedelta(days=days - 1), bucket)
+    buckets = _buckets(start, today, bucket)
+    until = today + datetime.timedelta(days=1)
+
+    complaints = _series(
+        Complaint.objects.filter(created_at__gte=_since(start), created_at__lt=_since(until)),
+        'created_at', bucket, buckets, opened=Count('pk'),
+    )
+    complaints.update(_series(
+        Complaint.objects.filter(resolved_at__gte=_since(start), resolved_at__lt=_since(until)),
+        'resolved_at', bucket, buckets, resolved=Count('pk'),
+    ))
+    return {
+        'range': range_key,
+        'bucket': bucket,
+        'labels': [start.isoformat() for start in buckets],
+        'payments': _revenue_series(start, today, bucket, buckets),
+        'complaints': complaints,
+        'maintenance': _series(
+            RoomMaintenance.objects.filter(scheduled_date__gte=start, scheduled_date__lte=today),
+            'scheduled_date', bucket, buckets,
+            scheduled=Count('pk'), completed=Count('pk', filter=Q(status='completed')),
+        ),
+    }
+
+
+def get_chart_data(range_key=DEFAULT_CHART_RANGE, today=None):
+    """Chart data for ``range_key``, cached per range and day until the charted rows change."""
+    if range_key not in CHART_RANGES:
+        range_key = DEFAULT_CHART_RANGE
+    today = today or timezone.localdate()
+    return cached(
+        'dashboard_charts', ('payment', 'complaint', 'maintenance'), (range_key, today.isoformat()),
+        lambda: build_chart_data(range_key, today),
+        CHART_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,171 @@
+import re
+
+from django.apps import apps
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Func, Q, TextField, Value
+
+# kind -> (search entry model, indexed fields of its source); on PostgreSQL the first field weighs most
+SEARCH_SOURCES = {
+    'complaint': ('core.ComplaintSearchEntry', ('title', 'description')),
+    'maintenance': ('core.MaintenanceSearchEntry', ('description', 'remarks')),
+    'notification': ('core.NotificationSearchEntry', ('title', 'message')),
+}
+SEARCH_CONFIG = 'english'
+MAX_TERMS = 8
+
+_TERM = re.compile(r'\w+')
+
+
+def search_terms(query):
+    """Words of ``query``; everything else is dropped, so no input can break the match syntax."""
+    return _TERM.findall(query.lower())[:MAX_TERMS]
+
+
+def _source(kind):
+    label, fields = SEARCH_SOURCES[kind]
+    entry = apps.get_model(label)
+    return entry, entry._meta.pk.related_model, fields
+
+
+def _weighted(field, weight):
+    return f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({field}, '')), '{weight}')"
+
+
+def _document_sql(fields):
+    """The indexed tsvector; _Document must compile to the same expression for the index to apply."""
+    return ' || '.join(_weighted(f'"{field}"', weight) for field, weight in zip(fields, 'ABCD'))
+
+
+class _Document(Func):
+    arg_joiner = ' || '
+    template = '(%(expressions)s)'
+    output_field = TextField()
+
+    def __init__(self, *fields):
+        super().__init__(*[
+            Func(F(field), template=_weighted('%(expressions)s', weight), output_field=TextField())
+            for field, weight in zip(fields, 'ABCD')
+        ])
+
+
+class _TsQuery(Func):
+    template = f"to_tsquery('{SEARCH_CONFIG}', %(expressions)s)"
+    output_field = TextField()
+
+
+class _TsMatch(Func):
+    arg_joiner = ' @@ '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def _sqlite_statements(entry, source, fields):
+    table = source._meta.db_table
+    fts = entry._meta.db_table
+    columns = ', '.join(fields)
+    new = ', '.join(f'new.{field}' for field in fields)
+    old = ', '.join(f'old.{field}' for field in fields)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old});"
+    insert = f'INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new});'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', "
+        f"content_rowid='id', tokenize='porter unicode61')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {table} BEGIN {delete} {insert} END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _postgresql_statements(entry, source, fields):
+    table = source._meta.db_table
+    return [f'CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING gin (({_document_sql(fields)}))']
+
+
+def install_search_index(connection):
+    """
+    Create or repair the full-text index of every search source and fill it.
+
+    SQLite gets an external-content FTS5 table per source, kept in step by
+    triggers so set-based writes are indexed too. Migrations that rebuild a
+    source table drop its triggers; run ``rebuild_search_index`` after them.
+    PostgreSQL gets a GIN index over a weighted tsvector of the source, which
+    it maintains itself. Other databases fall back to substring matching.
+    """
+    builders = {'sqlite': _sqlite_statements, 'postgresql': _postgresql_statements}
+    if connection.vendor not in builders:
+        return
+    with connection.cursor() as cursor:
+        for kind in SEARCH_SOURCES:
+            for statement in builders[connection.vendor](*_source(kind)):
+                cursor.execute(statement)
+
+
+def drop_search_index(connection):
+    """Remove what install_search_index() created."""
+    with connection.cursor() as cursor:
+        for kind in SEARCH_SOURCES:
+            entry, source, _ = _source(kind)
+            if connection.vendor == 'sqlite':
+                fts = entry._meta.db_table
+                for trigger in ('insert', 'delete', 'update'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {fts}_{trigger}')
+                cursor.execute(f'DROP TABLE IF EXISTS {fts}')
+            elif connection.vendor == 'postgresql':
+                cursor.execute(f'DROP INDEX IF EXISTS {source._meta.db_table}_search_idx')
+
+
+def missing_search_index(connection):
+    """Names of the full-text tables, triggers or indexes install_search_index() would create but are missing."""
+    expected = set()
+    for kind in SEARCH_SOURCES:
+        entry, source, _ = _source(kind)
+        if connection.vendor == 'sqlite':
+            fts = entry._meta.db_table
+            expected.update([fts, f'{fts}_insert', f'{fts}_delete', f'{fts}_update'])
+        elif connection.vendor == 'postgresql':
+            expected.add(f'{source._meta.db_table}_search_idx')
+    if not expected:
+        return []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        else:
+            cursor.execute('SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()')
+        present = {row[0] for row in cursor.fetchall()}
+    return sorted(expected - present)
+
+
+def search(queryset, kind, query, field=None):
+    """
+    Narrow ``queryset`` to rows whose ``kind`` source matches ``query``, annotated with ``search_rank``.
+
+    ``field`` is the relation from ``queryset``'s model to the source, None
+    when they are the same. Every term must appear, as a word or a word
+    prefix. Higher ranks are better matches. On SQLite the query is driven
+    from the FTS5 table through an inner join, so only matching rows are
+    read; on PostgreSQL the match and rank use the indexed tsvector.
+    """
+    entry, source, fields = _source(kind)
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    prefix = f'{field}__' if field else ''
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(**{f'{prefix}search_entry__document__match': match}).annotate(
+            search_rank=-F(f'{prefix}search_entry__rank'),
+        )
+    if vendor == 'postgresql':
+        document = _Document(*[f'{prefix}{name}' for name in fields])
+        tsquery = _TsQuery(Value(' & '.join(f'{term}:*' for term in terms)))
+        return queryset.filter(_TsMatch(document, tsquery)).annotate(
+            search_rank=Func(document, tsquery, function='ts_rank', output_field=FloatField()),
+        )
+
+    matches = Q()
+    for term in terms:
+        matches &= Q(*[(f'{prefix}{name}__icontains', term) for name in fields], _connector=Q.OR)
+    return queryset.filter(matches).annotate(search_rank=Value(0.0, output_field=FloatField()))
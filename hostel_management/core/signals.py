@@ -0,0 +1,136 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from django.apps import apps
+from django.db import transaction
+
+from .caching import MODEL_NAMESPACES, generation, invalidate, invalidate_on_commit
+from rooms.models import RoomAllocation
+from .models import NotificationDelivery, Payment
+from .notifications import shift_unread_counts
+from .reporting import mark_occupancy_stale, mark_revenue_days_stale, revenue_day
+from .typeahead import indexes_for
+
+
+@receiver(m2m_changed, sender=NotificationDelivery)
+def recipients_added(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    recipients.add() bulk-creates unread delivery rows without post_save.
+
+    ``pk_set`` only holds the newly linked ids, so each one is one new unread
+    notification. Removals delete delivery rows and are handled below.
+    """
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        shift_unread_counts({instance.pk: len(pk_set)})
+    else:
+        shift_unread_counts(dict.fromkeys(pk_set, 1))
+
+
+def _counts_as_unread(delivery):
+    # Pending (scheduled) deliveries are not counted until they are released.
+    return delivery.is_delivered() and not delivery.is_read()
+
+
+@receiver(post_save, sender=NotificationDelivery)
+def delivery_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and _counts_as_unread(instance):
+        shift_unread_counts({instance.recipient_id: 1})
+
+
+@receiver(post_delete, sender=NotificationDelivery)
+def delivery_deleted(sender, instance, **kwargs):
+    if _counts_as_unread(instance):
+        shift_unread_counts({instance.recipient_id: -1})
+
+
+def model_changed(sender, raw=False, update_fields=None, **kwargs):
+    """Invalidate cached pages built from ``sender`` rows; fixture loads and login stamps are skipped."""
+    if not raw and update_fields != {'last_login'}:
+        invalidate_on_commit(MODEL_NAMESPACES[sender._meta.label])
+
+
+# Set-based writes (QuerySet.update, bulk_create) send no signals; the
+# services doing them invalidate explicitly.
+for label in MODEL_NAMESPACES:
+    model = apps.get_model(label)
+    post_save.connect(model_changed, sender=model, dispatch_uid=f'cache-save-{label}')
+    post_delete.connect(model_changed, sender=model, dispatch_uid=f'cache-delete-{label}')
+
+
+def typeahead_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Re-index a saved user or room; saves of unindexed fields (last_login) are skipped."""
+    indexes, watched = indexes_for(sender)
+    if raw or (update_fields is not None and not watched & set(update_fields)):
+        return
+
+    def refresh():
+        previous = generation(indexes[0].namespace)
+        current = invalidate(indexes[0].namespace)
+        for index in indexes:
+            index.add(instance, previous, current)
+    transaction.on_commit(refresh)
+
+
+def typeahead_deleted(sender, instance, **kwargs):
+    indexes, _ = indexes_for(sender)
+    pk = instance.pk
+
+    def refresh():
+        previous = generation(indexes[0].namespace)
+        current = invalidate(indexes[0].namespace)
+        for index in indexes:
+            index.discard(pk, previous, current)
+    transaction.on_commit(refresh)
+
+
+for label in ('users.User', 'rooms.Room'):
+    model = apps.get_model(label)
+    post_save.connect(typeahead_saved, sender=model, dispatch_uid=f'typeahead-save-{label}')
+    post_delete.connect(typeahead_deleted, sender=model, dispatch_uid=f'typeahead-delete-{label}')
+
+
+@receiver(pre_save, sender=Payment)
+def payment_moving(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    A payment whose due or payment date changes leaves its old revenue day.
+
+    snapshot_daily_stats only sees the new day through updated_at, so the
+    old day's snapshots are flagged stale here, while its dates are known.
+    """
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not {'due_date', 'payment_date'} & set(update_fields):
+        return
+    saved = Payment.objects.filter(pk=instance.pk).values_list('due_date', 'payment_date').first()
+    if saved is not None and saved != (instance.due_date, instance.payment_date):
+        mark_revenue_days_stale([revenue_day(*saved)])
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    mark_revenue_days_stale([revenue_day(instance.due_date, instance.payment_date)])
+
+
+@receiver(pre_save, sender=RoomAllocation)
+def allocation_moving(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    An allocation whose check-in moves later leaves the days before it.
+
+    snapshot_daily_stats rebuilds from the new check-in, found through
+    updated_at, so the old one is flagged stale here while it is known.
+    """
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and 'check_in_date' not in update_fields:
+        return
+    saved = RoomAllocation.objects.filter(pk=instance.pk).values_list('check_in_date', flat=True).first()
+    check_in_date = sender._meta.get_field('check_in_date').to_python(instance.check_in_date)
+    if saved is not None and saved < check_in_date:
+        mark_occupancy_stale(saved)
+
+
+@receiver(post_delete, sender=RoomAllocation)
+def allocation_deleted(sender, instance, **kwargs):
+    mark_occupancy_stale(instance.check_in_date)
@@ -0,0 +1,36 @@
+from django import template
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, fragment, nodelist):
+        self.fragment = fragment
+        self.nodelist = nodelist
+
+    def render(self, context):
+        fragment = self.fragment.resolve(context)
+        if fragment is None:
+            return self.nodelist.render(context)
+        return fragment.render(lambda: self.nodelist.render(context))
+
+
+@register.tag
+def cachedfragment(parser, token):
+    """
+    Render the enclosed block once per ``core.caching.Fragment`` key.
+
+    Usage::
+
+        {% cachedfragment room_table %}...{% endcachedfragment %}
+
+    The view builds the fragment, so it decides what the block is keyed on
+    and which changes invalidate it. Querysets used only inside the block are
+    never evaluated on a hit.
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes exactly one argument")
+    nodelist = parser.parse(('endcachedfragment',))
+    parser.delete_first_token()
+    return CachedFragmentNode(parser.compile_filter(bits[1]), nodelist)
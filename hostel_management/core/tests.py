@@ -1,3 +1,1100 @@
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import tempfile
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rooms.availability import overlapping
+from rooms.models import Room, RoomAllocation, RoomMaintenance
+from users.models import User
+from . import billing, notifications, reporting
+from .billing import generate_rent_invoices
+from .caching import Fragment, cache_stats, cached, invalidate
+from .checks import check_search_index
+from .exports import export_queryset, render_export
+from .imports import ImportResult, import_rows, write_checkpoint
+from .models import (
+    Complaint, ComplaintNotificationJob, DailyOccupancySnapshot, DailyRevenueSnapshot, Notification,
+    NotificationDelivery, Payment,
+)
+from .notifications import (
+    announcement_recipients, apply_schedule, archive, broadcast_announcement, create_deliveries, dismiss,
+    enqueue_complaint_notifications, mark_read, process_complaint_notification_queue,
+    release_scheduled_notifications, sweep_expired_notifications,
+)
+from .pagination import CursorPaginator, estimate_count
+from .search import install_search_index, missing_search_index, search
+from .templatetags.notification_tags import get_unread_notifications_count
+from .typeahead import suggest
+from .views import EXPORT_FILTERS, filter_deliveries, filter_payments
+
+
+class QueryPlanTests(TestCase):
+    """
+    The list views must be answered from an index, never a full table scan.
+
+    Each queryset below mirrors one a view runs. On SQLite the plan must not
+    contain a bare ``SCAN <table>`` and keyset pages must not sort in a temp
+    B-tree; on PostgreSQL sequential scans are disabled and must not appear.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='x', user_type='student')
+        cls.room = Room.objects.create(room_number='101', floor=1, room_type='single',
+                                       capacity=1, monthly_rent=100)
+        RoomAllocation.objects.create(room=cls.room, student=cls.student, check_in_date=datetime.date(2025, 1, 1))
+        RoomMaintenance.objects.create(room=cls.room, maintenance_type='cleaning', description='x',
+                                       scheduled_date=datetime.date(2025, 1, 1), reported_by=cls.student)
+        Payment.objects.create(student=cls.student, payment_type='rent', amount=100, due_date=datetime.date(2025, 1, 1))
+        Complaint.objects.create(title='x', description='x', category='noise', reported_by=cls.student)
+
+    def assertIndexed(self, queryset, table, sorted_by_index=True):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            self.assertNotIn(f'Seq Scan on {table}', plan)
+            return
+        plan = queryset.explain()
+        self.assertIsNone(re.search(rf'SCAN {table}\b(?! USING)', plan), plan)
+        if sorted_by_index:
+            self.assertNotIn('USE TEMP B-TREE', plan)
+
+    def test_room_list(self):
+        self.assertIndexed(Room.objects.all()[:20], 'rooms_room')
+        self.assertIndexed(Room.objects.filter(status='available')[:20], 'rooms_room')
+
+    def test_maintenance_list(self):
+        ordering = ('-scheduled_date', '-id')
+        self.assertIndexed(RoomMaintenance.objects.for_list().order_by(*ordering)[:11], 'rooms_roommaintenance')
+        self.assertIndexed(RoomMaintenance.objects.filter(status='pending').order_by(*ordering)[:11],
+                           'rooms_roommaintenance')
+
+    def test_payment_list(self):
+        ordering = ('-due_date', 'id')
+        self.assertIndexed(Payment.objects.for_list().order_by(*ordering)[:11], 'core_payment')
+        self.assertIndexed(Payment.objects.filter(status='pending').order_by(*ordering)[:11], 'core_payment')
+        self.assertIndexed(Payment.objects.filter(payment_type='rent').order_by(*ordering)[:11], 'core_payment')
+
+    def test_complaint_list(self):
+        ordering = ('-created_at', '-id')
+        self.assertIndexed(Complaint.objects.for_list().order_by(*ordering)[:11], 'core_complaint')
+        self.assertIndexed(Complaint.objects.filter(status='open').order_by(*ordering)[:11], 'core_complaint')
+        self.assertIndexed(Complaint.objects.filter(category='noise').order_by(*ordering)[:11], 'core_complaint')
+        self.assertIndexed(Complaint.objects.open().order_by(*ordering)[:11], 'core_complaint',
+                           sorted_by_index=False)
+
+    def test_search(self):
+        if connection.vendor == 'sqlite':
+            self.assertIn('VIRTUAL TABLE', search(Complaint.objects.all(), 'complaint', 'x').explain())
+        ordering = ('-search_rank', '-id')
+        self.assertIndexed(search(Complaint.objects.all(), 'complaint', 'x').order_by(*ordering)[:11],
+                           'core_complaint', sorted_by_index=False)
+        self.assertIndexed(search(RoomMaintenance.objects.all(), 'maintenance', 'x').order_by(*ordering)[:11],
+                           'rooms_roommaintenance', sorted_by_index=False)
+        self.assertIndexed(Payment.objects.filter(transaction_id='x'), 'core_payment', sorted_by_index=False)
+
+    def test_exports(self):
+        for kind, params, table in (
+            ('payments', {}, 'core_payment'),
+            ('payments', {'status': 'pending'}, 'core_payment'),
+            ('complaints', {}, 'core_complaint'),
+            ('allocations', {'student': 'student'}, 'rooms_roomallocation'),
+            ('allocations', {'room': '101'}, 'rooms_roomallocation'),
+        ):
+            queryset, ordering = EXPORT_FILTERS[kind](params)
+            self.assertIndexed(export_queryset(queryset, kind, ordering), table)
+
+    def test_rent_invoices(self):
+        self.assertIndexed(Payment.objects.filter(billing_period=datetime.date(2025, 1, 1), room_allocation__isnull=False),
+                           'core_payment', sorted_by_index=False)
+
+    def test_revenue_chart(self):
+        self.assertIndexed(Payment.objects.filter(updated_at__gt=timezone.now()), 'core_payment', sorted_by_index=False)
+        days = [datetime.date(2025, 1, 1), datetime.date(2025, 1, 2), datetime.date(2025, 1, 9)]
+        self.assertIndexed(reporting._payments_on(days), 'core_payment', sorted_by_index=False)
+
+    def test_student_pages(self):
+        self.assertIndexed(User.objects.filter(user_type='student').order_by('username'), 'users_user')
+        self.assertIndexed(RoomAllocation.objects.current().filter(student=self.student), 'rooms_roomallocation')
+        self.assertIndexed(RoomAllocation.objects.current().filter(room=self.room), 'rooms_roomallocation')
+        self.assertIndexed(RoomAllocation.objects.filter(student=self.student).order_by('-check_in_date'),
+                           'rooms_roomallocation')
+        self.assertIndexed(Payment.objects.filter(student=self.student).order_by('-created_at')[:5], 'core_payment')
+        self.assertIndexed(Complaint.objects.filter(reported_by=self.student).order_by('-created_at')[:5],
+                           'core_complaint')
+
+    def test_availability_window(self):
+        window = overlapping(datetime.date(2025, 1, 1), datetime.date(2025, 1, 15))
+        self.assertIndexed(window, 'rooms_roomallocation', sorted_by_index=False)
+
+    def test_notification_inbox(self):
+        deliveries = filter_deliveries(self.student, {}).for_list().order_by('-delivered_at', '-id')[:21]
+        self.assertIndexed(deliveries, 'core_notificationdelivery')
+        self.assertIndexed(NotificationDelivery.objects.filter(recipient=self.student).unread(),
+                           'core_notificationdelivery')
+
+
+class IndexedFilterTests(TestCase):
+    """The querysets the partial indexes were built for select the rows their conditions describe."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+        cls.student = User.objects.create_user('student', password='x', user_type='student')
+        cls.room = Room.objects.create(room_number='101', floor=1, room_type='double', capacity=2, monthly_rent=100)
+
+    def test_open_complaints(self):
+        for status, _ in Complaint.STATUS_CHOICES:
+            Complaint.objects.create(title=status, description='x', category='maintenance',
+                                     reported_by=self.student, status=status)
+        self.assertCountEqual(Complaint.objects.open().values_list('status', flat=True), ['open', 'in_progress'])
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['open_complaints'], 2)
+
+    def test_current_allocations(self):
+        current = RoomAllocation.objects.create(room=self.room, student=self.student,
+                                                check_in_date=datetime.date(2025, 3, 1))
+        RoomAllocation.objects.create(room=self.room, student=self.student, check_in_date=datetime.date(2024, 1, 1),
+                                      is_active=False)
+        # Still flagged active, but checked out
+        RoomAllocation.objects.create(room=self.room, student=self.student, check_in_date=datetime.date(2025, 1, 1),
+                                      check_out_date=datetime.date(2025, 2, 1))
+        self.assertEqual(list(RoomAllocation.objects.current()), [current])
+        self.assertEqual(list(User.objects.current_occupants(self.room)), [self.student])
+
+
+class ListQueryCountTests(TestCase):
+    """List pages run a fixed number of queries however many related rows they show."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count, start):
+        for i in range(start, start + count):
+            student = User.objects.create_user(f'student{i:02}', password='x', user_type='student')
+            room = Room.objects.create(room_number=f'{100 + i}', floor=1, room_type='single', capacity=1,
+                                       monthly_rent=100)
+            Payment.objects.create(student=student, payment_type='rent', amount=100, due_date=datetime.date(2025, 1, 1))
+            Complaint.objects.create(title='Leak', description='x', category='maintenance', reported_by=student,
+                                     assigned_to=self.admin, room=room)
+            RoomMaintenance.objects.create(room=room, maintenance_type='repair', description='x', reported_by=student,
+                                           scheduled_date=datetime.date(2025, 1, 1))
+            notification = Notification.objects.create(title='Notice', message='x', notification_type='announcement',
+                                                       sender=student)
+            NotificationDelivery.objects.create(notification=notification, recipient=self.admin)
+
+    def queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_list_pages(self):
+        urls = [reverse(name) for name in ('payment_list', 'complaint_list', 'maintenance_list', 'notification_list')]
+        self.add_rows(2, start=0)
+        few = {url: self.queries(url) for url in urls}
+        self.add_rows(6, start=2)
+        self.assertEqual({url: self.queries(url) for url in urls}, few)
+
+
+class CachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return self.builds
+
+    def test_cached_until_a_namespace_changes(self):
+        self.assertEqual(cached('area', ('room', 'payment'), ('x',), self.build), 1)
+        self.assertEqual(cached('area', ('room', 'payment'), ('x',), self.build), 1)
+        self.assertEqual(cached('area', ('room', 'payment'), ('y',), self.build), 2)
+        invalidate('complaint')
+        self.assertEqual(cached('area', ('room', 'payment'), ('x',), self.build), 1)
+        invalidate('payment')
+        self.assertEqual(cached('area', ('room', 'payment'), ('x',), self.build), 3)
+
+    def test_saves_invalidate_on_commit(self):
+        cached('area', ('room',), (), self.build)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Room.objects.create(room_number='101', floor=1, room_type='single', capacity=1, monthly_rent=100)
+            # Still the old entry until the transaction commits
+            self.assertEqual(cached('area', ('room',), (), self.build), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(cached('area', ('room',), (), self.build), 2)
+
+    def test_fragment_and_stats(self):
+        self.assertEqual(Fragment('fragment', ('room',), 'a').render(lambda: '<p>1</p>'), '<p>1</p>')
+        self.assertEqual(Fragment('fragment', ('room',), 'a').render(lambda: '<p>2</p>'), '<p>1</p>')
+        self.assertEqual(cache_stats()['fragment'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_room_list_shows_new_rooms(self):
+        admin = User.objects.create_user('warden', password='x', user_type='admin')
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get(reverse('room_list')).context['rooms'].paginator.count, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Room.objects.create(room_number='101', floor=1, room_type='single', capacity=1, monthly_rent=100)
+        self.assertEqual(self.client.get(reverse('room_list')).context['rooms'].paginator.count, 1)
+
+    def test_renamed_students_show_up_in_fragments(self):
+        admin = User.objects.create_user('warden', password='x', user_type='admin')
+        student = User.objects.create_user('jdoe', password='x', user_type='student', first_name='Jane', last_name='Doe')
+        room = Room.objects.create(room_number='101', floor=1, room_type='single', capacity=1, monthly_rent=100)
+        RoomAllocation.objects.create(room=room, student=student, check_in_date=datetime.date(2025, 1, 1))
+        self.client.force_login(admin)
+        url = reverse('room_detail', args=[room.pk])
+        self.assertContains(self.client.get(url), 'Jane Doe')
+        with self.captureOnCommitCallbacks(execute=True):
+            student.first_name = 'Janet'
+            student.save()
+        self.assertContains(self.client.get(url), 'Janet Doe')
+
+    def test_logins_keep_cached_pages(self):
+        student = User.objects.create_user('jdoe', password='x', user_type='student')
+        cached('area', ('user',), (), self.build)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.login(username='jdoe', password='x')
+        self.assertIsNotNone(User.objects.get(pk=student.pk).last_login)
+        self.assertEqual(cached('area', ('user',), (), self.build), 1)
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+        student = User.objects.create_user('student', password='x', user_type='student')
+        # Shared due dates, so the id tie-breaker decides the order within a day
+        Payment.objects.bulk_create([
+            Payment(student=student, payment_type='rent', amount=100, due_date=datetime.date(2025, 1, 1 + i // 3))
+            for i in range(25)
+        ])
+        cls.ordered = list(Payment.objects.order_by('-due_date', 'id').values_list('pk', flat=True))
+
+    def paginator(self, per_page=10, **kwargs):
+        return CursorPaginator(Payment.objects.all(), ('-due_date', 'id'), per_page, **kwargs)
+
+    def ids(self, page):
+        return [payment.pk for payment in page]
+
+    def test_walks_every_row_once_in_order(self):
+        paginator, seen, cursor = self.paginator(), [], None
+        while True:
+            page = paginator.get_page(cursor)
+            seen += self.ids(page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.ordered)
+        self.assertEqual(len(page), 5)
+        self.assertTrue(page.has_previous())
+
+    def test_previous_page(self):
+        paginator = self.paginator()
+        second = paginator.get_page(paginator.get_page().next_cursor)
+        third = paginator.get_page(second.next_cursor)
+        self.assertEqual(self.ids(paginator.get_page(third.previous_cursor)), self.ordered[10:20])
+        # Going back from the second page lands on a full first page
+        first = paginator.get_page(second.previous_cursor)
+        self.assertEqual(self.ids(first), self.ordered[:10])
+        self.assertFalse(first.has_previous())
+
+    def test_bad_cursor_gives_the_first_page(self):
+        for cursor in ('garbage', 'eyJkIjoibmV4dCJ9', 'eyJkIjoic2lkZSIsInYiOltdfQ'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.ids(self.paginator().get_page(cursor)), self.ordered[:10])
+
+    def test_total_estimate(self):
+        page = self.paginator(estimate_total=True).get_page()
+        self.assertEqual((page.total_estimate, page.total_capped), (25, False))
+        self.assertEqual(estimate_count(Payment.objects.all(), cap=20), (20, True))
+
+    def test_payment_list_pages(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('payment_list'))
+        page = response.context['page_obj']
+        self.assertEqual(self.ids(page), self.ordered[:10])
+        response = self.client.get(reverse('payment_list'), {'cursor': page.next_cursor})
+        self.assertEqual(self.ids(response.context['page_obj']), self.ordered[10:20])
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+        cls.student = User.objects.create_user('jsmith', password='x', user_type='student',
+                                               first_name='Johanna', last_name='Smithson')
+
+    def test_search_index_is_installed(self):
+        self.assertEqual(missing_search_index(connection), [])
+        self.assertEqual(check_search_index(None, databases=['default']), [])
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 triggers are SQLite only')
+    def test_missing_trigger_is_reported(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER core_complaint_fts_update')
+        errors = check_search_index(None, databases=['default'])
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+        self.assertIn('core_complaint_fts_update', errors[0].msg)
+        install_search_index(connection)
+        self.assertEqual(check_search_index(None, databases=['default']), [])
+
+    def test_index_follows_writes(self):
+        complaint = Complaint.objects.create(title='Broken window', description='Glass cracked',
+                                             category='maintenance', reported_by=self.student)
+        complaints = Complaint.objects.all()
+        self.assertEqual(list(search(complaints, 'complaint', 'windo')), [complaint])
+        Complaint.objects.filter(pk=complaint.pk).update(title='Broken door')
+        self.assertEqual(list(search(complaints, 'complaint', 'window')), [])
+        self.assertEqual(list(search(complaints, 'complaint', 'door crack')), [complaint])
+        complaint.delete()
+        self.assertEqual(list(search(complaints, 'complaint', 'door')), [])
+
+    def test_payment_search_matches_substrings(self):
+        payment = Payment.objects.create(student=self.student, payment_type='rent', amount=100,
+                                         due_date=datetime.date(2025, 1, 1), transaction_id='TXN-48213')
+        for query in ('smith', 'HANN', 'thso', '4821', 'txn-48213'):
+            with self.subTest(query=query):
+                payments, _ = filter_payments({'search': query})
+                self.assertEqual(list(payments), [payment])
+        payments, _ = filter_payments({'search': 'nobody'})
+        self.assertEqual(list(payments), [])
+
+
+class AnnouncementTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', user_type='admin')
+        rooms = [Room.objects.create(room_number=f'{floor}01', floor=floor, room_type='single', capacity=1,
+                                     monthly_rent=100) for floor in (1, 2)]
+        cls.students = []
+        for i in range(5):
+            student = User.objects.create_user(f'student{i}', password='x', user_type='student')
+            cls.students.append(student)
+            if i < 2:
+                RoomAllocation.objects.create(room=rooms[i], student=student, check_in_date=datetime.date(2025, 1, 1))
+        User.objects.create_user('gone', password='x', user_type='student', is_active=False)
+
+    def recipients(self, notification):
+        return sorted(notification.deliveries.values_list('recipient__username', flat=True))
+
+    def test_broadcast_in_small_batches(self):
+        result = broadcast_announcement('Fire drill', 'x', self.admin, batch_size=2)
+        self.assertEqual(result.recipients, 6)
+        self.assertEqual(self.recipients(result.notification),
+                         ['admin', 'student0', 'student1', 'student2', 'student3', 'student4'])
+        self.assertEqual(set(User.objects.filter(is_active=True).values_list('unread_notification_count', flat=True)),
+                         {1})
+
+    def test_narrowed_audiences(self):
+        for filters, expected in (
+            ({'user_type': 'admin'}, ['admin']),
+            ({'floor': 2}, ['student1']),
+            ({'room_number': '101'}, ['student0']),
+            ({'user_type': 'student', 'floor': 1}, ['student0']),
+        ):
+            with self.subTest(filters=filters):
+                result = broadcast_announcement('Notice', 'x', self.admin, announcement_recipients(**filters))
+                self.assertEqual(self.recipients(result.notification), expected)
+
+    def test_scheduled_broadcast_is_held(self):
+        later = timezone.now() + datetime.timedelta(days=1)
+        result = broadcast_announcement('Later', 'x', self.admin, scheduled_for=later)
+        self.assertEqual(result.notification.deliveries.pending().count(), 6)
+        self.assertEqual(User.objects.get(pk=self.students[0].pk).unread_notification_count, 0)
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command('broadcast_announcement', title='Water off', message='x', sender='admin', floor=1, stdout=output)
+        self.assertIn('delivered to 1 users', output.getvalue())
+        with self.assertRaisesMessage(CommandError, "Unknown sender 'nobody'"):
+            call_command('broadcast_announcement', title='x', message='x', sender='nobody')
+
+
+class NotificationScheduleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', user_type='admin', is_active=False)
+        cls.students = [
+            User.objects.create_user(f'student{i}', password='x', user_type='student') for i in range(3)
+        ]
+
+    def announce(self, scheduled_for=None, expires_at=None, **kwargs):
+        return broadcast_announcement('Notice', 'x', self.admin, scheduled_for=scheduled_for,
+                                      expires_at=expires_at, batch_size=2, **kwargs).notification
+
+    def counts(self):
+        return list(User.objects.filter(user_type='student').order_by('username')
+                    .values_list('unread_notification_count', flat=True))
+
+    def test_due_notifications_are_released(self):
+        due = self.announce(scheduled_for=timezone.now() + datetime.timedelta(seconds=1))
+        later = self.announce(scheduled_for=timezone.now() + datetime.timedelta(days=1))
+        self.assertEqual(self.counts(), [0, 0, 0])
+
+        self.assertEqual(release_scheduled_notifications(timezone.now() + datetime.timedelta(hours=1), batch_size=2), 3)
+        self.assertEqual(self.counts(), [1, 1, 1])
+        self.assertEqual(due.deliveries.pending().count(), 0)
+        self.assertEqual(later.deliveries.pending().count(), 3)
+
+    def test_expired_before_release_is_never_delivered(self):
+        notification = self.announce(scheduled_for=timezone.now() + datetime.timedelta(hours=1),
+                                     expires_at=timezone.now() + datetime.timedelta(hours=2))
+        when = timezone.now() + datetime.timedelta(hours=3)
+        self.assertEqual(release_scheduled_notifications(when), 0)
+        self.assertEqual(sweep_expired_notifications(when), 3)
+        self.assertEqual(notification.deliveries.archived().count(), 3)
+        self.assertEqual(self.counts(), [0, 0, 0])
+
+    def test_expired_notifications_leave_the_inbox(self):
+        notification = self.announce(expires_at=timezone.now() + datetime.timedelta(hours=1))
+        inbox = NotificationDelivery.objects.filter(recipient=self.students[0]).inbox()
+        self.assertEqual(inbox.live().count(), 1)
+        self.assertEqual(inbox.live(timezone.now() + datetime.timedelta(hours=2)).count(), 0)
+
+        self.assertEqual(sweep_expired_notifications(timezone.now() + datetime.timedelta(hours=2), batch_size=2), 3)
+        self.assertEqual(self.counts(), [0, 0, 0])
+        self.assertEqual(notification.deliveries.archived().count(), 3)
+
+    def test_delete_mode_removes_the_notification(self):
+        notification = self.announce(expires_at=timezone.now() + datetime.timedelta(hours=1))
+        swept = sweep_expired_notifications(timezone.now() + datetime.timedelta(hours=2), mode='delete')
+        self.assertEqual(swept, 3)
+        self.assertFalse(Notification.objects.filter(pk=notification.pk).exists())
+        self.assertEqual(self.counts(), [0, 0, 0])
+
+    def test_rescheduling_holds_and_releases(self):
+        notification = self.announce()
+        notification.scheduled_for = timezone.now() + datetime.timedelta(days=1)
+        self.assertEqual(apply_schedule(notification), 3)
+        self.assertEqual(self.counts(), [0, 0, 0])
+        notification.scheduled_for = None
+        self.assertEqual(apply_schedule(notification), 3)
+        self.assertEqual(self.counts(), [1, 1, 1])
+
+
+class ComplaintNotificationWorkerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', user_type='admin')
+        cls.student = User.objects.create_user('student', password='x', user_type='student')
+        cls.roommate = User.objects.create_user('roommate', password='x', user_type='student')
+        cls.staff = User.objects.create_user('staff', password='x', user_type='staff')
+        cls.room = Room.objects.create(room_number='101', floor=1, room_type='double',
+                                       capacity=2, monthly_rent=100)
+        for student in (cls.student, cls.roommate):
+            RoomAllocation.objects.create(room=cls.room, student=student, check_in_date=datetime.date(2025, 1, 1))
+
+    def complaint(self, **fields):
+        return Complaint.objects.create(title='Leak', description='x', category='maintenance',
+                                        reported_by=self.student, room=self.room, **fields)
+
+    def test_events_coalesce_into_one_notification(self):
+        complaint = self.complaint(assigned_to=self.staff)
+        enqueue_complaint_notifications(complaint, ['created', 'assigned'], self.admin)
+        enqueue_complaint_notifications(complaint, ['assigned'], self.admin)
+
+        self.assertEqual(process_complaint_notification_queue(), (3, 1))
+        notification = Notification.objects.get()
+        self.assertEqual(notification.title, 'New Complaint: Leak')
+        self.assertEqual(len(notification.message.splitlines()), 2)
+        self.assertFalse(ComplaintNotificationJob.objects.exists())
+
+    def test_recipients_are_deduplicated(self):
+        # The reporter is also an occupant of the room
+        complaint = self.complaint(assigned_to=self.staff)
+        enqueue_complaint_notifications(complaint, ['created'], self.admin)
+        process_complaint_notification_queue()
+
+        recipients = NotificationDelivery.objects.values_list('recipient__username', flat=True)
+        self.assertCountEqual(recipients, ['student', 'roommate', 'staff'])
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.unread_notification_count, 1)
+
+    def test_cleared_assignee_does_not_block_the_queue(self):
+        assigned = self.complaint(assigned_to=self.staff)
+        enqueue_complaint_notifications(assigned, ['assigned'], self.admin)
+        Complaint.objects.filter(pk=assigned.pk).update(assigned_to=None)
+        enqueue_complaint_notifications(self.complaint(), ['created'], self.admin)
+
+        self.assertEqual(process_complaint_notification_queue(), (2, 1))
+        self.assertFalse(ComplaintNotificationJob.objects.exists())
+
+    def test_failing_complaint_is_parked(self):
+        bad, good = self.complaint(), self.complaint()
+        enqueue_complaint_notifications(bad, ['created'], self.admin)
+        enqueue_complaint_notifications(good, ['created'], self.admin)
+        text = notifications.complaint_notification_text
+
+        def failing_text(complaint, action):
+            if complaint.pk == bad.pk:
+                raise ValueError('broken')
+            return text(complaint, action)
+
+        with mock.patch.object(notifications, 'complaint_notification_text', failing_text):
+            self.assertEqual(process_complaint_notification_queue(), (2, 1))
+        parked = ComplaintNotificationJob.objects.get()
+        self.assertEqual(parked.complaint_id, bad.pk)
+        self.assertIsNotNone(parked.failed_at)
+        self.assertIn('broken', parked.error)
+        self.assertEqual(process_complaint_notification_queue(), (0, 0))
+
+
+class NotificationDeliveryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', user_type='admin')
+        cls.alice = User.objects.create_user('alice', password='x', user_type='student')
+        cls.bob = User.objects.create_user('bob', password='x', user_type='student')
+        cls.shared = Notification.objects.create(title='Water off', message='x', notification_type='announcement',
+                                                 sender=cls.admin)
+        cls.private = Notification.objects.create(title='Rent due', message='x', notification_type='payment',
+                                                  sender=cls.admin)
+        cls.shared.recipients.add(cls.alice, cls.bob)
+        cls.private.recipients.add(cls.alice)
+
+    def listed(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('notification_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [delivery.notification.title for delivery in response.context['page_obj']], response.context
+
+    def test_read_state_is_per_recipient(self):
+        self.client.force_login(self.alice)
+        self.client.get(reverse('mark_notification_read', args=[self.shared.pk]))
+        titles, context = self.listed(self.alice, unread='true')
+        self.assertEqual((titles, context['unread_count']), (['Rent due'], 1))
+        titles, context = self.listed(self.bob, unread='true')
+        self.assertEqual((titles, context['unread_count']), (['Water off'], 1))
+
+    def test_lists_only_own_deliveries(self):
+        self.assertEqual(self.listed(self.bob)[0], ['Water off'])
+        self.assertEqual(self.listed(self.alice, type='payment')[0], ['Rent due'])
+
+    def test_cannot_read_someone_elses_notification(self):
+        self.client.force_login(self.bob)
+        response = self.client.get(reverse('mark_notification_read', args=[self.private.pk]))
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(NotificationDelivery.objects.get(notification=self.private).read_at)
+
+    def test_archived_deliveries_leave_the_inbox(self):
+        archive(NotificationDelivery.objects.filter(recipient=self.alice, notification=self.shared))
+        self.assertEqual(self.listed(self.alice)[0], ['Rent due'])
+        self.assertEqual(self.listed(self.alice, archived='true')[0], ['Water off'])
+        self.assertEqual(self.listed(self.bob)[0], ['Water off'])
+
+
+class UnreadCounterSignalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', user_type='admin')
+        cls.students = [
+            User.objects.create_user(f'student{i}', password='x', user_type='student') for i in range(2)
+        ]
+
+    def setUp(self):
+        self.notification = Notification.objects.create(title='Notice', message='x', notification_type='announcement',
+                                                        sender=self.admin)
+
+    def counts(self):
+        return [User.objects.get(pk=student.pk).unread_notification_count for student in self.students]
+
+    def test_delivery_rows(self):
+        delivery = NotificationDelivery.objects.create(notification=self.notification, recipient=self.students[0])
+        NotificationDelivery.objects.create(notification=self.notification, recipient=self.students[1],
+                                            delivered_at=None)
+        # The pending delivery is not counted until it is released
+        self.assertEqual(self.counts(), [1, 0])
+        delivery.delete()
+        self.assertEqual(self.counts(), [0, 0])
+
+    def test_recipients_add_from_either_side(self):
+        self.notification.recipients.add(*self.students)
+        self.assertEqual(self.counts(), [1, 1])
+        other = Notification.objects.create(title='Other', message='x', notification_type='announcement',
+                                            sender=self.admin)
+        self.students[0].received_notifications.add(other)
+        self.assertEqual(self.counts(), [2, 1])
+
+    def test_mark_as_read(self):
+        self.notification.recipients.add(*self.students)
+        self.notification.mark_as_read(self.students[0])
+        self.notification.mark_as_read(self.students[0])
+        self.assertEqual(self.counts(), [0, 1])
+
+    def test_recount_repairs_drift(self):
+        self.notification.recipients.add(*self.students)
+        User.objects.filter(pk__in=[student.pk for student in self.students]).update(unread_notification_count=7)
+        call_command('recount_unread_notifications', stdout=io.StringIO())
+        self.assertEqual(self.counts(), [1, 1])
+
+    def test_badge_reads_the_counter(self):
+        self.notification.recipients.add(self.students[0])
+        student = User.objects.get(pk=self.students[0].pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_notifications_count(student), 1)
+
+
+class UnreadCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', user_type='admin')
+        cls.student = User.objects.create_user('student', password='x', user_type='student')
+        cls.other = User.objects.create_user('other', password='x', user_type='student')
+
+    def setUp(self):
+        self.notifications = [
+            Notification.objects.create(title=f'Notice {i}', message='x', notification_type='announcement',
+                                        sender=self.admin)
+            for i in range(3)
+        ]
+        create_deliveries((notification.pk, user.pk)
+                          for notification in self.notifications for user in (self.student, self.other))
+
+    def deliveries(self, *indexes):
+        return NotificationDelivery.objects.filter(
+            recipient=self.student, notification__in=[self.notifications[i] for i in indexes],
+        )
+
+    def unread(self, user=None):
+        user = user or self.student
+        user.refresh_from_db()
+        self.assertEqual(user.unread_notification_count,
+                         NotificationDelivery.objects.filter(recipient=user).unread().count())
+        return user.unread_notification_count
+
+    def test_read(self):
+        self.assertEqual(mark_read(self.deliveries(0, 1)), 2)
+        self.assertEqual(self.unread(), 1)
+        self.assertEqual(self.unread(self.other), 3)
+
+    def test_dismiss(self):
+        self.assertEqual(dismiss(self.deliveries(0)), 1)
+        self.assertEqual(self.unread(), 2)
+        self.assertTrue(self.deliveries(0).get().dismissed)
+
+    def test_archive(self):
+        self.assertEqual(archive(self.deliveries(0, 1)), 2)
+        self.assertEqual(self.unread(), 1)
+        self.assertEqual(self.deliveries(0, 1).archived().count(), 2)
+
+    def test_repeated_actions_lower_the_counter_once(self):
+        mark_read(self.deliveries(0))
+        self.assertEqual(mark_read(self.deliveries(0)), 0)
+        self.assertEqual(self.unread(), 2)
+        # Already read rows can still be dismissed or archived without touching the counter
+        self.assertEqual(archive(self.deliveries(0, 1)), 2)
+        self.assertEqual(archive(self.deliveries(0, 1)), 0)
+        self.assertEqual(dismiss(self.deliveries(0, 1, 2)), 3)
+        self.assertEqual(dismiss(self.deliveries(0, 1, 2)), 0)
+        self.assertEqual(self.unread(), 0)
+
+    def test_bulk_action_on_unread_filter(self):
+        self.client.force_login(self.student)
+        response = self.client.post(reverse('bulk_notification_action'),
+                                    {'action': 'archive', 'scope': 'all', 'unread': 'true'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.unread(), 0)
+        self.assertEqual(NotificationDelivery.objects.filter(recipient=self.student).archived().count(), 3)
+        self.assertEqual(self.unread(self.other), 3)
+
+    def test_rows_read_concurrently_are_not_counted_twice(self):
+        shift = notifications.shift_unread_counts
+        raced = []
+
+        def shift_then_race(deltas):
+            shift(deltas)
+            if not raced:
+                # Another request reads the remaining recipient's row before this one reaches it
+                raced.append(deltas)
+                mark_read(NotificationDelivery.objects.filter(notification=self.notifications[0])
+                          .exclude(recipient_id__in=deltas))
+
+        with mock.patch.object(notifications, 'shift_unread_counts', side_effect=shift_then_race):
+            self.assertEqual(mark_read(NotificationDelivery.objects.filter(notification=self.notifications[0])), 1)
+        self.assertEqual(self.unread(), 2)
+        self.assertEqual(self.unread(self.other), 2)
+
+
+class RevenueSnapshotTests(TestCase):
+    TODAY = datetime.date(2025, 1, 31)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='x', user_type='student')
+
+    def payment(self, due_day, amount=100, **fields):
+        return Payment.objects.create(student=self.student, payment_type='rent', amount=amount,
+                                      due_date=datetime.date(2025, 1, due_day), **fields)
+
+    def snapshot(self, rebuild=False):
+        return reporting.snapshot_daily_stats(rebuild=rebuild, today=self.TODAY)
+
+    def revenue(self):
+        return {
+            (row.date.day, row.status): (row.payments, row.amount)
+            for row in DailyRevenueSnapshot.objects.all()
+        }
+
+    def test_moved_due_date_recomputes_the_old_day(self):
+        payment = self.payment(5)
+        self.snapshot(rebuild=True)
+        payment.due_date = datetime.date(2025, 1, 7)
+        payment.save()
+        self.assertEqual(self.snapshot().revenue_days, 2)
+        self.assertEqual(self.revenue(), {(7, 'pending'): (1, Decimal('100.00'))})
+        self.assertFalse(DailyRevenueSnapshot.objects.filter(stale=True).exists())
+
+    def test_paid_payment_moves_to_its_payment_day(self):
+        payment = self.payment(5)
+        self.payment(5, amount=50)
+        self.snapshot(rebuild=True)
+        payment.status = 'completed'
+        payment.payment_date = timezone.make_aware(datetime.datetime(2025, 1, 10, 12))
+        payment.save()
+        self.snapshot()
+        self.assertEqual(self.revenue(), {
+            (5, 'pending'): (1, Decimal('50.00')),
+            (10, 'completed'): (1, Decimal('100.00')),
+        })
+
+    def test_deleted_payment_leaves_its_day(self):
+        payment = self.payment(5)
+        self.snapshot(rebuild=True)
+        payment.delete()
+        self.snapshot()
+        self.assertEqual(self.revenue(), {})
+
+    def test_other_edits_keep_the_day(self):
+        payment = self.payment(5)
+        self.snapshot(rebuild=True)
+        payment.amount = 120
+        payment.save()
+        self.assertFalse(DailyRevenueSnapshot.objects.filter(stale=True).exists())
+        self.snapshot()
+        self.assertEqual(self.revenue(), {(5, 'pending'): (1, Decimal('120.00'))})
+
+    def test_chart_reads_past_days_from_the_snapshots(self):
+        self.payment(5)
+        moved = self.payment(6)
+        self.snapshot(rebuild=True)
+        # A snapshot total the payments do not add up to shows the chart read the snapshot
+        DailyRevenueSnapshot.objects.filter(date=datetime.date(2025, 1, 5)).update(amount=70)
+        moved.due_date = datetime.date(2025, 1, 8)
+        moved.save()
+        self.payment(31, amount=30)
+
+        due = reporting.build_chart_data('30d', self.TODAY)['payments']['due']
+        self.assertEqual(len(due), 30)
+        # Day buckets start on January 2
+        self.assertEqual({day: amount for day, amount in enumerate(due, start=2) if amount},
+                         {5: 70, 8: 100, 31: 30})
+
+    def test_chart_without_snapshots_reads_payments(self):
+        self.payment(5)
+        self.payment(5, status='completed', payment_date=timezone.make_aware(datetime.datetime(2025, 1, 9, 8)))
+        payments = reporting.build_chart_data('30d', self.TODAY)['payments']
+        self.assertEqual(payments['due'][3], 100)
+        self.assertEqual(payments['collected'][7], 100)
+
+
+class OccupancySnapshotTests(TestCase):
+    TODAY = datetime.date(2025, 1, 31)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = Room.objects.create(room_number='101', floor=1, room_type='single', capacity=1, monthly_rent=100)
+        cls.student = User.objects.create_user('student', password='x', user_type='student')
+
+    def setUp(self):
+        self.allocation = RoomAllocation.objects.create(room=self.room, student=self.student,
+                                                        check_in_date=datetime.date(2025, 1, 1))
+        reporting.snapshot_daily_stats(rebuild=True, today=self.TODAY)
+
+    def occupied(self):
+        reporting.snapshot_daily_stats(today=self.TODAY)
+        self.assertFalse(DailyOccupancySnapshot.objects.filter(stale=True).exists())
+        return [row.date.day for row in DailyOccupancySnapshot.objects.filter(occupied__gt=0).order_by('date')]
+
+    def test_deleted_allocation_leaves_its_days(self):
+        self.allocation.delete()
+        self.assertEqual(self.occupied(), [])
+
+    def test_later_check_in_leaves_the_days_before_it(self):
+        self.allocation.check_in_date = datetime.date(2025, 1, 29)
+        self.allocation.save()
+        self.assertEqual(self.occupied(), [29, 30, 31])
+
+    def test_earlier_check_in_needs_no_flag(self):
+        self.allocation.check_in_date = datetime.date(2024, 12, 30)
+        self.allocation.save()
+        self.assertFalse(DailyOccupancySnapshot.objects.filter(stale=True).exists())
+        self.assertEqual(self.occupied()[:3], [30, 31, 1])
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+        cls.student = User.objects.create_user('student', password='x', user_type='student')
+        room = Room.objects.create(room_number='101', floor=1, room_type='single', capacity=1, monthly_rent=100)
+        allocation = RoomAllocation.objects.create(room=room, student=cls.student,
+                                                   check_in_date=datetime.date(2025, 1, 1))
+        for day, status in ((1, 'completed'), (2, 'pending'), (3, 'pending')):
+            Payment.objects.create(student=cls.student, room_allocation=allocation, payment_type='rent', amount=100,
+                                   status=status, due_date=datetime.date(2025, 1, day), remarks='Rent, "January"')
+
+    def export(self, kind, fmt, **params):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('export_data', args=[kind, fmt]), params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self.export('payments', 'csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="payments-', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([row['due_date'] for row in rows], ['2025-01-03', '2025-01-02', '2025-01-01'])
+        self.assertEqual((rows[0]['student'], rows[0]['room'], rows[0]['payment_date']), ('student', '101', ''))
+        self.assertEqual(rows[0]['remarks'], 'Rent, "January"')
+
+    def test_jsonl_with_list_filters(self):
+        _, body = self.export('payments', 'jsonl', status='pending')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row['status'], row['amount']) for row in rows], [('pending', '100.00')] * 2)
+
+    def test_rows_span_chunks(self):
+        chunks = list(render_export(iter([(i,) * 12 for i in range(5)]), 'payments', 'csv', rows_per_chunk=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(len(list(csv.reader(io.StringIO(''.join(chunks))))), 6)
+
+    def test_unknown_kind_or_format(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('export_data', args=['users', 'csv'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export_data', args=['payments', 'xml'])).status_code, 404)
+
+    def test_exports_are_for_admins(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(reverse('export_data', args=['payments', 'csv'])).status_code, 302)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'allocations.jsonl')
+            call_command('export_records', 'allocations', format='jsonl', output=path,
+                         filter=['status=active', 'room=101'], stderr=io.StringIO())
+            with open(path, encoding='utf-8') as output:
+                rows = [json.loads(line) for line in output]
+        self.assertEqual([(row['student'], row['room'], row['is_active']) for row in rows], [('student', '101', True)])
+        with self.assertRaisesMessage(CommandError, 'Filters are NAME=VALUE'):
+            call_command('export_records', 'payments', filter=['status'])
+
+
+class RentInvoiceTests(TestCase):
+    JANUARY = datetime.date(2025, 1, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = Room.objects.create(room_number='101', floor=1, room_type='double',
+                                       capacity=2, monthly_rent=310)
+        cls.students = [
+            User.objects.create_user(f'student{i}', password='x', user_type='student') for i in range(3)
+        ]
+
+    def allocate(self, student, check_in, check_out=None):
+        return RoomAllocation.objects.create(room=self.room, student=student, check_in_date=check_in,
+                                             check_out_date=check_out, is_active=check_out is None)
+
+    def invoice(self, allocation):
+        return Payment.objects.get(room_allocation=allocation, billing_period=self.JANUARY)
+
+    def test_mid_month_check_in_is_prorated(self):
+        allocation = self.allocate(self.students[0], datetime.date(2025, 1, 16))
+        result = generate_rent_invoices('2025-01')
+        self.assertEqual((result.created, result.prorated, result.amount), (1, 1, Decimal('160.00')))
+        invoice = self.invoice(allocation)
+        self.assertEqual(invoice.amount, Decimal('160.00'))
+        self.assertEqual(invoice.remarks, 'Rent for January 2025 (16 of 31 nights)')
+        self.assertEqual((invoice.status, invoice.due_date), ('pending', datetime.date(2025, 1, 1)))
+
+    def test_full_month_costs_the_monthly_rent(self):
+        allocation = self.allocate(self.students[0], datetime.date(2024, 12, 1))
+        generate_rent_invoices(datetime.date(2025, 1, 20))
+        self.assertEqual(self.invoice(allocation).amount, self.room.monthly_rent)
+
+    def test_check_out_ends_the_rent(self):
+        left = self.allocate(self.students[0], datetime.date(2024, 12, 1), datetime.date(2025, 1, 11))
+        self.allocate(self.students[1], datetime.date(2024, 12, 1), datetime.date(2025, 1, 1))
+        result = generate_rent_invoices('2025-01')
+        self.assertEqual((result.allocations, result.created), (1, 1))
+        self.assertEqual(self.invoice(left).amount, Decimal('100.00'))
+
+    def test_second_run_creates_nothing(self):
+        self.allocate(self.students[0], datetime.date(2025, 1, 16))
+        self.allocate(self.students[1], datetime.date(2024, 12, 1))
+        self.assertEqual(generate_rent_invoices('2025-01').created, 2)
+        result = generate_rent_invoices('2025-01')
+        self.assertEqual((result.created, result.existing), (0, 2))
+        self.assertEqual(Payment.objects.count(), 2)
+
+    def test_dry_run_writes_nothing(self):
+        self.allocate(self.students[0], datetime.date(2024, 12, 1))
+        result = generate_rent_invoices('2025-01', dry_run=True)
+        self.assertEqual((result.created, result.amount), (1, Decimal('310')))
+        self.assertFalse(Payment.objects.exists())
+
+    def test_invoices_written_concurrently_are_not_counted(self):
+        first = self.allocate(self.students[0], datetime.date(2024, 12, 1))
+        self.allocate(self.students[1], datetime.date(2025, 1, 16))
+        prorate = billing.prorated_rent
+
+        def racing_prorate(monthly_rent, *args):
+            # Another run invoices the first allocation after this one read the invoiced set
+            if not Payment.objects.exists():
+                Payment.objects.create(student=self.students[0], room_allocation=first, payment_type='rent',
+                                       amount=monthly_rent, due_date=self.JANUARY, billing_period=self.JANUARY)
+            return prorate(monthly_rent, *args)
+
+        with mock.patch.object(billing, 'prorated_rent', racing_prorate):
+            result = generate_rent_invoices('2025-01')
+        self.assertEqual((result.created, result.existing), (1, 1))
+        # Only the prorated invoice this run wrote is billed
+        self.assertEqual(result.amount, Decimal('160.00'))
+        self.assertEqual(Payment.objects.count(), 2)
+
+
+class ImportTests(TestCase):
+    ROOMS = (
+        'room_number,floor,room_type,capacity,monthly_rent\n'
+        '101,1,single,1,100\n'
+        '102,1,penthouse,1,100\n'
+        '103,1,double,2,150.50\n'
+        '104,2,triple,3,200\n'
+    )
+
+    def run_import(self, text, kind='rooms', name='rooms.csv', **options):
+        return import_rows(kind, io.BytesIO(text.encode()), name, **options)
+
+    def test_csv_import(self):
+        result = self.run_import(self.ROOMS)
+        self.assertEqual((result.created, result.skipped, result.failed), (3, 0, 1))
+        self.assertEqual(result.errors[0][0], 3)
+        self.assertIn('room_type', result.errors[0][1])
+        room = Room.objects.get(room_number='103')
+        self.assertEqual((room.room_type, room.capacity, str(room.monthly_rent)), ('double', 2, '150.50'))
+        self.assertEqual(room.status, 'available')
+
+    def test_rerun_imports_nothing_new(self):
+        self.run_import(self.ROOMS)
+        result = self.run_import(self.ROOMS)
+        self.assertEqual((result.created, result.skipped, result.failed), (0, 3, 1))
+        self.assertEqual(Room.objects.count(), 3)
+
+    def test_resume_from_checkpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'rooms.json')
+            # A previous run committed the rows up to line 3
+            write_checkpoint(checkpoint, ImportResult('rooms', line=3, created=1, failed=1), 'rooms.csv')
+            result = self.run_import(self.ROOMS, checkpoint=checkpoint, batch_size=1)
+            with open(checkpoint) as state:
+                self.assertEqual(json.load(state)['line'], 5)
+        self.assertEqual(sorted(Room.objects.values_list('room_number', flat=True)), ['103', '104'])
+        self.assertEqual((result.created, result.failed), (3, 1))
+
+    def test_unreadable_files_are_reported(self):
+        latin1 = 'room_number,floor,room_type,capacity,monthly_rent\nR\xe9,1,single,1,100\n'.encode('latin-1')
+        with self.assertRaisesMessage(ValidationError, 'Line 2 is not valid UTF-8'):
+            import_rows('rooms', io.BytesIO(latin1), 'rooms.csv')
+        with self.assertRaises(ValidationError):
+            import_rows('rooms', io.BytesIO(b'not a workbook'), 'rooms.xlsx')
+
+    def test_upload_view_reports_unreadable_files(self):
+        admin = User.objects.create_user('admin', password='x', user_type='admin')
+        self.client.force_login(admin)
+        latin1 = 'room_number,floor,room_type,capacity,monthly_rent\nR\xe9,1,single,1,100\n'.encode('latin-1')
+        response = self.client.post(reverse('import_data'), {
+            'kind': 'rooms', 'file': SimpleUploadedFile('rooms.csv', latin1),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Line 2 is not valid UTF-8')
+        self.assertFalse(Room.objects.exists())
+
+
+class TypeaheadTests(TestCase):
+    def setUp(self):
+        # Indexes live for the process; start each test from a fresh generation
+        invalidate('typeahead-user', 'typeahead-room')
+        self.admin = User.objects.create_user('admin', password='x', user_type='admin', is_staff=True)
+        self.student = User.objects.create_user('jdoe', password='x', user_type='student',
+                                                first_name='Jane', last_name='Doe')
+        self.staff = User.objects.create_user('warden', password='x', user_type='staff',
+                                              first_name='Walter', last_name='Warden')
+
+    def labels(self, kind, query):
+        return [suggestion.label for suggestion in suggest(kind, query)]
+
+    def test_prefix_and_substring_lookup(self):
+        self.assertEqual(self.labels('students', 'ja'), ['Jane Doe'])
+        self.assertEqual(self.labels('students', 'doe'), ['Jane Doe'])
+        self.assertEqual(self.labels('students', 'zz'), [])
+
+    def test_staff_are_users_with_the_staff_flag(self):
+        self.assertEqual(self.labels('staff', 'admin'), ['admin'])
+        # The assignee list has always been is_staff users; the user type alone does not count
+        self.assertEqual(self.labels('staff', 'w'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.is_staff = True
+            self.staff.save()
+        self.assertEqual(self.labels('staff', 'w'), ['Walter Warden'])
+
+    def test_complaints_are_only_assigned_to_staff(self):
+        complaint = Complaint.objects.create(title='Leak', description='x', category='maintenance',
+                                             reported_by=self.student)
+        self.client.force_login(self.admin)
+        url = reverse('complaint_detail', args=[complaint.pk])
+        for assignee in (self.student.pk, self.staff.pk, 'x'):
+            response = self.client.post(url, {'status': 'in_progress', 'assigned_to': assignee}, follow=True)
+            self.assertContains(response, 'Invalid staff member selected.')
+        complaint.refresh_from_db()
+        self.assertIsNone(complaint.assigned_to)
+        self.client.post(url, {'status': 'in_progress', 'assigned_to': self.admin.pk})
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.assigned_to, self.admin)
+
+    def test_local_saves_update_the_index(self):
+        self.labels('students', 'ja')
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user('jsmith', password='x', user_type='student', first_name='Jane', last_name='Smith')
+        self.assertEqual(self.labels('students', 'jane'), ['Jane Doe', 'Jane Smith'])
 
-# Create your tests here.
+    def test_changes_from_other_processes_are_not_skipped(self):
+        self.labels('students', 'ja')
+        # Another process inserts a row and bumps the generation before this one saves
+        User.objects.bulk_create([User(username='jroe', user_type='student', first_name='Jane', last_name='Roe')])
+        invalidate('typeahead-user')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.first_name = 'Janet'
+            self.student.save()
+        self.assertEqual(self.labels('students', 'jan'), ['Jane Roe', 'Janet Doe'])
@@ -0,0 +1,197 @@
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.apps import apps
+
+from rooms.models import Room
+from .caching import generation
+
+MAX_SUGGESTIONS = 10
+ROOM_TYPES = dict(Room.ROOM_TYPE_CHOICES)
+
+_WORD = re.compile(r'\w+')
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    id: int
+    label: str
+    detail: str
+
+    def as_json(self):
+        return {'id': self.id, 'label': self.label, 'detail': self.detail}
+
+
+def _words(text):
+    return _WORD.findall(text.lower())
+
+
+def _grams(word):
+    """Trigrams of ``word`` padded like pg_trgm, so its one and two letter prefixes are grams too."""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _query_grams(term):
+    """Grams a word must have to start with ``term`` when it is short, or contain it otherwise."""
+    if len(term) < 3:
+        return {f'  {term}'[:3], f' {term}'} if len(term) == 2 else {f'  {term}'}
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+class TypeaheadIndex:
+    """
+    In-memory trigram index over one kind of row, answering prefix and substring lookups.
+
+    Rows are loaded once per process with one query and kept current by
+    ``add``/``discard`` from model signals. Writes from other processes bump
+    the index's cache generation, which makes this process reload on its
+    next lookup.
+    """
+
+    def __init__(self, namespace, model, filters, fields, describe):
+        self.namespace = namespace
+        self.model = model
+        self.filters = filters
+        self.fields = fields
+        self.describe = describe
+        self.generation = None
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._grams = defaultdict(set)
+
+    def _load(self):
+        self._entries.clear()
+        self._grams.clear()
+        queryset = apps.get_model(self.model).objects.filter(**self.filters).order_by()
+        for row in queryset.values('id', *self.fields).iterator(chunk_size=2000):
+            self._add(row)
+
+    def _add(self, row):
+        suggestion, text = self.describe(row)
+        self._discard(suggestion.id)
+        words = _words(text)
+        self._entries[suggestion.id] = (suggestion, words)
+        for word in words:
+            for gram in _grams(word):
+                self._grams[gram].add(suggestion.id)
+
+    def _discard(self, pk):
+        entry = self._entries.pop(pk, None)
+        if entry is None:
+            return
+        for word in entry[1]:
+            for gram in _grams(word):
+                ids = self._grams.get(gram)
+                if ids is not None:
+                    ids.discard(pk)
+                    if not ids:
+                        del self._grams[gram]
+
+    def _current(self):
+        current = generation(self.namespace)
+        if current != self.generation:
+            self._load()
+            self.generation = current
+
+    def _advance(self, previous, current):
+        """
+        Adopt ``current`` after applying this process's own change, if nothing else changed.
+
+        When the generation before the bump is not the one this index was
+        loaded at, another process wrote rows this index has not seen, so
+        it is left to reload on its next lookup.
+        """
+        self.generation = current if previous == self.generation else None
+
+    def add(self, obj, previous, current):
+        """Index ``obj``, or drop it when it no longer belongs in the index."""
+        with self._lock:
+            if self.generation is None:
+                return
+            if all(getattr(obj, name) == value for name, value in self.filters.items()):
+                self._add({name: getattr(obj, name) for name in ('id', *self.fields)})
+            else:
+                self._discard(obj.pk)
+            self._advance(previous, current)
+
+    def discard(self, pk, previous, current):
+        with self._lock:
+            if self.generation is None:
+                return
+            self._discard(pk)
+            self._advance(previous, current)
+
+    def lookup(self, query, limit=MAX_SUGGESTIONS):
+        """
+        Best ``limit`` suggestions containing every word of ``query``.
+
+        Each query word must start one of the row's words when it is short and
+        appear anywhere in one when it has three letters or more. Rows whose
+        words start with the query words come first, then shorter labels.
+        """
+        terms = _words(query)
+        if not terms:
+            return []
+        with self._lock:
+            self._current()
+            candidates = None
+            for term in terms:
+                for gram in _query_grams(term):
+                    ids = self._grams.get(gram, set())
+                    candidates = set(ids) if candidates is None else candidates & ids
+                    if not candidates:
+                        return []
+            scored = []
+            for pk in candidates:
+                suggestion, words = self._entries[pk]
+                prefixes = 0
+                for term in terms:
+                    if any(word.startswith(term) for word in words):
+                        prefixes += 1
+                    elif len(term) < 3 or not any(term in word for word in words):
+                        break
+                else:
+                    scored.append((-prefixes, len(suggestion.label), suggestion.label, suggestion))
+        scored.sort(key=lambda row: row[:3])
+        return [row[3] for row in scored[:limit]]
+
+
+def _describe_person(row):
+    label = f"{row['first_name']} {row['last_name']}".strip() or row['username']
+    return Suggestion(row['id'], label, row['username']), f"{row['username']} {label}"
+
+
+def _describe_room(row):
+    room_type = ROOM_TYPES.get(row['room_type'], row['room_type'])
+    detail = f"{room_type}, floor {row['floor']}"
+    return Suggestion(row['id'], f"Room {row['room_number']}", detail), f"room {row['room_number']} {row['room_type']}"
+
+
+PEOPLE_FIELDS = ('username', 'first_name', 'last_name')
+ROOM_FIELDS = ('room_number', 'room_type', 'floor')
+# Complaints can be assigned to any user with the is_staff flag
+STAFF_FILTERS = {'is_staff': True}
+
+# kind -> index; the people indexes share one generation
+TYPEAHEAD_INDEXES = {
+    'students': TypeaheadIndex('typeahead-user', 'users.User', {'user_type': 'student'}, PEOPLE_FIELDS, _describe_person),
+    'staff': TypeaheadIndex('typeahead-user', 'users.User', STAFF_FILTERS, PEOPLE_FIELDS, _describe_person),
+    'rooms': TypeaheadIndex('typeahead-room', 'rooms.Room', {}, ROOM_FIELDS, _describe_room),
+}
+PEOPLE_KINDS = ('students', 'staff')
+
+
+def indexes_for(model):
+    """Indexes over ``model`` and the fields whose changes they must see."""
+    indexes = [index for index in TYPEAHEAD_INDEXES.values() if index.model == model._meta.label]
+    watched = set()
+    for index in indexes:
+        watched.update(index.fields, index.filters)
+    return indexes, watched
+
+
+def suggest(kind, query, limit=MAX_SUGGESTIONS):
+    return TYPEAHEAD_INDEXES[kind].lookup(query, limit)
@@ -1,63 +1,35 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.db.models import Q
 from django.contrib import messages
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.template.defaultfilters import pluralize
+from django.urls import reverse
+from django.utils.dateparse import parse_date
 from django.utils import timezone
-from .models import Payment, Complaint, Notification
-from rooms.models import Room
+from django.views.decorators.http import require_POST
+from .caching import cache_stats
+from .exports import EXPORT_FORMATS, export_filename, export_rows, render_export
+from .imports import IMPORTERS, import_rows
+from .models import Payment, Complaint, Notification, NotificationDelivery
+from .notifications import BULK_ACTIONS, enqueue_complaint_notifications
+from .pagination import CursorPaginator
+from .search import search
+from .typeahead import PEOPLE_KINDS, STAFF_FILTERS, TYPEAHEAD_INDEXES, suggest
+from rooms.models import Room, RoomAllocation
 from users.models import User
 from users.decorators import admin_required
 
-def create_complaint_notification(complaint, action_type, sender):
-    """Create a notification for complaint updates."""
-    if action_type == 'created':
-        title = f'New Complaint: {complaint.title}'
-        message = f'A new complaint has been reported regarding {complaint.get_category_display()}'
-    elif action_type == 'updated':
-        title = f'Complaint Updated: {complaint.title}'
-        message = f'The complaint status has been updated to {complaint.get_status_display()}'
-    elif action_type == 'assigned':
-        title = f'Complaint Assigned: {complaint.title}'
-        message = f'The complaint has been assigned to {complaint.assigned_to.get_full_name()}'
-    elif action_type == 'resolved':
-        title = f'Complaint Resolved: {complaint.title}'
-        message = f'The complaint has been marked as resolved'
-    
-    # Create notification
-    notification = Notification.objects.create(
-        title=title,
-        message=message,
-        notification_type='complaint',
-        priority='medium',
-        sender=sender
-    )
-    
-    # Add recipients
-    recipients = [complaint.reported_by]  # Always notify the reporter
-    if complaint.assigned_to:
-        recipients.append(complaint.assigned_to)  # Notify assigned staff
-    if complaint.room:
-        # Notify all students allocated to the room
-        room_students = User.objects.filter(roomallocation__room=complaint.room, roomallocation__check_out_date__isnull=True)
-        recipients.extend(room_students)
-    
-    # Add unique recipients
-    notification.recipients.add(*set(recipients))
-    return notification
-
-from users.decorators import admin_required
-
-@login_required
-@admin_required
-def payment_list(request):
-    # Get filter parameters
-    status = request.GET.get('status', '')
-    payment_type = request.GET.get('type', '')
-    search_query = request.GET.get('search', '')
+def filter_payments(params):
+    """Apply the payment list filters in ``params``; returns the payments and their keyset ordering."""
+    status = params.get('status', '')
+    payment_type = params.get('type', '')
+    search_query = params.get('search', '')
     
     # Base queryset
-    payments = Payment.objects.all().order_by('-due_date')
+    payments = Payment.objects.for_list()
     
     # Apply filters
     if status:
@@ -65,17 +37,34 @@ def payment_list(request):
     if payment_type:
         payments = payments.filter(payment_type=payment_type)
     if search_query:
+        # Students are matched in their own table, so the payments are not joined to it
+        students = User.objects.filter(
+            Q(username__icontains=search_query) |
+            Q(first_name__icontains=search_query) |
+            Q(last_name__icontains=search_query)
+        )
         payments = payments.filter(
-            Q(student__username__icontains=search_query) |
-            Q(student__first_name__icontains=search_query) |
-            Q(student__last_name__icontains=search_query) |
+            Q(student__in=students.values('pk')) |
             Q(transaction_id__icontains=search_query)
         )
+    return payments, ('-due_date', 'id')
+
+@login_required
+@admin_required
+def payment_list(request):
+    # Get filter parameters
+    status = request.GET.get('status', '')
+    payment_type = request.GET.get('type', '')
+    search_query = request.GET.get('search', '')
+    payments, ordering = filter_payments(request.GET)
     
-    # Pagination
-    paginator = Paginator(payments, 10)  # Show 10 payments per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination
+    paginator = CursorPaginator(payments, ordering, 10, estimate_total=True)  # Show 10 payments per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+
+    # Keep the active filters on pagination links
+    filter_params = request.GET.copy()
+    filter_params.pop('cursor', None)
     
     context = {
         'page_obj': page_obj,
@@ -84,37 +73,50 @@ def payment_list(request):
         'selected_status': status,
         'selected_type': payment_type,
         'search_query': search_query,
+        'filter_query': filter_params.urlencode(),
     }
     return render(request, 'core/payment_list.html', context)
 
-@login_required
-def complaint_list(request):
-    # Get filter parameters
-    status = request.GET.get('status', '')
-    category = request.GET.get('category', '')
-    search_query = request.GET.get('search', '')
+def filter_complaints(params):
+    """Apply the complaint list filters in ``params``; returns the complaints and their keyset ordering."""
+    status = params.get('status', '')
+    category = params.get('category', '')
+    search_query = params.get('search', '')
     
     # Base queryset
-    complaints = Complaint.objects.all().order_by('-created_at')
+    complaints = Complaint.objects.for_list()
     
     # Apply filters
     if status:
         complaints = complaints.filter(status=status)
     if category:
         complaints = complaints.filter(category=category)
+    ordering = ('-created_at', '-id')
     if search_query:
-        complaints = complaints.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(student__username__icontains=search_query) |
-            Q(student__first_name__icontains=search_query) |
-            Q(student__last_name__icontains=search_query)
-        )
+        reporter = User.objects.filter(username=search_query).first()
+        if reporter:
+            complaints = complaints.filter(reported_by=reporter)
+        else:
+            # Full-text match on the title and description, best matches first
+            complaints = search(complaints, 'complaint', search_query)
+            ordering = ('-search_rank', '-id')
+    return complaints, ordering
+
+@login_required
+def complaint_list(request):
+    # Get filter parameters
+    status = request.GET.get('status', '')
+    category = request.GET.get('category', '')
+    search_query = request.GET.get('search', '')
+    complaints, ordering = filter_complaints(request.GET)
     
-    # Pagination
-    paginator = Paginator(complaints, 10)  # Show 10 complaints per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination
+    paginator = CursorPaginator(complaints, ordering, 10, estimate_total=True)  # Show 10 complaints per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+
+    # Keep the active filters on pagination links
+    filter_params = request.GET.copy()
+    filter_params.pop('cursor', None)
     
     context = {
         'page_obj': page_obj,
@@ -123,6 +125,7 @@ def complaint_list(request):
         'selected_status': status,
         'selected_category': category,
         'search_query': search_query,
+        'filter_query': filter_params.urlencode(),
     }
     return render(request, 'core/complaint_list.html', context)
 
@@ -145,8 +148,8 @@ def create_complaint(request):
                     reported_by=request.user,
                     status='open'
                 )
-                # Create notification for new complaint
-                create_complaint_notification(complaint, 'created', request.user)
+                # Queue notification for new complaint
+                enqueue_complaint_notifications(complaint, ['created'], request.user)
                 messages.success(request, 'Complaint reported successfully.')
                 return redirect('complaint_list')
             except Room.DoesNotExist:
@@ -154,16 +157,14 @@ def create_complaint(request):
         else:
             messages.error(request, 'Please fill in all required fields.')
     
-    rooms = Room.objects.all()
     context = {
-        'rooms': rooms,
         'category_choices': Complaint.CATEGORY_CHOICES
     }
     return render(request, 'core/create_complaint.html', context)
 
 @login_required
 def complaint_detail(request, complaint_id):
-    complaint = get_object_or_404(Complaint, id=complaint_id)
+    complaint = get_object_or_404(Complaint.objects.for_list(), id=complaint_id)
     
     if request.method == 'POST' and (request.user.is_staff or request.user == complaint.reported_by):
         new_status = request.POST.get('status')
@@ -171,75 +172,91 @@ def complaint_detail(request, complaint_id):
         assigned_to_id = request.POST.get('assigned_to')
         
         if new_status:
+            old_status = complaint.status
+            old_assigned_to_id = complaint.assigned_to_id
+            
             complaint.status = new_status
             if new_status in ['resolved', 'closed']:
                 complaint.resolved_at = timezone.now()
                 complaint.resolution = resolution
             
-            old_status = complaint.status
-            old_assigned_to = complaint.assigned_to
-            
             if assigned_to_id and request.user.is_staff:
                 try:
-                    assigned_to = User.objects.get(id=assigned_to_id)
+                    assigned_to = User.objects.get(id=assigned_to_id, **STAFF_FILTERS)
                     complaint.assigned_to = assigned_to
-                except User.DoesNotExist:
+                except (User.DoesNotExist, ValueError):
                     messages.error(request, 'Invalid staff member selected.')
                     return redirect('complaint_detail', complaint_id=complaint.id)
             
             complaint.save()
             
-            # Create notifications based on changes
-            if complaint.assigned_to and complaint.assigned_to != old_assigned_to:
-                create_complaint_notification(complaint, 'assigned', request.user)
+            # Queue notifications based on changes
+            actions = []
+            if complaint.assigned_to_id and complaint.assigned_to_id != old_assigned_to_id:
+                actions.append('assigned')
             if complaint.status != old_status:
                 if complaint.status in ['resolved', 'closed']:
-                    create_complaint_notification(complaint, 'resolved', request.user)
+                    actions.append('resolved')
                 else:
-                    create_complaint_notification(complaint, 'updated', request.user)
+                    actions.append('updated')
+            if actions:
+                enqueue_complaint_notifications(complaint, actions, request.user)
             
             messages.success(request, 'Complaint status updated successfully.')
             return redirect('complaint_detail', complaint_id=complaint.id)
     
-    staff_members = User.objects.filter(is_staff=True)
     context = {
         'complaint': complaint,
         'status_choices': Complaint.STATUS_CHOICES,
-        'staff_members': staff_members
     }
     return render(request, 'core/complaint_detail.html', context)
 
+def filter_deliveries(user, params):
+    """Apply the notification list filters in ``params`` to ``user``'s deliveries."""
+    notification_type = params.get('type', '')
+    priority = params.get('priority', '')
+    search_query = params.get('search', '')
+    
+    if params.get('archived') == 'true':
+        deliveries = NotificationDelivery.objects.filter(recipient=user).archived()
+    else:
+        deliveries = NotificationDelivery.objects.filter(recipient=user).inbox().live()
+    if notification_type:
+        deliveries = deliveries.filter(notification__notification_type=notification_type)
+    if priority:
+        deliveries = deliveries.filter(notification__priority=priority)
+    if search_query:
+        deliveries = search(deliveries, 'notification', search_query, 'notification')
+    return deliveries
+
 @login_required
 def notification_list(request):
     # Get filter parameters
     notification_type = request.GET.get('type', '')
     priority = request.GET.get('priority', '')
     is_unread = request.GET.get('unread', '')
+    is_archived = request.GET.get('archived', '')
     search_query = request.GET.get('search', '')
     
-    # Base queryset - get notifications where the user is a recipient
-    notifications = Notification.objects.filter(recipients=request.user).order_by('-created_at')
+    # Base queryset - the user's deliveries, newest first
+    deliveries = filter_deliveries(request.user, request.GET)
     
-    # Apply filters
-    if notification_type:
-        notifications = notifications.filter(notification_type=notification_type)
-    if priority:
-        notifications = notifications.filter(priority=priority)
+    # Get unread count - the stored counter unless other filters narrow the list
+    if notification_type or priority or search_query or is_archived:
+        unread_count = deliveries.unread().count()
+    else:
+        unread_count = request.user.unread_notification_count
     if is_unread == 'true':
-        notifications = notifications.exclude(read_by=request.user)
-    if search_query:
-        notifications = notifications.filter(
-            Q(title__icontains=search_query) |
-            Q(message__icontains=search_query)
-        )
-    
-    # Pagination
-    paginator = Paginator(notifications, 20)  # Show 20 notifications per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        deliveries = deliveries.unread()
     
-    # Get unread count
-    unread_count = notifications.exclude(read_by=request.user).count()
+    # Keyset pagination
+    ordering = ('-search_rank', '-id') if search_query else ('-delivered_at', '-id')
+    paginator = CursorPaginator(deliveries.for_list(), ordering, 20)  # Show 20 notifications per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+
+    # Keep the active filters on pagination links
+    filter_params = request.GET.copy()
+    filter_params.pop('cursor', None)
     
     context = {
         'page_obj': page_obj,
@@ -249,13 +266,132 @@ def notification_list(request):
         'selected_type': notification_type,
         'selected_priority': priority,
         'is_unread': is_unread,
+        'is_archived': is_archived,
         'search_query': search_query,
+        'filter_query': filter_params.urlencode(),
     }
     return render(request, 'core/notification_list.html', context)
 
+@login_required
+@require_POST
+def bulk_notification_action(request):
+    """Apply one action to the selected notifications, or to every one matching the filters."""
+    action = request.POST.get('action', '')
+    if action not in BULK_ACTIONS:
+        messages.error(request, 'Unknown notification action.')
+        return redirect('notification_list')
+    handler, label = BULK_ACTIONS[action]
+    
+    deliveries = filter_deliveries(request.user, request.POST)
+    if request.POST.get('unread') == 'true':
+        deliveries = deliveries.unread()
+    if request.POST.get('scope') != 'all':
+        selected = [pk for pk in request.POST.getlist('notifications') if pk.isdigit()]
+        if not selected:
+            messages.error(request, 'Please select at least one notification.')
+            return redirect(f"{reverse('notification_list')}?{request.POST.get('filter_query', '')}")
+        deliveries = deliveries.filter(notification_id__in=selected)
+    
+    updated = handler(deliveries)
+    messages.success(request, f'{updated} notification{pluralize(updated)} {label}.')
+    return redirect(f"{reverse('notification_list')}?{request.POST.get('filter_query', '')}")
+
 @login_required
 def mark_notification_read(request, notification_id):
     notification = get_object_or_404(Notification, id=notification_id, recipients=request.user)
     notification.mark_as_read(request.user)
     messages.success(request, 'Notification marked as read.')
     return redirect('notification_list')
+
+@login_required
+@admin_required
+def cache_statistics(request):
+    """Hit and miss counters of the view and fragment caches."""
+    return JsonResponse({'backend': settings.CACHE_BACKEND, 'areas': cache_stats()})
+
+@login_required
+def typeahead(request, kind):
+    """Up to ten students, staff members or rooms matching ``q``, from the in-memory index."""
+    if kind not in TYPEAHEAD_INDEXES:
+        raise Http404(kind)
+    if kind in PEOPLE_KINDS and not (request.user.is_staff or request.user.is_admin() or request.user.is_staff_member()):
+        raise PermissionDenied
+    suggestions = suggest(kind, request.GET.get('q', ''))
+    return JsonResponse({'results': [suggestion.as_json() for suggestion in suggestions]})
+
+@login_required
+@admin_required
+def import_data(request):
+    """Upload a CSV or .xlsx file of rooms, students or payments and import it in batches."""
+    result = None
+    kind = request.POST.get('kind', 'rooms')
+    upload = request.FILES.get('file')
+    if request.method == 'POST':
+        if kind not in IMPORTERS or upload is None:
+            messages.error(request, 'Choose what to import and a file to import it from.')
+        else:
+            try:
+                result = import_rows(kind, upload.file, upload.name, dry_run=bool(request.POST.get('dry_run')))
+            except ValidationError as exc:
+                messages.error(request, ' '.join(exc.messages))
+
+    context = {
+        'kinds': [(name, importer().columns(), importer().required_columns()) for name, importer in IMPORTERS.items()],
+        'selected_kind': kind,
+        'result': result,
+    }
+    return render(request, 'core/import_data.html', context)
+
+def _parse_day(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+def filter_allocations(params):
+    """
+    Allocations matching ``params``: ``status`` (active or ended), a ``room``
+    number, a ``student`` username and a ``from``/``to`` check-in range.
+    """
+    status = params.get('status', '')
+    room_number = params.get('room', '')
+    username = params.get('student', '')
+    check_in_from = _parse_day(params.get('from'))
+    check_in_to = _parse_day(params.get('to'))
+
+    allocations = RoomAllocation.objects.all()
+    if status == 'active':
+        allocations = allocations.current()
+    elif status == 'ended':
+        allocations = allocations.exclude(is_active=True, check_out_date__isnull=True)
+    if room_number:
+        allocations = allocations.filter(room__room_number=room_number)
+    if username:
+        allocations = allocations.filter(student__username=username)
+    if check_in_from:
+        allocations = allocations.filter(check_in_date__gte=check_in_from)
+    if check_in_to:
+        allocations = allocations.filter(check_in_date__lte=check_in_to)
+    return allocations, ('id',)
+
+# kind -> function applying the list filters in a QueryDict to that kind's rows
+EXPORT_FILTERS = {
+    'payments': filter_payments,
+    'allocations': filter_allocations,
+    'complaints': filter_complaints,
+}
+
+@login_required
+@admin_required
+def export_data(request, kind, fmt):
+    """Stream every payment, allocation or complaint matching the list filters as CSV or JSON Lines."""
+    if kind not in EXPORT_FILTERS or fmt not in EXPORT_FORMATS:
+        raise Http404(f'{kind}.{fmt}')
+    queryset, ordering = EXPORT_FILTERS[kind](request.GET)
+    response = StreamingHttpResponse(
+        render_export(export_rows(queryset, kind, ordering), kind, fmt),
+        content_type=f'{EXPORT_FORMATS[fmt]}; charset=utf-8',
+    )
+    filename = export_filename(kind, fmt, timezone.localdate())
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -96,6 +97,26 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache backend, picked with HOSTEL_CACHE_BACKEND: locmem (per process),
+# file (shared by processes on one host) or redis (shared by every host)
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hostel-management',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('HOSTEL_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+CACHE_BACKEND = os.environ.get('HOSTEL_CACHE_BACKEND', 'locmem')
+CACHES = {'default': CACHE_BACKENDS[CACHE_BACKEND]}
+CACHE_TIMEOUT = 300
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Custom User Model
@@ -9,15 +9,19 @@ from core import views as core_views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', user_views.dashboard, name='dashboard'),
+    path('dashboard/charts.json', user_views.dashboard_charts, name='dashboard_charts'),
     path('login/', user_views.login_view, name='login'),
     path('logout/', user_views.logout_view, name='logout'),
     path('settings/', user_views.settings_view, name='settings'),  # Updated this line
     
     # Room management URLs
     path('rooms/', room_views.room_list, name='room_list'),
+    path('rooms/availability/', room_views.availability_calendar, name='availability_calendar'),
+    path('rooms/availability.json', room_views.availability_api, name='availability_api'),
     path('rooms/<int:room_id>/', room_views.room_detail, name='room_detail'),
     path('rooms/<int:room_id>/allocate/', room_views.allocate_room, name='allocate_room'),
     path('rooms/<int:room_id>/maintenance/', room_views.report_maintenance, name='report_maintenance'),
+    path('allocations/<int:allocation_id>/checkout/', room_views.checkout_allocation, name='checkout_allocation'),
     
     # Student management URLs
     path('students/', user_views.student_list, name='student_list'),
@@ -37,6 +41,19 @@ urlpatterns = [
     # Notification URLs
     path('notifications/', core_views.notification_list, name='notification_list'),
     path('notifications/<int:notification_id>/mark-read/', core_views.mark_notification_read, name='mark_notification_read'),
+    path('notifications/bulk/', core_views.bulk_notification_action, name='bulk_notification_action'),
+
+    # Typeahead URLs
+    path('typeahead/<str:kind>.json', core_views.typeahead, name='typeahead'),
+
+    # Import URLs
+    path('import/', core_views.import_data, name='import_data'),
+
+    # Export URLs
+    path('export/<str:kind>.<str:fmt>', core_views.export_data, name='export_data'),
+
+    # Cache URLs
+    path('cache/stats.json', core_views.cache_statistics, name='cache_statistics'),
 ]
 
 if settings.DEBUG:
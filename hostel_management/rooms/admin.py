@@ -1,4 +1,5 @@
 from django.contrib import admin
+from .allocation import checkout_allocations
 from .models import Room, RoomAllocation, RoomMaintenance
 
 @admin.register(Room)
@@ -17,6 +18,12 @@ class RoomAllocationAdmin(admin.ModelAdmin):
     ordering = ('-check_in_date',)
     readonly_fields = ('created_at', 'updated_at')
     raw_id_fields = ('room', 'student')
+    actions = ('check_out',)
+
+    @admin.action(description='Check out selected allocations')
+    def check_out(self, request, queryset):
+        checked_out = checkout_allocations(queryset)
+        self.message_user(request, f'{checked_out} allocation(s) checked out.')
 
 @admin.register(RoomMaintenance)
 class RoomMaintenanceAdmin(admin.ModelAdmin):
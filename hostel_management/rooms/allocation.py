@@ -0,0 +1,268 @@
+import csv
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from core.caching import invalidate_on_commit
+from users.models import User
+from .matching import RoomPreferences, VacancyIndex, assign_cohort
+from .models import Room, RoomAllocation
+
+BULK_BATCH_SIZE = 500
+
+
+class AllocationError(Exception):
+    pass
+
+
+def occupancy_increment(count=1):
+    """
+    Update kwargs adding ``count`` occupants to a room in SQL.
+
+    The status flips to occupied in the same statement once the room is full.
+    """
+    return {
+        'current_occupancy': F('current_occupancy') + count,
+        'status': Case(
+            When(current_occupancy__gte=F('capacity') - count, then=Value('occupied')),
+            default=F('status'),
+        ),
+        'updated_at': timezone.now(),
+    }
+
+
+def release_places(counts):
+    """
+    Take ``{room_id: places}`` occupants out of their rooms, one UPDATE per distinct count.
+
+    Occupied rooms that now have space become available again; rooms under
+    maintenance or reserved keep their status.
+    """
+    by_count = defaultdict(list)
+    for room_id, places in counts.items():
+        if places:
+            by_count[places].append(room_id)
+    now = timezone.now()
+    for places, room_ids in by_count.items():
+        Room.objects.filter(pk__in=room_ids).update(
+            current_occupancy=Greatest(F('current_occupancy') - places, Value(0)),
+            status=Case(
+                When(status='occupied', current_occupancy__lt=F('capacity') + places, then=Value('available')),
+                default=F('status'),
+            ),
+            updated_at=now,
+        )
+
+
+def checkout_allocations(allocations, check_out_date=None):
+    """
+    Check out every current allocation in ``allocations`` and free their places.
+
+    One transaction: the affected rooms are locked, the allocations are closed
+    with a single UPDATE and occupancy is lowered per room with set-based
+    UPDATEs. Returns the number of allocations checked out.
+    """
+    check_out_date = check_out_date or timezone.localdate()
+    with transaction.atomic():
+        allocations = allocations.current()
+        room_ids = allocations.values('room_id')
+        list(Room.objects.select_for_update().filter(pk__in=room_ids).values_list('pk', flat=True))
+        counts = {
+            row['room_id']: row['places']
+            for row in allocations.values('room_id').annotate(places=Count('pk')).order_by()
+        }
+        checked_out = allocations.update(is_active=False, check_out_date=check_out_date, updated_at=timezone.now())
+        release_places(counts)
+        invalidate_on_commit('room', 'allocation')
+    return checked_out
+
+
+def reconcile_occupancy(rooms=None, dry_run=False):
+    """
+    Recompute current_occupancy from current allocations in one UPDATE.
+
+    Occupied and available statuses are brought in line with the recomputed
+    counts. Returns the number of rooms whose stored occupancy had drifted.
+    """
+    if rooms is None:
+        rooms = Room.objects.all()
+    actual = Coalesce(Subquery(
+        RoomAllocation.objects.current()
+        .filter(room_id=OuterRef('pk'))
+        .values('room_id')
+        .annotate(places=Count('pk'))
+        .values('places')
+    ), 0)
+    drifted = rooms.annotate(actual=actual).exclude(current_occupancy=F('actual')).count()
+    if dry_run:
+        return drifted
+    with transaction.atomic():
+        rooms.update(current_occupancy=actual, updated_at=timezone.now())
+        rooms.filter(status='available', current_occupancy__gte=F('capacity')).update(status='occupied')
+        rooms.filter(status='occupied', current_occupancy__lt=F('capacity')).update(status='available')
+        invalidate_on_commit('room')
+    return drifted
+
+
+def allocate_student(room_id, student, check_in_date):
+    """
+    Allocate ``student`` a place in room ``room_id`` and return the new allocation.
+
+    Runs in one short transaction. The place is taken first, by an UPDATE
+    that only matches the room while it is available and has space, so two
+    concurrent requests for its last place cannot both succeed; this holds
+    on SQLite too, where select_for_update() locks nothing. The student's
+    current allocation is checked after that write, and the allocation is
+    inserted last. Raises AllocationError, rolling everything back, when the
+    allocation is not possible.
+    """
+    try:
+        check_in_date = RoomAllocation._meta.get_field('check_in_date').to_python(check_in_date)
+    except ValidationError:
+        raise AllocationError('Please enter a valid check-in date')
+    with transaction.atomic():
+        taken = Room.objects.filter(
+            pk=room_id, status='available', current_occupancy__lt=F('capacity'),
+        ).update(**occupancy_increment())
+        if not taken:
+            raise AllocationError('This room is not available for allocation or is at full capacity')
+        if RoomAllocation.objects.current().filter(student=student).exists():
+            raise AllocationError(f'{student.get_full_name()} already has a room')
+        try:
+            with transaction.atomic():
+                allocation = RoomAllocation.objects.create(
+                    room_id=room_id,
+                    student=student,
+                    check_in_date=check_in_date,
+                )
+        except IntegrityError:
+            raise AllocationError(f'{student.get_full_name()} was already allocated this room on that date')
+        invalidate_on_commit('room')
+    return allocation
+
+
+@dataclass(frozen=True)
+class AllocationRequest:
+    """A student (username) and their room preferences, most preferred first."""
+    student: str
+    room_types: tuple = ()
+    floor: int = None
+
+
+@dataclass
+class BulkAllocationReport:
+    placements: list = field(default_factory=list)
+    failures: list = field(default_factory=list)
+    elapsed: float = 0.0
+    dry_run: bool = False
+
+    @property
+    def placed(self):
+        return len(self.placements)
+
+    @property
+    def failed(self):
+        return len(self.failures)
+
+
+def read_allocation_csv(lines):
+    """
+    Parse ``student,room_types,floor`` rows into AllocationRequests.
+
+    ``room_types`` is a ``|``-separated preference list and may be empty, as
+    may ``floor``. Rows that cannot be parsed are returned as failures.
+    """
+    requests, failures = [], []
+    for line_number, row in enumerate(csv.DictReader(lines), start=2):
+        student = (row.get('student') or '').strip()
+        room_types = tuple(t.strip() for t in (row.get('room_types') or '').split('|') if t.strip())
+        floor = (row.get('floor') or '').strip()
+        if not student:
+            failures.append((f'line {line_number}', 'Missing student'))
+            continue
+        if not floor.isdigit() and floor:
+            failures.append((student, f'Invalid floor {floor!r} on line {line_number}'))
+            continue
+        requests.append(AllocationRequest(student, room_types, int(floor) if floor else None))
+    return requests, failures
+
+
+def take_places(counts):
+    """Add ``{room_id: places}`` occupants to their rooms, one UPDATE per distinct count."""
+    by_count = defaultdict(list)
+    for room_id, places in counts.items():
+        if places:
+            by_count[places].append(room_id)
+    for places, room_ids in by_count.items():
+        Room.objects.filter(pk__in=room_ids).update(**occupancy_increment(places))
+
+
+def bulk_allocate(requests, check_in_date, dry_run=False, batch_size=BULK_BATCH_SIZE):
+    """
+    Place a cohort of students into rooms in one transaction.
+
+    Available rooms are locked and loaded once into a VacancyIndex, and
+    students and their current allocations are resolved in one query each.
+    The valid requests are then placed together with assign_cohort: room
+    types are hard limits, tried in preference order, and the floor is a
+    preference. The allocations are written with bulk_create and the rooms'
+    occupancy with one UPDATE per distinct number of places taken.
+    ``dry_run`` computes the same report without writing anything.
+    """
+    started = time.monotonic()
+    check_in_date = RoomAllocation._meta.get_field('check_in_date').to_python(check_in_date)
+    report = BulkAllocationReport(dry_run=dry_run)
+    room_types = tuple(code for code, _ in Room.ROOM_TYPE_CHOICES)
+
+    with transaction.atomic():
+        available = Room.objects.filter(status='available', current_occupancy__lt=F('capacity'))
+        locked = list(available.select_for_update().values_list('pk', flat=True))
+        index = VacancyIndex.build(Room.objects.filter(pk__in=locked))
+        students = User.objects.filter(
+            username__in={request.student for request in requests}, user_type='student',
+        ).in_bulk(field_name='username')
+        housed = set(
+            RoomAllocation.objects.current()
+            .filter(student__in=students.values())
+            .values_list('student_id', flat=True)
+        )
+
+        preferences = {}
+        for request in requests:
+            student = students.get(request.student)
+            if student is None:
+                report.failures.append((request.student, 'Unknown student'))
+                continue
+            if student.pk in housed:
+                report.failures.append((request.student, 'Already has a room'))
+                continue
+            if student in preferences:
+                report.failures.append((request.student, 'Listed more than once'))
+                continue
+            unknown = set(request.room_types) - set(room_types)
+            if unknown:
+                report.failures.append((request.student, f"Unknown room type {', '.join(sorted(unknown))}"))
+                continue
+            preferences[student] = RoomPreferences(request.room_types or room_types, request.floor)
+
+        allocations = []
+        for student, vacancy in assign_cohort(index, preferences).items():
+            if vacancy is None:
+                report.failures.append((student.username, 'No vacancy matches the preferences'))
+                continue
+            allocations.append(RoomAllocation(room_id=vacancy.id, student=student, check_in_date=check_in_date))
+            report.placements.append((student.username, vacancy.room_number))
+
+        if not dry_run and allocations:
+            RoomAllocation.objects.bulk_create(allocations, batch_size=batch_size)
+            take_places(Counter(allocation.room_id for allocation in allocations))
+            invalidate_on_commit('room', 'allocation')
+
+    report.elapsed = time.monotonic() - started
+    return report
@@ -0,0 +1,88 @@
+import datetime
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import accumulate
+
+from django.db.models import Q
+
+from .models import Room, RoomAllocation
+
+UNBOOKABLE_STATUSES = ('maintenance',)
+
+
+def overlapping(start, end):
+    """
+    Allocations occupying any night in ``[start, end)``.
+
+    An allocation holds its room from check_in_date up to, but not including,
+    check_out_date; open allocations run on indefinitely. Future check-ins
+    are reservations and count like any other allocation.
+    """
+    return RoomAllocation.objects.filter(
+        Q(check_out_date__gt=start) | Q(check_out_date__isnull=True, is_active=True),
+        check_in_date__lt=end,
+    )
+
+
+def occupancy_by_day(start, end, rooms=None):
+    """
+    Return ``{room_id: [occupants per day]}`` for ``[start, end)`` from one query.
+
+    Each overlapping allocation adds +1 on its first day in the window and
+    -1 after its last, so a running sum gives the daily head count.
+    """
+    days = (end - start).days
+    allocations = overlapping(start, end)
+    if rooms is not None:
+        allocations = allocations.filter(room__in=rooms)
+    deltas = defaultdict(lambda: [0] * (days + 1))
+    for room_id, check_in, check_out in allocations.values_list('room_id', 'check_in_date', 'check_out_date'):
+        first = max((check_in - start).days, 0)
+        last = days if check_out is None else min((check_out - start).days, days)
+        deltas[room_id][first] += 1
+        deltas[room_id][last] -= 1
+    return {room_id: list(accumulate(delta[:-1])) for room_id, delta in deltas.items()}
+
+
+@dataclass
+class RoomAvailability:
+    room: Room
+    occupancy: list
+
+    @property
+    def free(self):
+        """Free places per day; rooms under maintenance have none."""
+        if self.room.status in UNBOOKABLE_STATUSES:
+            return [0] * len(self.occupancy)
+        return [max(self.room.capacity - occupied, 0) for occupied in self.occupancy]
+
+    @property
+    def min_free(self):
+        return min(self.free, default=0)
+
+    def days(self, start):
+        """``(date, occupied, free)`` for each day of the window."""
+        return [
+            (start + datetime.timedelta(days=offset), occupied, free)
+            for offset, (occupied, free) in enumerate(zip(self.occupancy, self.free))
+        ]
+
+
+def room_availability(start, end, rooms=None):
+    """Availability of every room in ``rooms`` over ``[start, end)``, in two queries."""
+    if rooms is None:
+        occupancy = occupancy_by_day(start, end)
+        rooms = Room.objects.all()
+    else:
+        occupancy = occupancy_by_day(start, end, rooms.values('pk'))
+    rooms = list(rooms.only('id', 'room_number', 'floor', 'room_type', 'capacity', 'status', 'monthly_rent'))
+    days = (end - start).days
+    return [RoomAvailability(room, occupancy.get(room.pk, [0] * days)) for room in rooms]
+
+
+def available_rooms(start, end, places=1, rooms=None):
+    """Rooms with at least ``places`` free on every night of ``[start, end)``."""
+    return [
+        availability for availability in room_availability(start, end, rooms)
+        if availability.min_free >= places
+    ]
@@ -0,0 +1,94 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from rooms.matching import RoomPreferences, Vacancy, VacancyIndex, amenity_keys, assign_cohort, match_score
+from rooms.models import Room, RoomAllocation
+
+
+def naive_best(preferences, n):
+    """The per-room approach: walk the room table and count each room's occupants."""
+    vacancies = []
+    for room in Room.objects.filter(status='available'):
+        free = room.capacity - RoomAllocation.objects.current().filter(room=room).count()
+        if free <= 0:
+            continue
+        if preferences.room_types and room.room_type not in preferences.room_types:
+            continue
+        if preferences.max_rent is not None and room.monthly_rent > preferences.max_rent:
+            continue
+        vacancies.append(Vacancy(room.pk, room.room_number, room.floor, room.room_type,
+                                 room.monthly_rent, amenity_keys(room.amenities), free))
+    vacancies.sort(key=lambda vacancy: (match_score(vacancy, preferences), vacancy.room_number))
+    return vacancies[:n]
+
+
+class Command(BaseCommand):
+    help = 'Compare the in-memory vacancy index against per-room queries for room matching.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500, help='Random preference sets to match.')
+        parser.add_argument('--naive-students', type=int, default=20, help='How many of them to run the slow way.')
+        parser.add_argument('--top', type=int, default=5, help='Rooms returned per student.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def random_preferences(self, rng, floors, amenities):
+        room_types = [code for code, _ in Room.ROOM_TYPE_CHOICES]
+        return RoomPreferences(
+            room_types=tuple(rng.sample(room_types, rng.randint(0, 2))),
+            floor=rng.choice(floors) if floors and rng.random() < 0.7 else None,
+            max_rent=Decimal(rng.randrange(100, 1000, 25)) if rng.random() < 0.5 else None,
+            amenities=tuple(rng.sample(amenities, min(len(amenities), rng.randint(0, 2)))),
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = VacancyIndex.build()
+        build_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(f'Indexed {len(index)} rooms with vacancies in {build_ms:.1f}ms.')
+        if not len(index):
+            return
+
+        rng = random.Random(options['seed'])
+        floors = sorted(index.by_floor)
+        amenities = sorted(index.by_amenity)
+        cohort = {
+            student: self.random_preferences(rng, floors, amenities)
+            for student in range(options['students'])
+        }
+        if not cohort:
+            self.stdout.write('No students to match.')
+            return
+
+        timings = []
+        for preferences in cohort.values():
+            started = time.perf_counter()
+            index.best(preferences, options['top'])
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f"Index: {len(timings)} queries, mean {statistics.mean(timings):.3f}ms, "
+            f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:.3f}ms."
+        )
+
+        naive = []
+        for preferences in list(cohort.values())[:options['naive_students']]:
+            started = time.perf_counter()
+            expected = naive_best(preferences, options['top'])
+            naive.append((time.perf_counter() - started) * 1000)
+            if [vacancy.id for vacancy in expected] != [vacancy.id for vacancy in index.best(preferences, options['top'])]:
+                self.stdout.write(self.style.WARNING(f'Index and naive results differ for {preferences}.'))
+        if naive:
+            self.stdout.write(
+                f'Naive: {len(naive)} queries, mean {statistics.mean(naive):.3f}ms '
+                f'({statistics.mean(naive) / statistics.mean(timings):.0f}x slower).'
+            )
+
+        started = time.perf_counter()
+        assignments = assign_cohort(index, cohort)
+        placed = sum(1 for vacancy in assignments.values() if vacancy is not None)
+        self.stdout.write(self.style.SUCCESS(
+            f'Cohort: placed {placed} of {len(cohort)} students in {(time.perf_counter() - started) * 1000:.1f}ms.'
+        ))
@@ -0,0 +1,35 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from rooms.allocation import BULK_BATCH_SIZE, bulk_allocate, read_allocation_csv
+
+
+class Command(BaseCommand):
+    help = 'Allocate rooms to a cohort of students from a CSV of student,room_types,floor rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='CSV with a header row; room_types is a |-separated preference list and floor the preferred floor.')
+        parser.add_argument('--check-in-date', required=True, help='Check-in date (YYYY-MM-DD) for every placement.')
+        parser.add_argument('--dry-run', action='store_true', help='Report placements without writing them.')
+        parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8') as lines:
+                requests, failures = read_allocation_csv(lines)
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['csv_file']}: {exc}")
+
+        try:
+            report = bulk_allocate(requests, options['check_in_date'], dry_run=options['dry_run'],
+                                   batch_size=options['batch_size'])
+        except ValidationError:
+            raise CommandError(f"Invalid check-in date '{options['check_in_date']}'.")
+
+        for student, reason in failures + report.failures:
+            self.stdout.write(self.style.WARNING(f'{student}: {reason}'))
+        verb = 'Would place' if report.dry_run else 'Placed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {report.placed} students, {report.failed + len(failures)} failed, '
+            f'in {report.elapsed:.2f}s.'
+        ))
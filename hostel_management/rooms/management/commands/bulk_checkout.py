@@ -0,0 +1,42 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from rooms.allocation import checkout_allocations
+from rooms.models import RoomAllocation
+
+
+class Command(BaseCommand):
+    help = 'Check out current allocations in bulk, e.g. at the end of term.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check-out-date', help='Check-out date (YYYY-MM-DD); defaults to today.')
+        parser.add_argument('--floor', type=int, help='Only allocations on this floor.')
+        parser.add_argument('--room', help='Only allocations in this room number.')
+        parser.add_argument('--checked-in-before', help='Only allocations that started before this date.')
+        parser.add_argument('--dry-run', action='store_true', help='Count the allocations without checking them out.')
+
+    def _parse_date(self, value, option):
+        try:
+            return RoomAllocation._meta.get_field('check_in_date').to_python(value)
+        except ValidationError:
+            raise CommandError(f"Invalid {option} date '{value}'.")
+
+    def handle(self, *args, **options):
+        allocations = RoomAllocation.objects.current()
+        if options['floor'] is not None:
+            allocations = allocations.filter(room__floor=options['floor'])
+        if options['room']:
+            allocations = allocations.filter(room__room_number=options['room'])
+        if options['checked_in_before']:
+            allocations = allocations.filter(
+                check_in_date__lt=self._parse_date(options['checked_in_before'], '--checked-in-before')
+            )
+
+        if options['dry_run']:
+            self.stdout.write(f'{allocations.count()} allocations would be checked out.')
+            return
+        check_out_date = None
+        if options['check_out_date']:
+            check_out_date = self._parse_date(options['check_out_date'], '--check-out-date')
+        checked_out = checkout_allocations(allocations, check_out_date)
+        self.stdout.write(self.style.SUCCESS(f'Checked out {checked_out} allocations.'))
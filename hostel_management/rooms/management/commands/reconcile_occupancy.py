@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from rooms.allocation import reconcile_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Recompute room occupancy and occupied/available status from current allocations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rooms have drifted.')
+
+    def handle(self, *args, **options):
+        drifted = reconcile_occupancy(dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f'{drifted} rooms have drifted occupancy.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Reconciled occupancy; {drifted} rooms had drifted.'))
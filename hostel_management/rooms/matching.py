@@ -0,0 +1,207 @@
+import heapq
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db.models import Count, F, Q
+
+from .models import Room
+
+RENT_BAND_WIDTH = Decimal('50')
+CANDIDATES_PER_STUDENT = 8
+
+
+def rent_band(rent):
+    return int(rent // RENT_BAND_WIDTH)
+
+
+def amenity_keys(amenities):
+    """Amenities are stored as ``{key: enabled}`` or a plain list of keys."""
+    if isinstance(amenities, dict):
+        return frozenset(key for key, enabled in amenities.items() if enabled)
+    return frozenset(amenities or ())
+
+
+@dataclass(frozen=True)
+class RoomPreferences:
+    """What a student asks for. Only ``room_types`` and ``max_rent`` are hard limits."""
+    room_types: tuple = ()
+    floor: int = None
+    max_rent: Decimal = None
+    amenities: tuple = ()
+
+
+def match_score(vacancy, preferences):
+    """Lower is better: room type rank, then floor distance, missing amenities and rent."""
+    score = 0.0
+    if preferences.room_types:
+        score += 10 * preferences.room_types.index(vacancy.room_type)
+    if preferences.floor is not None:
+        score += 5 * abs(vacancy.floor - preferences.floor)
+    score += 3 * sum(1 for key in preferences.amenities if key not in vacancy.amenities)
+    return score + float(vacancy.monthly_rent) / 1000
+
+
+@dataclass
+class Vacancy:
+    id: int
+    room_number: str
+    floor: int
+    room_type: str
+    monthly_rent: Decimal
+    amenities: frozenset
+    free: int
+
+
+class VacancyIndex:
+    """
+    In-memory index of rooms with free places.
+
+    Rooms are bucketed by floor, room type, rent band and amenity key, so
+    a student's candidate set is a few set operations rather than a scan of
+    the room table. ``take`` and ``release`` keep the index current while a
+    cohort is being placed.
+    """
+
+    def __init__(self, vacancies):
+        self.vacancies = {}
+        self.by_floor = defaultdict(set)
+        self.by_type = defaultdict(set)
+        self.by_band = defaultdict(set)
+        self.by_amenity = defaultdict(set)
+        for vacancy in vacancies:
+            self.add(vacancy)
+
+    @classmethod
+    def build(cls, rooms=None):
+        """Load available rooms, counting free places from current allocations, in one query."""
+        if rooms is None:
+            rooms = Room.objects.filter(status='available')
+        rows = (
+            rooms.order_by()
+            .annotate(occupied=Count('allocations', filter=Q(
+                allocations__is_active=True, allocations__check_out_date__isnull=True,
+            )))
+            .filter(occupied__lt=F('capacity'))
+            .values_list('id', 'room_number', 'floor', 'room_type', 'monthly_rent', 'amenities', 'capacity', 'occupied')
+        )
+        return cls(
+            Vacancy(pk, number, floor, room_type, rent, amenity_keys(amenities), capacity - occupied)
+            for pk, number, floor, room_type, rent, amenities, capacity, occupied in rows
+        )
+
+    def __len__(self):
+        return len(self.vacancies)
+
+    def add(self, vacancy):
+        self.vacancies[vacancy.id] = vacancy
+        self.by_floor[vacancy.floor].add(vacancy.id)
+        self.by_type[vacancy.room_type].add(vacancy.id)
+        self.by_band[rent_band(vacancy.monthly_rent)].add(vacancy.id)
+        for key in vacancy.amenities:
+            self.by_amenity[key].add(vacancy.id)
+
+    def remove(self, vacancy):
+        del self.vacancies[vacancy.id]
+        self.by_floor[vacancy.floor].discard(vacancy.id)
+        self.by_type[vacancy.room_type].discard(vacancy.id)
+        self.by_band[rent_band(vacancy.monthly_rent)].discard(vacancy.id)
+        for key in vacancy.amenities:
+            self.by_amenity[key].discard(vacancy.id)
+
+    def take(self, room_id):
+        """Use up one place in ``room_id``; full rooms leave the index."""
+        vacancy = self.vacancies[room_id]
+        vacancy.free -= 1
+        if vacancy.free <= 0:
+            self.remove(vacancy)
+        return vacancy
+
+    def release(self, vacancy):
+        """Give back one place in ``vacancy``, returning it to the index if it had filled up."""
+        vacancy.free += 1
+        if vacancy.id not in self.vacancies:
+            self.add(vacancy)
+
+    def candidates(self, preferences):
+        """Ids of rooms meeting the hard limits of ``preferences``."""
+        if preferences.room_types:
+            ids = set().union(*(self.by_type[room_type] for room_type in preferences.room_types))
+        else:
+            ids = set(self.vacancies)
+        if preferences.max_rent is not None:
+            top_band = rent_band(preferences.max_rent)
+            in_bands = set().union(*(ids_ for band, ids_ in self.by_band.items() if band <= top_band))
+            ids &= in_bands
+            # Only the top band can hold rooms above the limit
+            ids -= {pk for pk in self.by_band.get(top_band, ()) if self.vacancies[pk].monthly_rent > preferences.max_rent}
+        return ids
+
+    def best(self, preferences, n=5):
+        """
+        Return the ``n`` best vacancies for ``preferences``, best first.
+
+        Candidates are visited in (room type, floor) buckets in order of the
+        lowest score a bucket can reach; once the top ``n`` beat that bound
+        the remaining buckets are skipped.
+        """
+        ids = self.candidates(preferences)
+        room_types = preferences.room_types or (None,)
+        if preferences.floor is not None:
+            floors = self.by_floor
+        else:
+            floors = (None,)
+        buckets = sorted(
+            (
+                10 * rank + (5 * abs(floor - preferences.floor) if floor is not None else 0),
+                room_type,
+                floor,
+            )
+            for rank, room_type in enumerate(room_types)
+            for floor in floors
+        )
+
+        top = []
+        for bound, room_type, floor in buckets:
+            if len(top) >= n and bound > top[-1][0]:
+                break
+            bucket = ids
+            if room_type is not None:
+                bucket = bucket & self.by_type[room_type]
+            if floor is not None:
+                bucket = bucket & self.by_floor[floor]
+            scored = (
+                (match_score(self.vacancies[pk], preferences), self.vacancies[pk].room_number, pk)
+                for pk in bucket
+            )
+            top = heapq.nsmallest(n, heapq.merge(top, sorted(scored)))
+        return [self.vacancies[pk] for _, _, pk in top]
+
+
+def assign_cohort(index, preferences_by_student, candidates=CANDIDATES_PER_STUDENT):
+    """
+    Place a whole cohort at once, consuming places in ``index``.
+
+    Every student's top ``candidates`` rooms are pooled and granted in global
+    score order, so a strong match for one student is not lost to another
+    student who would have been almost as happy elsewhere. Students left
+    over are then given their best remaining room. Returns
+    ``{student: vacancy or None}``.
+    """
+    pairs = []
+    for order, (student, preferences) in enumerate(preferences_by_student.items()):
+        for vacancy in index.best(preferences, candidates):
+            pairs.append((match_score(vacancy, preferences), order, student, vacancy.id))
+    pairs.sort(key=lambda pair: pair[:2])
+
+    assignments = dict.fromkeys(preferences_by_student)
+    for _, _, student, room_id in pairs:
+        if assignments[student] is None and room_id in index.vacancies:
+            assignments[student] = index.take(room_id)
+
+    for student, preferences in preferences_by_student.items():
+        if assignments[student] is None:
+            best = index.best(preferences, 1)
+            if best:
+                assignments[student] = index.take(best[0].id)
+    return assignments
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['floor', 'room_number'], name='room_floor_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['status', 'floor', 'room_number'], name='room_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomallocation',
+            index=models.Index(fields=['student', '-check_in_date'], name='allocation_student_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomallocation',
+            index=models.Index(condition=models.Q(('check_out_date__isnull', True), ('is_active', True)), fields=['student'], name='allocation_current_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomallocation',
+            index=models.Index(condition=models.Q(('check_out_date__isnull', True), ('is_active', True)), fields=['room'], name='allocation_current_room_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roommaintenance',
+            index=models.Index(fields=['-scheduled_date', '-id'], name='maintenance_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roommaintenance',
+            index=models.Index(fields=['status', '-scheduled_date', '-id'], name='maintenance_status_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0003_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roomallocation',
+            index=models.Index(fields=['check_out_date', 'check_in_date'], name='allocation_interval_idx'),
+        ),
+    ]
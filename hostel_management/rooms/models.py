@@ -32,6 +32,11 @@ class Room(models.Model):
         verbose_name = 'Room'
         verbose_name_plural = 'Rooms'
         ordering = ['floor', 'room_number']
+        indexes = [
+            # room_list: default ordering, and the status filter with that ordering
+            models.Index(fields=['floor', 'room_number'], name='room_floor_number_idx'),
+            models.Index(fields=['status', 'floor', 'room_number'], name='room_status_idx'),
+        ]
 
     def __str__(self):
         return f'Room {self.room_number} ({self.get_room_type_display()})'
@@ -42,6 +47,14 @@ class Room(models.Model):
     def has_space(self):
         return self.current_occupancy < self.capacity
 
+class RoomAllocationQuerySet(models.QuerySet):
+    def current(self):
+        return self.filter(is_active=True, check_out_date__isnull=True)
+
+    def for_list(self):
+        """Fetch profile for allocation tables, which show the student and room."""
+        return self.select_related('student', 'room')
+
 class RoomAllocation(models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='allocations')
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='room_allocations')
@@ -51,14 +64,32 @@ class RoomAllocation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RoomAllocationQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Room Allocation'
         verbose_name_plural = 'Room Allocations'
         unique_together = ['room', 'student', 'check_in_date']
+        indexes = [
+            # student_detail: allocation history
+            models.Index(fields=['student', '-check_in_date'], name='allocation_student_history_idx'),
+            # current(): the few open allocations per student and per room
+            models.Index(fields=['student'], name='allocation_current_student_idx',
+                         condition=models.Q(is_active=True, check_out_date__isnull=True)),
+            models.Index(fields=['room'], name='allocation_current_room_idx',
+                         condition=models.Q(is_active=True, check_out_date__isnull=True)),
+            # availability: allocations overlapping a date window
+            models.Index(fields=['check_out_date', 'check_in_date'], name='allocation_interval_idx'),
+        ]
 
     def __str__(self):
         return f'{self.student.get_full_name()} - Room {self.room.room_number}'
 
+class RoomMaintenanceQuerySet(models.QuerySet):
+    def for_list(self):
+        """Fetch profile for maintenance tables, which show the room and reporter."""
+        return self.select_related('room', 'reported_by')
+
 class RoomMaintenance(models.Model):
     MAINTENANCE_TYPE_CHOICES = (
         ('repair', 'Repair'),
@@ -86,10 +117,17 @@ class RoomMaintenance(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RoomMaintenanceQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Room Maintenance'
         verbose_name_plural = 'Room Maintenance Records'
         ordering = ['-scheduled_date', 'status']
+        indexes = [
+            # maintenance_list: keyset ordering, alone and after the status filter
+            models.Index(fields=['-scheduled_date', '-id'], name='maintenance_schedule_idx'),
+            models.Index(fields=['status', '-scheduled_date', '-id'], name='maintenance_status_idx'),
+        ]
 
     def __str__(self):
         return f'Maintenance - Room {self.room.room_number} ({self.get_maintenance_type_display()})'
@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+
+from django.db.models import Count, Q
+
+from .models import Room, RoomMaintenance
+
+
+@dataclass(frozen=True)
+class RoomStats:
+    total: int = 0
+    available: int = 0
+    occupied: int = 0
+    maintenance: int = 0
+    reserved: int = 0
+
+
+@dataclass(frozen=True)
+class MaintenanceStats:
+    total: int = 0
+    pending: int = 0
+    in_progress: int = 0
+    completed: int = 0
+    cancelled: int = 0
+
+
+def _status_counts(queryset, choices):
+    """Count every status bucket of ``queryset`` with one conditional aggregate."""
+    buckets = {
+        status: Count('pk', filter=Q(status=status))
+        for status, _ in choices
+    }
+    return queryset.order_by().aggregate(total=Count('pk'), **buckets)
+
+
+def get_room_stats(queryset=None):
+    """Return room counts per status in a single query."""
+    if queryset is None:
+        queryset = Room.objects.all()
+    return RoomStats(**_status_counts(queryset, Room.ROOM_STATUS_CHOICES))
+
+
+def get_maintenance_stats(queryset=None):
+    """Return maintenance record counts per status in a single query."""
+    if queryset is None:
+        queryset = RoomMaintenance.objects.all()
+    return MaintenanceStats(**_status_counts(queryset, RoomMaintenance.STATUS_CHOICES))
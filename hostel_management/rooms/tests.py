@@ -1,3 +1,429 @@
+import datetime
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from users.models import User
+from .allocation import (
+    AllocationError, AllocationRequest, allocate_student, bulk_allocate, checkout_allocations, read_allocation_csv,
+    reconcile_occupancy,
+)
+from .availability import available_rooms, occupancy_by_day, room_availability
+from .management.commands.benchmark_room_matching import naive_best
+from .matching import RoomPreferences, VacancyIndex, assign_cohort
+from .models import Room, RoomAllocation, RoomMaintenance
+from .stats import MaintenanceStats, RoomStats, get_maintenance_stats, get_room_stats
+
+
+class StatusCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number, status in (('101', 'available'), ('102', 'available'), ('103', 'occupied'), ('104', 'maintenance')):
+            room = Room.objects.create(room_number=number, floor=1, room_type='single', capacity=1,
+                                       monthly_rent=100, status=status)
+        for status in ('pending', 'pending', 'completed'):
+            RoomMaintenance.objects.create(room=room, maintenance_type='repair', description='x',
+                                           status=status, scheduled_date=datetime.date(2025, 1, 1))
+
+    def test_room_stats_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = get_room_stats()
+        self.assertEqual(stats, RoomStats(total=4, available=2, occupied=1, maintenance=1, reserved=0))
+
+    def test_maintenance_stats_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = get_maintenance_stats()
+        self.assertEqual(stats, MaintenanceStats(total=3, pending=2, completed=1))
+
+    def test_stats_of_a_filtered_queryset(self):
+        self.assertEqual(get_room_stats(Room.objects.filter(room_number__in=['101', '103'])),
+                         RoomStats(total=2, available=1, occupied=1))
+        self.assertEqual(get_room_stats(Room.objects.none()), RoomStats())
+
+
+class AllocateStudentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = Room.objects.create(room_number='101', floor=1, room_type='double',
+                                       capacity=2, monthly_rent=100)
+        cls.students = [
+            User.objects.create_user(f'student{i}', password='x', user_type='student') for i in range(3)
+        ]
+
+    def allocate(self, student, room=None):
+        return allocate_student((room or self.room).pk, student, '2025-01-01')
+
+    def test_allocation_takes_a_place(self):
+        allocation = self.allocate(self.students[0])
+        self.assertEqual(allocation.room_id, self.room.pk)
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.current_occupancy, self.room.status), (1, 'available'))
+
+    def test_last_place_marks_the_room_occupied(self):
+        self.allocate(self.students[0])
+        self.allocate(self.students[1])
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.current_occupancy, self.room.status), (2, 'occupied'))
+
+    def test_full_room_is_rejected(self):
+        Room.objects.filter(pk=self.room.pk).update(current_occupancy=2)
+        with self.assertRaises(AllocationError):
+            self.allocate(self.students[0])
+        self.assertFalse(RoomAllocation.objects.exists())
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.current_occupancy, 2)
+
+    def test_unavailable_room_is_rejected(self):
+        Room.objects.filter(pk=self.room.pk).update(status='maintenance')
+        with self.assertRaises(AllocationError):
+            self.allocate(self.students[0])
+        self.assertFalse(RoomAllocation.objects.exists())
+
+    def test_student_with_a_room_is_rejected(self):
+        other = Room.objects.create(room_number='102', floor=1, room_type='single', capacity=1, monthly_rent=100)
+        self.allocate(self.students[0], other)
+        with self.assertRaisesMessage(AllocationError, 'already has a room'):
+            self.allocate(self.students[0])
+        # The place taken before the check is given back
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.current_occupancy, 0)
+        self.assertEqual(RoomAllocation.objects.filter(room=self.room).count(), 0)
+
+    def test_invalid_check_in_date_is_rejected(self):
+        with self.assertRaisesMessage(AllocationError, 'valid check-in date'):
+            allocate_student(self.room.pk, self.students[0], 'not a date')
+
+    def test_allocation_history_keeps_old_stays(self):
+        RoomAllocation.objects.create(room=self.room, student=self.students[0], is_active=False,
+                                      check_in_date=datetime.date(2024, 1, 1), check_out_date=datetime.date(2024, 6, 1))
+        self.allocate(self.students[0])
+        self.assertEqual(RoomAllocation.objects.current().filter(student=self.students[0]).count(), 1)
+
+
+class BulkAllocateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number, floor, room_type, capacity in (
+            ('101', 1, 'single', 1), ('102', 1, 'double', 2), ('201', 2, 'single', 1), ('202', 2, 'double', 2),
+        ):
+            Room.objects.create(room_number=number, floor=floor, room_type=room_type, capacity=capacity,
+                                monthly_rent=100)
+        for i in range(6):
+            User.objects.create_user(f'student{i}', password='x', user_type='student')
+        User.objects.create_user('warden', password='x', user_type='admin')
+
+    def rooms(self):
+        return {room.room_number: (room.current_occupancy, room.status) for room in Room.objects.all()}
+
+    def test_places_by_preference_and_fills_rooms_in_order(self):
+        report = bulk_allocate([
+            AllocationRequest('student0', ('single',)),
+            AllocationRequest('student1', ('single',)),
+            AllocationRequest('student2', ('single', 'double'), floor=2),
+            AllocationRequest('student3', ('double',)),
+            AllocationRequest('student4'),
+        ], '2025-09-01')
+        self.assertEqual(report.placements, [
+            ('student0', '101'), ('student1', '201'), ('student2', '202'), ('student3', '102'), ('student4', '102'),
+        ])
+        self.assertEqual(self.rooms(), {
+            '101': (1, 'occupied'), '102': (2, 'occupied'), '201': (1, 'occupied'), '202': (1, 'available'),
+        })
+        self.assertEqual(RoomAllocation.objects.current().count(), 5)
+
+    def test_failures_are_reported_per_student(self):
+        allocate_student(Room.objects.get(room_number='202').pk, User.objects.get(username='student5'), '2025-01-01')
+        report = bulk_allocate([
+            AllocationRequest('nobody'),
+            AllocationRequest('warden'),
+            AllocationRequest('student5'),
+            AllocationRequest('student0', ('suite',)),
+            AllocationRequest('student1', ('single',), floor=3),
+            AllocationRequest('student2'),
+            AllocationRequest('student2'),
+            AllocationRequest('student3', ('single',)),
+        ], '2025-09-01')
+        # There is no third floor, so student1 is the weakest claim on the two single rooms
+        self.assertEqual(report.placements, [('student2', '101'), ('student3', '201')])
+        self.assertEqual(report.failures, [
+            ('nobody', 'Unknown student'),
+            ('warden', 'Unknown student'),
+            ('student5', 'Already has a room'),
+            ('student0', 'Unknown room type suite'),
+            ('student2', 'Listed more than once'),
+            ('student1', 'No vacancy matches the preferences'),
+        ])
+
+    def test_floor_is_a_preference(self):
+        report = bulk_allocate([AllocationRequest('student0', ('single',), floor=3)], '2025-09-01')
+        self.assertEqual(report.placements, [('student0', '201')])
+        self.assertEqual(self.rooms()['201'], (1, 'occupied'))
+
+    def test_dry_run_writes_nothing(self):
+        report = bulk_allocate([AllocationRequest('student0')], '2025-09-01', dry_run=True)
+        self.assertEqual(report.placed, 1)
+        self.assertFalse(RoomAllocation.objects.exists())
+        self.assertEqual(self.rooms()['101'], (0, 'available'))
+
+    def test_csv_rows(self):
+        requests, failures = read_allocation_csv([
+            'student,room_types,floor', 'student0,single|double,2', 'student1,,', ',single,1', 'student2,single,top',
+        ])
+        self.assertEqual(requests, [AllocationRequest('student0', ('single', 'double'), 2), AllocationRequest('student1')])
+        self.assertEqual(failures, [('line 4', 'Missing student'), ('student2', "Invalid floor 'top' on line 5")])
+
+
+class CheckoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+        cls.full = Room.objects.create(room_number='101', floor=1, room_type='double', capacity=2, monthly_rent=100)
+        cls.other = Room.objects.create(room_number='201', floor=2, room_type='single', capacity=1, monthly_rent=100)
+        cls.students = [User.objects.create_user(f'student{i}', password='x', user_type='student') for i in range(3)]
+
+    def setUp(self):
+        self.allocations = [
+            allocate_student(room.pk, student, '2025-01-01')
+            for room, student in zip((self.full, self.full, self.other), self.students)
+        ]
+
+    def room(self, room):
+        room.refresh_from_db()
+        return room.current_occupancy, room.status
+
+    def test_checkout_releases_one_place(self):
+        self.assertEqual(self.room(self.full), (2, 'occupied'))
+        checked_out = checkout_allocations(RoomAllocation.objects.filter(pk=self.allocations[0].pk),
+                                           datetime.date(2025, 6, 1))
+        self.assertEqual(checked_out, 1)
+        self.assertEqual(self.room(self.full), (1, 'available'))
+        self.allocations[0].refresh_from_db()
+        self.assertEqual((self.allocations[0].is_active, self.allocations[0].check_out_date),
+                         (False, datetime.date(2025, 6, 1)))
+
+    def test_repeated_checkout_changes_nothing(self):
+        allocation = RoomAllocation.objects.filter(pk=self.allocations[0].pk)
+        checkout_allocations(allocation)
+        self.assertEqual(checkout_allocations(allocation), 0)
+        self.assertEqual(self.room(self.full), (1, 'available'))
+
+    def test_rooms_under_maintenance_keep_their_status(self):
+        Room.objects.filter(pk=self.other.pk).update(status='maintenance')
+        checkout_allocations(RoomAllocation.objects.filter(room=self.other))
+        self.assertEqual(self.room(self.other), (0, 'maintenance'))
+
+    def test_bulk_checkout_command(self):
+        output = io.StringIO()
+        call_command('bulk_checkout', floor=1, dry_run=True, stdout=output)
+        self.assertIn('2 allocations would be checked out', output.getvalue())
+        call_command('bulk_checkout', floor=1, check_out_date='2025-06-30', stdout=output)
+        self.assertEqual(self.room(self.full), (0, 'available'))
+        self.assertEqual(RoomAllocation.objects.current().get().room, self.other)
+
+    def test_checkout_view(self):
+        self.client.force_login(self.admin)
+        url = reverse('checkout_allocation', args=[self.allocations[2].pk])
+        self.assertRedirects(self.client.post(url), reverse('room_detail', args=[self.other.pk]))
+        self.assertEqual(self.room(self.other), (0, 'available'))
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    def test_reconcile_repairs_drift(self):
+        Room.objects.filter(pk=self.full.pk).update(current_occupancy=0, status='available')
+        Room.objects.filter(pk=self.other.pk).update(current_occupancy=1)
+        self.assertEqual(reconcile_occupancy(dry_run=True), 1)
+        self.assertEqual(reconcile_occupancy(), 1)
+        self.assertEqual(self.room(self.full), (2, 'occupied'))
+        self.assertEqual(reconcile_occupancy(dry_run=True), 0)
+
+
+class AvailabilityTests(TestCase):
+    START = datetime.date(2025, 3, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+        cls.double = Room.objects.create(room_number='101', floor=1, room_type='double', capacity=2, monthly_rent=100)
+        cls.single = Room.objects.create(room_number='201', floor=2, room_type='single', capacity=1, monthly_rent=100)
+        cls.closed = Room.objects.create(room_number='202', floor=2, room_type='single', capacity=1, monthly_rent=100,
+                                         status='maintenance')
+        students = [User.objects.create_user(f'student{i}', password='x', user_type='student') for i in range(4)]
+        for room, student, check_in, check_out, active in (
+            (cls.double, students[0], datetime.date(2025, 2, 1), None, True),  # open, started before the window
+            (cls.double, students[1], datetime.date(2025, 3, 3), datetime.date(2025, 3, 5), True),  # nights 3 and 4
+            (cls.single, students[2], datetime.date(2025, 3, 6), None, True),  # future check-in
+            (cls.single, students[3], datetime.date(2025, 1, 1), None, False),  # ended without a date
+        ):
+            RoomAllocation.objects.create(room=room, student=student, check_in_date=check_in,
+                                          check_out_date=check_out, is_active=active)
+
+    def day(self, day):
+        return self.START + datetime.timedelta(days=day)
+
+    def test_daily_occupancy(self):
+        occupancy = occupancy_by_day(self.START, self.day(7))
+        self.assertEqual(occupancy[self.double.pk], [1, 1, 2, 2, 1, 1, 1])
+        self.assertEqual(occupancy[self.single.pk], [0, 0, 0, 0, 0, 1, 1])
+        self.assertNotIn(self.closed.pk, occupancy)
+
+    def test_free_places(self):
+        with self.assertNumQueries(2):
+            availability = {entry.room.room_number: entry for entry in room_availability(self.START, self.day(7))}
+        self.assertEqual(availability['101'].free, [1, 1, 0, 0, 1, 1, 1])
+        self.assertEqual(availability['202'].free, [0] * 7)
+        self.assertEqual(availability['201'].min_free, 0)
+
+    def available(self, first, last, places=1):
+        return [entry.room.room_number for entry in available_rooms(self.day(first), self.day(last), places)]
+
+    def test_available_rooms(self):
+        self.assertEqual(self.available(0, 2), ['101', '201'])
+        self.assertEqual(self.available(0, 7), [])
+        self.assertEqual(self.available(4, 5), ['101', '201'])
+        self.assertEqual(self.available(0, 2, places=2), [])
+
+    def test_api(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('availability_api'),
+                                   {'start': '2025-03-01', 'end': '2025-03-03', 'floor': '1'})
+        data = response.json()
+        self.assertEqual((data['start'], data['end'], data['places']), ('2025-03-01', '2025-03-03', 1))
+        self.assertEqual([(room['room_number'], room['free']) for room in data['rooms']], [('101', [1, 1])])
+
+    def test_calendar_clamps_the_window(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('availability_calendar'), {'start': '2025-03-01', 'days': '1000'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['days'], 62)
+
+
+class RoomListFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+        Room.objects.create(room_number='101', floor=1, room_type='single', capacity=1, monthly_rent=100)
+        Room.objects.create(room_number='201', floor=2, room_type='double', capacity=2, monthly_rent=300)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def room_numbers(self, **params):
+        response = self.client.get(reverse('room_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [room.room_number for room in response.context['rooms']]
+
+    def test_rent_range(self):
+        self.assertEqual(self.room_numbers(min_rent='200'), ['201'])
+        self.assertEqual(self.room_numbers(max_rent='200'), ['101'])
+
+    def test_non_finite_rent_is_ignored(self):
+        for value in ('NaN', 'sNaN', 'Infinity', '-inf'):
+            with self.subTest(value=value):
+                self.assertEqual(len(self.room_numbers(min_rent=value, max_rent=value)), 2)
+
+    def test_malformed_floor_is_ignored(self):
+        self.assertEqual(len(self.room_numbers(floor='first')), 2)
+
+
+class MaintenanceSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+        cls.student = User.objects.create_user('plumber_fan', password='x', user_type='student')
+        rooms = [Room.objects.create(room_number=number, floor=int(number[0]), room_type='single',
+                                     capacity=1, monthly_rent=100) for number in ('101', '215')]
+        cls.records = {
+            name: RoomMaintenance.objects.create(room=room, maintenance_type='repair', description=description,
+                                                 reported_by=reporter, scheduled_date=datetime.date(2025, 1, day))
+            for name, room, description, reporter, day in (
+                ('tap', rooms[0], 'Leaking tap in the bathroom', None, 1),
+                ('light', rooms[1], 'Ceiling light flickers', cls.student, 2),
+                ('window', rooms[1], 'Window 101 will not close', None, 3),
+            )
+        }
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def found(self, query):
+        response = self.client.get(reverse('maintenance_list'), {'search': query})
+        self.assertEqual(response.status_code, 200)
+        names = {record.pk: name for name, record in self.records.items()}
+        return [names[record.pk] for record in response.context['page_obj']]
+
+    def test_room_number_substring(self):
+        # Room 101 itself, and the record whose description mentions it
+        self.assertEqual(self.found('10'), ['window', 'tap'])
+        self.assertEqual(self.found('21'), ['window', 'light'])
+
+    def test_reporter_substring(self):
+        self.assertEqual(self.found('plumber'), ['light'])
+
+    def test_description_is_full_text(self):
+        self.assertEqual(self.found('leak bath'), ['tap'])
+        self.assertEqual(self.found('nothing'), [])
+
+    def test_room_number_and_description_matches_are_merged(self):
+        self.records['door'] = RoomMaintenance.objects.create(
+            room=self.records['tap'].room, maintenance_type='repair', description='Door sticks',
+            scheduled_date=datetime.date(2025, 1, 4),
+        )
+        # Room 101's records and the room 215 record whose description mentions 101, newest first
+        self.assertEqual(self.found('101'), ['door', 'window', 'tap'])
+
+
+class RoomMatchingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rooms = {}
+        for number, floor, room_type, capacity, rent, amenities in (
+            ('101', 1, 'single', 1, 300, {'wifi': True}),
+            ('102', 1, 'double', 2, 200, {'wifi': True, 'ac': True}),
+            ('201', 2, 'single', 1, 250, {'ac': True}),
+            ('301', 3, 'triple', 3, 150, {}),
+        ):
+            cls.rooms[number] = Room.objects.create(room_number=number, floor=floor, room_type=room_type,
+                                                    capacity=capacity, monthly_rent=rent, amenities=amenities)
+        student = User.objects.create_user('resident', password='x', user_type='student')
+        RoomAllocation.objects.create(room=cls.rooms['102'], student=student, check_in_date=datetime.date(2025, 1, 1))
+
+    def numbers(self, vacancies):
+        return [vacancy.room_number for vacancy in vacancies]
+
+    def test_index_counts_free_places(self):
+        index = VacancyIndex.build()
+        self.assertEqual({vacancy.room_number: vacancy.free for vacancy in index.vacancies.values()},
+                         {'101': 1, '102': 1, '201': 1, '301': 3})
+
+    def test_best_respects_hard_limits_and_agrees_with_the_naive_scan(self):
+        index = VacancyIndex.build()
+        for preferences in (
+            RoomPreferences(),
+            RoomPreferences(room_types=('single',), floor=2),
+            RoomPreferences(max_rent=Decimal('250'), amenities=('ac',)),
+            RoomPreferences(room_types=('triple', 'double'), floor=1, amenities=('wifi',)),
+        ):
+            with self.subTest(preferences=preferences):
+                best = index.best(preferences, 3)
+                self.assertEqual(self.numbers(best), self.numbers(naive_best(preferences, 3)))
+                for vacancy in best:
+                    if preferences.room_types:
+                        self.assertIn(vacancy.room_type, preferences.room_types)
+                    if preferences.max_rent is not None:
+                        self.assertLessEqual(vacancy.monthly_rent, preferences.max_rent)
+
+    def test_cohort_never_overfills_a_room(self):
+        index = VacancyIndex.build()
+        single = RoomPreferences(room_types=('single',), floor=1)
+        assignments = assign_cohort(index, {student: single for student in range(3)})
+        placed = [vacancy for vacancy in assignments.values() if vacancy is not None]
+        self.assertEqual(sorted(self.numbers(placed)), ['101', '201'])
+        self.assertEqual(len(assignments) - len(placed), 1)
+        self.assertNotIn(self.rooms['101'].pk, index.vacancies)
 
-# Create your tests here.
+    def test_benchmark_with_no_students(self):
+        output = io.StringIO()
+        call_command('benchmark_room_matching', students=0, stdout=output)
+        self.assertIn('No students to match.', output.getvalue())
@@ -1,33 +1,137 @@
+import datetime
+from decimal import Decimal
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.db.models import F, Q
+from django.views.decorators.http import require_POST
+from .availability import available_rooms, room_availability
+from .allocation import AllocationError, allocate_student, checkout_allocations
 from .models import Room, RoomAllocation, RoomMaintenance
+from .stats import get_room_stats
+from core.caching import Fragment, cached, user_role
+from core.pagination import CursorPaginator
+from core.search import search
 from users.models import User
+from users.decorators import admin_required
+
+ROOM_LIST_COLUMNS = ('id', 'room_number', 'room_type', 'floor', 'status', 'monthly_rent')
+AVAILABILITY_DAYS = 14
+MAX_AVAILABILITY_DAYS = 62
+
+
+def _parse_number(value, cast):
+    try:
+        number = cast(value) if value else None
+    except (TypeError, ValueError, ArithmeticError):
+        return None
+    # Decimal() accepts 'NaN' and 'Infinity', which the database cannot compare against
+    if isinstance(number, Decimal) and not number.is_finite():
+        return None
+    return number
+
+def _parse_date(value):
+    try:
+        return parse_date(value) if value else None
+    except ValueError:
+        return None
+
+def _availability_window(params):
+    """Return ``(start, end, rooms)`` for the availability filters in ``params``."""
+    start = _parse_date(params.get('start', '')) or timezone.localdate()
+    end = _parse_date(params.get('end', ''))
+    if end is None or end <= start:
+        days = _parse_number(params.get('days', ''), int) or AVAILABILITY_DAYS
+        end = start + datetime.timedelta(days=days)
+    end = min(end, start + datetime.timedelta(days=MAX_AVAILABILITY_DAYS))
+
+    rooms = Room.objects.all()
+    floor = _parse_number(params.get('floor', ''), int)
+    if floor is not None:
+        rooms = rooms.filter(floor=floor)
+    if params.get('room_type'):
+        rooms = rooms.filter(room_type=params['room_type'])
+    return start, end, rooms
+
+def _room_floors():
+    return list(Room.objects.order_by('floor').values_list('floor', flat=True).distinct())
 
 @login_required
 def room_list(request):
-    rooms = Room.objects.all()
+    # Get filter parameters
+    floor = _parse_number(request.GET.get('floor', ''), int)
+    room_type = request.GET.get('room_type', '')
+    status = request.GET.get('status', '')
+    has_space = request.GET.get('has_space', '')
+    min_rent = _parse_number(request.GET.get('min_rent', ''), Decimal)
+    max_rent = _parse_number(request.GET.get('max_rent', ''), Decimal)
+
+    # Base queryset - only the columns the table renders
+    rooms = Room.objects.only(*ROOM_LIST_COLUMNS)
+
+    # Apply filters
+    if floor is not None:
+        rooms = rooms.filter(floor=floor)
+    if room_type:
+        rooms = rooms.filter(room_type=room_type)
+    if status:
+        rooms = rooms.filter(status=status)
+    if has_space == 'true':
+        rooms = rooms.filter(current_occupancy__lt=F('capacity'))
+    if min_rent is not None:
+        rooms = rooms.filter(monthly_rent__gte=min_rent)
+    if max_rent is not None:
+        rooms = rooms.filter(monthly_rent__lte=max_rent)
+
+    # Keep the active filters on pagination links
+    filter_params = request.GET.copy()
+    filter_params.pop('page', None)
+    filter_query = filter_params.urlencode()
+
+    # Pagination - the count is cached with the table, so a cached page runs no room queries
+    paginator = Paginator(rooms, 20)  # Show 20 rooms per page
+    paginator.count = cached('room_list_count', ('room',), (filter_query,), rooms.count)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+
+    room_stats = cached('room_stats', ('room',), (), get_room_stats)
     context = {
-        'rooms': rooms,
-        'total_rooms': rooms.count(),
-        'available_rooms': rooms.filter(status='available').count(),
-        'occupied_rooms': rooms.filter(status='occupied').count(),
-        'maintenance_rooms': rooms.filter(status='maintenance').count(),
+        'page_obj': page_obj,
+        'rooms': page_obj,
+        'room_table': Fragment('room_list_table', ('room',), user_role(request.user), filter_query, page_obj.number),
+        'room_stats': room_stats,
+        'total_rooms': room_stats.total,
+        'available_rooms': room_stats.available,
+        'occupied_rooms': room_stats.occupied,
+        'maintenance_rooms': room_stats.maintenance,
+        'floors': cached('room_floors', ('room',), (), _room_floors),
+        'room_type_choices': Room.ROOM_TYPE_CHOICES,
+        'status_choices': Room.ROOM_STATUS_CHOICES,
+        'selected_floor': floor,
+        'selected_room_type': room_type,
+        'selected_status': status,
+        'has_space': has_space,
+        'min_rent': request.GET.get('min_rent', ''),
+        'max_rent': request.GET.get('max_rent', ''),
+        'filter_query': filter_query,
     }
     return render(request, 'rooms/room_list.html', context)
 
 @login_required
 def room_detail(request, room_id):
     room = get_object_or_404(Room, id=room_id)
-    # Change roomallocation_set to allocations
-    allocations = room.allocations.all().order_by('-created_at')
-    maintenance_records = room.maintenance_records.all().order_by('-created_at')
+    allocations = room.allocations.for_list().order_by('-created_at')
+    maintenance_records = room.maintenance_records.for_list().order_by('-created_at')
     context = {
         'room': room,
         'allocations': allocations,
         'maintenance_records': maintenance_records,
+        'allocation_history': Fragment('room_allocations', ('allocation', 'user'), room.id, user_role(request.user)),
+        'maintenance_history': Fragment('room_maintenance', ('maintenance', 'user'), room.id),
     }
     return render(request, 'rooms/room_detail.html', context)
 
@@ -40,30 +144,75 @@ def allocate_room(request, room_id):
         
         if student_id and check_in_date:
             student = get_object_or_404(User, id=student_id)
-            if room.status == 'available' and room.has_space():
-                allocation = RoomAllocation.objects.create(
-                    room=room,
-                    student=student,
-                    check_in_date=check_in_date
-                )
-                room.current_occupancy += 1
-                if room.current_occupancy >= room.capacity:
-                    room.status = 'occupied'
-                room.save()
+            try:
+                allocate_student(room.id, student, check_in_date)
+            except AllocationError as exc:
+                messages.error(request, str(exc))
+            else:
                 messages.success(request, f'Room {room.room_number} has been allocated to {student.get_full_name()}')
                 return redirect('room_detail', room_id=room.id)
-            else:
-                messages.error(request, 'This room is not available for allocation or is at full capacity')
         else:
             messages.error(request, 'Please select a student and check-in date')
     
-    available_students = User.objects.filter(user_type='student')
     context = {
         'room': room,
-        'available_students': available_students,
     }
     return render(request, 'rooms/allocate_room.html', context)
 
+@login_required
+def availability_calendar(request):
+    start, end, rooms = _availability_window(request.GET)
+    availability = room_availability(start, end, rooms)
+    context = {
+        'availability': [(entry, entry.days(start)) for entry in availability],
+        'dates': [start + datetime.timedelta(days=offset) for offset in range((end - start).days)],
+        'start': start,
+        'end': end,
+        'previous_start': start - (end - start),
+        'next_start': end,
+        'days': (end - start).days,
+        'floors': cached('room_floors', ('room',), (), _room_floors),
+        'room_type_choices': Room.ROOM_TYPE_CHOICES,
+        'selected_floor': _parse_number(request.GET.get('floor', ''), int),
+        'selected_room_type': request.GET.get('room_type', ''),
+    }
+    return render(request, 'rooms/availability.html', context)
+
+@login_required
+def availability_api(request):
+    """Rooms with at least ``places`` free on every night between ``start`` and ``end``."""
+    start, end, rooms = _availability_window(request.GET)
+    places = _parse_number(request.GET.get('places', ''), int) or 1
+    return JsonResponse({
+        'start': start,
+        'end': end,
+        'places': places,
+        'rooms': [
+            {
+                'id': entry.room.id,
+                'room_number': entry.room.room_number,
+                'floor': entry.room.floor,
+                'room_type': entry.room.room_type,
+                'capacity': entry.room.capacity,
+                'status': entry.room.status,
+                'min_free': entry.min_free,
+                'free': entry.free,
+            }
+            for entry in available_rooms(start, end, places, rooms)
+        ],
+    })
+
+@login_required
+@admin_required
+@require_POST
+def checkout_allocation(request, allocation_id):
+    allocation = get_object_or_404(RoomAllocation.objects.for_list(), id=allocation_id)
+    if checkout_allocations(RoomAllocation.objects.filter(pk=allocation.pk)):
+        messages.success(request, f'{allocation.student.get_full_name()} has been checked out of Room {allocation.room.room_number}')
+    else:
+        messages.error(request, 'This allocation has already ended')
+    return redirect('room_detail', room_id=allocation.room_id)
+
 @login_required
 def report_maintenance(request, room_id):
     room = get_object_or_404(Room, id=room_id)
@@ -102,7 +251,7 @@ def maintenance_list(request):
     search_query = request.GET.get('search', '')
     
     # Base queryset
-    maintenance_records = RoomMaintenance.objects.all().order_by('-scheduled_date')
+    maintenance_records = RoomMaintenance.objects.for_list()
     
     # Apply filters
     if status:
@@ -110,16 +259,21 @@ def maintenance_list(request):
     if maintenance_type:
         maintenance_records = maintenance_records.filter(maintenance_type=maintenance_type)
     if search_query:
+        # Room number or reporter substrings, or a full-text match on the description and remarks
+        described = search(RoomMaintenance.objects.all(), 'maintenance', search_query).values('pk')
         maintenance_records = maintenance_records.filter(
             Q(room__room_number__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(reported_by__username__icontains=search_query)
+            Q(reported_by__username__icontains=search_query) |
+            Q(pk__in=described)
         )
     
-    # Pagination
-    paginator = Paginator(maintenance_records, 10)  # Show 10 records per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination
+    paginator = CursorPaginator(maintenance_records, ('-scheduled_date', '-id'), 10, estimate_total=True)  # Show 10 records per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+
+    # Keep the active filters on pagination links
+    filter_params = request.GET.copy()
+    filter_params.pop('cursor', None)
     
     context = {
         'page_obj': page_obj,
@@ -128,5 +282,6 @@ def maintenance_list(request):
         'selected_status': status,
         'selected_type': maintenance_type,
         'search_query': search_query,
+        'filter_query': filter_params.urlencode(),
     }
     return render(request, 'rooms/maintenance_list.html', context)
@@ -1,5 +1,30 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import Prefetch
+
+
+class UserQuerySet(models.QuerySet):
+    def with_current_allocation(self):
+        """Prefetch each user's active room allocation (and its room) in one extra query."""
+        allocation_model = self.model._meta.get_field('room_allocations').related_model
+        return self.prefetch_related(Prefetch(
+            'room_allocations',
+            queryset=allocation_model.objects.current().select_related('room'),
+            to_attr='current_allocations',
+        ))
+
+    def current_occupants(self, room):
+        """Users with an active allocation in ``room``."""
+        return self.filter(
+            room_allocations__room=room,
+            room_allocations__is_active=True,
+            room_allocations__check_out_date__isnull=True,
+        ).distinct()
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
 
 class User(AbstractUser):
     USER_TYPE_CHOICES = (
@@ -21,12 +46,19 @@ class User(AbstractUser):
     date_of_birth = models.DateField(null=True, blank=True)
     emergency_contact = models.CharField(max_length=15, blank=True)
     theme_preference = models.CharField(max_length=10, choices=THEME_CHOICES, default='light')
+    unread_notification_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CustomUserManager()
+
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # student_list and the dashboard filter on user_type, sorted by username
+            models.Index(fields=['user_type', 'username'], name='user_type_username_idx'),
+        ]
 
     def __str__(self):
         return f'{self.get_full_name()} ({self.get_user_type_display()})'
@@ -42,3 +74,17 @@ class User(AbstractUser):
 
     def is_parent(self):
         return self.user_type == 'parent'
+
+    @property
+    def current_allocation(self):
+        """Active room allocation, read from with_current_allocation() when prefetched."""
+        if hasattr(self, 'current_allocations'):
+            allocations = self.current_allocations
+        else:
+            allocations = self.room_allocations.current().select_related('room')[:1]
+        return allocations[0] if allocations else None
+
+    @property
+    def current_room(self):
+        allocation = self.current_allocation
+        return allocation.room if allocation else None
@@ -1,3 +1,123 @@
+import datetime
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Complaint
+from core.reporting import DEFAULT_CHART_RANGE
+from rooms.models import Room, RoomAllocation, RoomMaintenance
+from .models import User
+
+
+class DashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+        cls.student = User.objects.create_user('student', password='x', user_type='student')
+        for number, status in (('101', 'available'), ('102', 'occupied')):
+            room = Room.objects.create(room_number=number, floor=1, room_type='single', capacity=1,
+                                       monthly_rent=100, status=status)
+        RoomMaintenance.objects.create(room=room, maintenance_type='repair', description='x',
+                                       status='in_progress', scheduled_date=datetime.date(2025, 1, 1))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_dashboard_counts(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        context = response.context
+        self.assertEqual((context['total_rooms'], context['available_rooms']), (2, 1))
+        self.assertEqual((context['pending_maintenance'], context['in_progress_maintenance']), (0, 1))
+        self.assertEqual(context['total_residents'], 1)
+
+    def test_dashboard_is_for_admins(self):
+        self.client.force_login(self.student)
+        self.assertRedirects(self.client.get(reverse('dashboard')), reverse('login'), fetch_redirect_response=False)
+
+
+class DashboardChartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+        cls.student = User.objects.create_user('student', password='x', user_type='student')
+        room = Room.objects.create(room_number='101', floor=1, room_type='single', capacity=1, monthly_rent=100)
+        today = timezone.localdate()
+        for days_ago, status in ((0, 'completed'), (0, 'pending'), (3, 'pending'), (40, 'completed')):
+            RoomMaintenance.objects.create(room=room, maintenance_type='repair', description='x', status=status,
+                                           scheduled_date=today - datetime.timedelta(days=days_ago))
+        Complaint.objects.create(title='Leak', description='x', category='maintenance', reported_by=cls.student)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def charts(self, **params):
+        response = self.client.get(reverse('dashboard_charts'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_daily_buckets(self):
+        data = self.charts(range='30d')
+        self.assertEqual((data['range'], data['bucket'], len(data['labels'])), ('30d', 'day', 30))
+        self.assertEqual(data['labels'][-1], timezone.localdate().isoformat())
+        self.assertEqual(data['maintenance']['scheduled'][-1], 2)
+        self.assertEqual(data['maintenance']['completed'][-1], 1)
+        self.assertEqual(data['maintenance']['scheduled'][-4], 1)
+        self.assertEqual(sum(data['maintenance']['scheduled']), 3)
+        self.assertEqual(data['complaints']['opened'][-1], 1)
+
+    def test_longer_ranges_cover_older_rows(self):
+        data = self.charts(range='90d')
+        self.assertEqual(data['bucket'], 'week')
+        self.assertEqual(sum(data['maintenance']['scheduled']), 4)
+        self.assertEqual(self.charts(range='12m')['bucket'], 'month')
+
+    def test_unknown_range_falls_back(self):
+        self.assertEqual(self.charts(range='forever')['range'], DEFAULT_CHART_RANGE)
+
+    def test_charts_are_for_admins(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(reverse('dashboard_charts')).status_code, 302)
+
+
+class StudentListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('warden', password='x', user_type='admin')
+        cls.room = Room.objects.create(room_number='101', floor=1, room_type='triple', capacity=3, monthly_rent=100)
+        cls.old_room = Room.objects.create(room_number='900', floor=9, room_type='single', capacity=1,
+                                           monthly_rent=100)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_students(self, count, start=0):
+        for i in range(start, start + count):
+            student = User.objects.create_user(f'student{i:02}', password='x', user_type='student')
+            RoomAllocation.objects.create(room=self.room, student=student, check_in_date=datetime.date(2025, 1, 1))
+
+    def queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('student_list')).status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_the_page(self):
+        self.add_students(2)
+        few = self.queries()
+        self.add_students(8, start=2)
+        self.assertEqual(self.queries(), few)
 
-# Create your tests here.
+    def test_current_room_ignores_past_stays(self):
+        self.add_students(1)
+        student = User.objects.get(username='student00')
+        RoomAllocation.objects.create(room=self.old_room, student=student, is_active=False,
+                                      check_in_date=datetime.date(2024, 1, 1), check_out_date=datetime.date(2024, 6, 1))
+        listed = self.client.get(reverse('student_list')).context['page_obj'][0]
+        self.assertEqual(listed.current_room, self.room)
+        self.assertEqual(User.objects.get(pk=student.pk).current_room, self.room)
@@ -4,9 +4,13 @@ from django.shortcuts import render, redirect, get_object_or_404  # Add get_obje
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib import messages
 from django.core.paginator import Paginator
+from django.http import JsonResponse
 from .models import User
 from rooms.models import Room, RoomMaintenance, RoomAllocation
+from rooms.stats import get_room_stats, get_maintenance_stats
+from core.caching import Fragment, cached
 from core.models import Payment, Complaint
+from core.reporting import CHART_RANGES, DEFAULT_CHART_RANGE, get_chart_data
 from .decorators import admin_required
 
 def login_view(request):
@@ -34,51 +38,48 @@ from .decorators import admin_required
 @login_required
 @admin_required
 def dashboard(request):
-    # Get maintenance statistics
-    maintenance_stats = {
-        'pending': RoomMaintenance.objects.filter(status='pending').count(),
-        'in_progress': RoomMaintenance.objects.filter(status='in_progress').count(),
-        'completed': RoomMaintenance.objects.filter(status='completed').count(),
-    }
+    room_stats = cached('room_stats', ('room',), (), get_room_stats)
+    maintenance_stats = cached('maintenance_stats', ('maintenance',), (), get_maintenance_stats)
 
     context = {
-        'total_rooms': Room.objects.count(),
-        'available_rooms': Room.objects.filter(status='available').count(),
-        'total_residents': User.objects.filter(user_type='resident').count(),
-        'pending_maintenance': maintenance_stats['pending'],
-        'in_progress_maintenance': maintenance_stats['in_progress'],
-        'completed_maintenance': maintenance_stats['completed'],
-        'recent_payments': Payment.objects.order_by('-created_at')[:5],
-        'recent_complaints': Complaint.objects.order_by('-created_at')[:5],
+        'room_stats': room_stats,
+        'maintenance_stats': maintenance_stats,
+        'total_rooms': room_stats.total,
+        'available_rooms': room_stats.available,
+        'total_residents': User.objects.filter(user_type='student').count(),
+        'pending_maintenance': maintenance_stats.pending,
+        'in_progress_maintenance': maintenance_stats.in_progress,
+        'completed_maintenance': maintenance_stats.completed,
+        'recent_payments': Payment.objects.for_list().order_by('-created_at')[:5],
+        'recent_complaints': Complaint.objects.for_list().order_by('-created_at')[:5],
+        'open_complaints': cached('open_complaints', ('complaint',), (), Complaint.objects.open().count),
+        'recent_payments_fragment': Fragment('dashboard_payments', ('payment', 'user')),
+        'recent_complaints_fragment': Fragment('dashboard_complaints', ('complaint', 'user')),
+        'chart_ranges': CHART_RANGES,
+        'default_chart_range': DEFAULT_CHART_RANGE,
     }
     return render(request, 'users/dashboard.html', context)
 
+@login_required
+@admin_required
+def dashboard_charts(request):
+    """Time-bucketed aggregates for the dashboard charts."""
+    return JsonResponse(get_chart_data(request.GET.get('range', DEFAULT_CHART_RANGE)))
+
 @login_required
 def student_list(request):
-    students = User.objects.filter(user_type='student').order_by('username')
+    students = User.objects.filter(user_type='student').with_current_allocation().order_by('username')
     
     # Get search parameter
     search_query = request.GET.get('search', '')
     if search_query:
         students = students.filter(username__icontains=search_query)
     
-    # Pagination
+    # Pagination - current rooms are prefetched for the whole page
     paginator = Paginator(students, 10)  # Show 10 students per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    # Get room allocation status for each student
-    for student in page_obj:
-        try:
-            allocation = RoomAllocation.objects.filter(
-                student=student,
-                is_active=True,
-                check_out_date__isnull=True
-            ).first()
-            student.current_room = allocation.room if allocation else None
-        except AttributeError:
-            student.current_room = None
-    
     context = {
         'page_obj': page_obj,
         'search_query': search_query,
@@ -87,19 +88,19 @@ def student_list(request):
 
 @login_required
 def student_detail(request, student_id):
-    student = get_object_or_404(User, id=student_id, user_type='student')
+    student = get_object_or_404(
+        User.objects.with_current_allocation(),
+        id=student_id,
+        user_type='student'
+    )
     
     # Get current room allocation
-    current_allocation = RoomAllocation.objects.filter(
-        student=student,
-        is_active=True,
-        check_out_date__isnull=True
-    ).first()
+    current_allocation = student.current_allocation
     
     # Get allocation history
     allocation_history = RoomAllocation.objects.filter(
         student=student
-    ).order_by('-check_in_date')
+    ).select_related('room').order_by('-check_in_date')
     
     # Get payment history
     payment_history = Payment.objects.filter(
@@ -108,7 +109,7 @@ def student_detail(request, student_id):
     
     # Get complaints
     complaints = Complaint.objects.filter(
-        student=student
+        reported_by=student
     ).order_by('-created_at')[:5]
     
     context = {
@@ -117,6 +118,9 @@ def student_detail(request, student_id):
         'allocation_history': allocation_history,
         'payment_history': payment_history,
         'complaints': complaints,
+        'allocation_history_fragment': Fragment('student_allocations', ('allocation', 'room', 'user'), student.id),
+        'payment_history_fragment': Fragment('student_payments', ('payment', 'user'), student.id),
+        'complaints_fragment': Fragment('student_complaints', ('complaint', 'user'), student.id),
     }
     return render(request, 'users/student_detail.html', context)
 